@@ -15,18 +15,30 @@ def create_app(config_class=Config):
     # Initialize Flask extensions
     session_ext.init_app(app)
 
-    import google.generativeai as genai
-    if app.config.get('GEMINI_API_KEY'):
-        genai.configure(api_key=app.config['GEMINI_API_KEY'])
-        print(f"Gemini configured: {app.config.get('GEMINI_MODEL_NAME')}")
-    else:
-        print("Warning: GEMINI_API_KEY not set.")
+    from .llm import init_llm
+    init_llm(app) # One Gemini gateway per worker process; every route goes through it
+
+    from .spotify.ratelimit import init_spotify_governor
+    init_spotify_governor(app) # Paces every Spotify call; the token bucket is shared by all workers
 
     # Register Blueprints
+    from .jobs import jobs_bp, init_jobs
+    init_jobs(app) # One bounded job runner per worker process
+    app.register_blueprint(jobs_bp)
+
+    from .outbox import outbox_bp, init_outbox
+    init_outbox(app) # Sender thread; only one process per host actually sends
+    app.register_blueprint(outbox_bp)
+
+    from .lastfm.tag_model import init_tag_model
+    init_tag_model(app) # Built lazily from tags and genres every worker records
+
     from .main import main_bp
     app.register_blueprint(main_bp)
 
     from .playlists import playlists_bp
+    from .playlists.search_index import init_playlist_index
+    init_playlist_index(app) # Shared on-disk index, updated as searches return playlists
     app.register_blueprint(playlists_bp) # No URL prefix needed based on original routes
 
     # Example: Simple route to test app creation
@@ -0,0 +1,150 @@
+import os
+import time
+import threading
+from collections import deque
+
+import requests
+
+# Defaults for every upstream's breaker (a breaker may be given its own settings when first created)
+WINDOW_SECONDS = float(os.environ.get('BREAKER_WINDOW') or 60) # Calls older than this don't count
+MIN_CALLS = int(os.environ.get('BREAKER_MIN_CALLS') or 5) # Calls in the window before the breaker may open
+FAILURE_RATE = float(os.environ.get('BREAKER_FAILURE_RATE') or 0.5) # Share of failed calls that opens it
+OPEN_SECONDS = float(os.environ.get('BREAKER_OPEN_SECONDS') or 30) # First pause before a trial call
+MAX_OPEN_SECONDS = float(os.environ.get('BREAKER_MAX_OPEN_SECONDS') or 600) # Pause cap after repeated failed trials
+
+CLOSED, OPEN, HALF_OPEN = 'closed', 'open', 'half_open'
+
+
+class CircuitOpen(requests.exceptions.ConnectionError):
+    """
+    Raised instead of calling an upstream whose breaker is open. It is a requests
+    ConnectionError, so the client modules' existing error handling treats it like the
+    upstream being unreachable, just without waiting for a timeout first.
+    """
+
+
+class CircuitBreaker:
+    """
+    Per-upstream circuit breaker for this process.
+
+    Closed: calls go through and their outcomes are counted over the last
+    `window_seconds`. Once at least `min_calls` were made and `failure_rate` of them
+    failed, the breaker opens and calls are refused for `open_seconds`. After that it is
+    half-open: one trial call goes through; success closes the breaker, failure opens it
+    again for twice as long (up to `max_open_seconds`).
+    """
+
+    def __init__(self, name, window_seconds=None, min_calls=None, failure_rate=None,
+                 open_seconds=None, max_open_seconds=None):
+        self.name = name
+        self.window_seconds = window_seconds or WINDOW_SECONDS
+        self.min_calls = min_calls or MIN_CALLS
+        self.failure_rate = failure_rate or FAILURE_RATE
+        self.open_seconds = open_seconds or OPEN_SECONDS
+        self.max_open_seconds = max_open_seconds or MAX_OPEN_SECONDS
+        self.state = CLOSED
+        self._calls = deque() # (time.monotonic(), ok)
+        self._failures = 0
+        self._pause = self.open_seconds
+        self._open_until = 0.0
+        self._trial_started = None
+        self._lock = threading.Lock()
+        self.opened = 0 # Times the breaker opened
+        self.refused = 0 # Calls refused while open
+
+    def _trim(self, now):
+        while self._calls and self._calls[0][0] < now - self.window_seconds:
+            _, ok = self._calls.popleft()
+            self._failures -= not ok
+
+    def _open(self, now):
+        self.state = OPEN
+        self._open_until = now + self._pause
+        self._trial_started = None
+        self.opened += 1
+        print(f"[Breaker] {self.name} opened for {self._pause:.0f}s.")
+
+    def available(self):
+        """False while open (does not use up the half-open trial call)."""
+        with self._lock:
+            return self.state != OPEN or time.monotonic() >= self._open_until
+
+    def allow(self):
+        """True if a call may be made now. In half-open state only one trial call is let through at a time."""
+        now = time.monotonic()
+        with self._lock:
+            if self.state == OPEN and now >= self._open_until:
+                self.state = HALF_OPEN
+            if self.state == HALF_OPEN:
+                # A trial call that never reported back (e.g. it raised something else) frees the slot eventually
+                if self._trial_started is None or now - self._trial_started > self.window_seconds:
+                    self._trial_started = now
+                    return True
+            elif self.state == CLOSED:
+                return True
+            self.refused += 1
+            return False
+
+    def record(self, ok):
+        now = time.monotonic()
+        with self._lock:
+            if self.state == HALF_OPEN:
+                if ok:
+                    print(f"[Breaker] {self.name} closed after a successful trial call.")
+                    self.state = CLOSED
+                    self._calls.clear()
+                    self._failures = 0
+                    self._pause = self.open_seconds
+                else:
+                    self._pause = min(self._pause * 2, self.max_open_seconds)
+                    self._open(now)
+                return
+            if self.state == OPEN:
+                return # A call that started before the breaker opened
+            self._calls.append((now, ok))
+            self._failures += not ok
+            self._trim(now)
+            if len(self._calls) >= self.min_calls and self._failures >= self.failure_rate * len(self._calls):
+                self._open(now)
+
+    def retry_in(self):
+        """Seconds until the next trial call (0 unless open)."""
+        with self._lock:
+            return max(0.0, self._open_until - time.monotonic()) if self.state == OPEN else 0.0
+
+    def snapshot(self):
+        now = time.monotonic()
+        with self._lock:
+            self._trim(now)
+            calls = len(self._calls)
+            return {
+                'state': HALF_OPEN if self.state == OPEN and now >= self._open_until else self.state,
+                'calls_in_window': calls,
+                'failure_rate': round(self._failures / calls, 3) if calls else None,
+                'retry_in_seconds': round(max(0.0, self._open_until - now), 1) if self.state == OPEN else 0.0,
+                'opened': self.opened,
+                'refused': self.refused,
+            }
+
+
+_breakers = {}
+_breakers_lock = threading.Lock()
+
+
+def get_breaker(name, **settings):
+    """
+    Returns this process's breaker for upstream `name`, creating it on first use.
+    `settings` (CircuitBreaker arguments) only apply when it is created.
+    """
+    breaker = _breakers.get(name)
+    if breaker is None:
+        with _breakers_lock:
+            breaker = _breakers.get(name)
+            if breaker is None:
+                breaker = _breakers[name] = CircuitBreaker(name, **settings)
+    return breaker
+
+
+def breaker_states():
+    """{upstream: snapshot} for every breaker created in this process, for /api/metrics."""
+    return {name: breaker.snapshot() for name, breaker in sorted(_breakers.items())}
@@ -0,0 +1,142 @@
+import os
+import json
+import time
+import zlib
+import sqlite3
+import threading
+
+from flask import current_app, has_app_context
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    key TEXT PRIMARY KEY,
+    value BLOB NOT NULL,
+    expires_at REAL NOT NULL
+)
+"""
+
+# Expired rows are swept every this many writes rather than on every set()
+_SWEEP_EVERY = 50
+
+
+class DiskCache:
+    """
+    Small keyed cache backed by one SQLite file, shared by every worker process on the host.
+
+    Values must be JSON-serialisable; they are stored zlib-compressed with a per-entry
+    expiry. Expired entries are ignored on read and swept periodically on write.
+    Hit/miss counters are per process.
+    """
+
+    def __init__(self, path, default_ttl=3600, compress_level=6):
+        self.path = path
+        self.default_ttl = default_ttl
+        self.compress_level = compress_level
+        self.hits = 0
+        self.misses = 0
+        self._local = threading.local()
+        self._writes = 0
+        self._counter_lock = threading.Lock()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute(_SCHEMA)
+
+    def _connect(self):
+        # sqlite3 connections may not cross threads, so each thread keeps its own
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+        return conn
+
+    def _count(self, hit):
+        with self._counter_lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def get(self, key, default=None):
+        row = self._connect().execute(
+            'SELECT value, expires_at FROM entries WHERE key = ?', (key,)
+        ).fetchone()
+        if row is None or row[1] < time.time():
+            self._count(False)
+            return default
+        try:
+            value = json.loads(zlib.decompress(row[0]))
+        except (zlib.error, ValueError) as e:
+            print(f"[Cache] Warning: dropping unreadable entry '{key}' in {self.path}: {e}")
+            self.delete(key)
+            self._count(False)
+            return default
+        self._count(True)
+        return value
+
+    def set(self, key, value, ttl=None):
+        payload = zlib.compress(
+            json.dumps(value, separators=(',', ':'), default=str).encode('utf-8'), self.compress_level
+        )
+        expires_at = time.time() + (ttl if ttl is not None else self.default_ttl)
+        with self._connect() as conn:
+            conn.execute(
+                'INSERT OR REPLACE INTO entries (key, value, expires_at) VALUES (?, ?, ?)',
+                (key, payload, expires_at),
+            )
+        with self._counter_lock:
+            self._writes += 1
+            sweep = self._writes % _SWEEP_EVERY == 0
+        if sweep:
+            self.evict_expired()
+
+    def delete(self, key):
+        with self._connect() as conn:
+            conn.execute('DELETE FROM entries WHERE key = ?', (key,))
+
+    def evict_expired(self):
+        with self._connect() as conn:
+            return conn.execute('DELETE FROM entries WHERE expires_at < ?', (time.time(),)).rowcount
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': round(self.hits / total, 3) if total else None,
+        }
+
+
+def get_cache(name, default_ttl=3600):
+    """
+    Returns this process's DiskCache for `name`, stored at <CACHE_DIR>/<name>.sqlite3.
+    Must be called inside an app context.
+    """
+    caches = current_app.extensions.setdefault('disk_caches', {})
+    cache = caches.get(name)
+    if cache is None:
+        path = os.path.join(current_app.config['CACHE_DIR'], f"{name}.sqlite3")
+        cache = caches.setdefault(name, DiskCache(path, default_ttl=default_ttl))
+    return cache
+
+
+def _negative_cache():
+    if not has_app_context():
+        return None
+    return get_cache('negative', default_ttl=current_app.config['NEGATIVE_CACHE_TTL'])
+
+
+def known_missing(upstream, key):
+    """True if `upstream` recently answered that it has nothing for `key` (e.g. a 404 for an artist page)."""
+    cache = _negative_cache()
+    return cache is not None and cache.get(f"{upstream}:{key}") is not None
+
+
+def remember_missing(upstream, key):
+    """Records that `upstream` has nothing for `key`, so it isn't asked again for NEGATIVE_CACHE_TTL."""
+    cache = _negative_cache()
+    if cache is not None:
+        cache.set(f"{upstream}:{key}", True)
@@ -13,14 +13,70 @@ class Config:
     SESSION_PERMANENT = False
     SESSION_USE_SIGNER = True
 
+    # Server-side cache shared by all workers (SQLite files, one per cache name)
+    CACHE_DIR = os.environ.get('CACHE_DIR') or './.diskcache/' # Not ./.cache, which is spotipy's token file
+    SIMILAR_POOL_TTL = int(os.environ.get('SIMILAR_POOL_TTL') or 3600) # Refreshed (incrementally) after this
+    SIMILAR_POOL_MAX_AGE = int(os.environ.get('SIMILAR_POOL_MAX_AGE') or 7 * 24 * 3600) # Dropped after this
+
+    # Background jobs (run in-process on a bounded thread pool, state kept in SQLite)
+    JOBS_DB = os.environ.get('JOBS_DB') or './.jobs/jobs.sqlite3'
+    JOB_WORKERS = int(os.environ.get('JOB_WORKERS') or 2) # Concurrent jobs per worker process
+    JOB_MAX_PENDING = int(os.environ.get('JOB_MAX_PENDING') or 20) # Queued + running per worker process
+    JOB_RETENTION = int(os.environ.get('JOB_RETENTION') or 24 * 3600) # Finished jobs are purged after this
+    JOB_STREAM_WINDOW = int(os.environ.get('JOB_STREAM_WINDOW') or 25) # Seconds per progress stream response
+
+    # Seconds the slow API routes (artist intel, labels, playlists, marketing strategy) may take before
+    # returning what they have; kept under gunicorn's worker timeout so partial results beat a killed worker
+    REQUEST_DEADLINE = float(os.environ.get('REQUEST_DEADLINE') or 90)
+
     # Spotify API Credentials (Client ID & Secret are needed for Client Credentials Flow)
     SPOTIPY_CLIENT_ID = os.environ.get('SPOTIPY_CLIENT_ID')
     SPOTIPY_CLIENT_SECRET = os.environ.get('SPOTIPY_CLIENT_SECRET')
     SPOTIPY_CACHE_PATH = os.environ.get('SPOTIPY_CACHE_PATH') or ".spotifycache" # Cache path might still be used
+    SPOTIFY_RATE_LIMIT = float(os.environ.get('SPOTIFY_RATE_LIMIT') or 10) # Average Web API calls per second, all workers on the host together
+    SPOTIFY_RATE_BURST = int(os.environ.get('SPOTIFY_RATE_BURST') or 10)
+    SPOTIFY_MAX_CONCURRENCY = int(os.environ.get('SPOTIFY_MAX_CONCURRENCY') or 6) # Calls in flight per worker process (lowered on 429s)
+    SPOTIFY_MAX_RETRIES = int(os.environ.get('SPOTIFY_MAX_RETRIES') or 3) # Retries of a call after a 429
+    SPOTIFY_MAX_RETRY_AFTER = float(os.environ.get('SPOTIFY_MAX_RETRY_AFTER') or 30) # Longer Retry-After pauses fail the call instead
+    SPOTIFY_GOVERNOR_DB = os.environ.get('SPOTIFY_GOVERNOR_DB') or './.spotify_governor/bucket.sqlite3' # Token bucket shared by workers
+    ALBUM_LABEL_TTL = int(os.environ.get('ALBUM_LABEL_TTL') or 30 * 24 * 3600) # Cached label per release
+    ARTIST_RELEASES_TTL = int(os.environ.get('ARTIST_RELEASES_TTL') or 24 * 3600) # Cached release ids per artist
+    PLAYLIST_FOLLOWERS_TTL = int(os.environ.get('PLAYLIST_FOLLOWERS_TTL') or 6 * 3600) # Cached follower count per playlist
+    PLAYLIST_SEARCH_BUDGET = float(os.environ.get('PLAYLIST_SEARCH_BUDGET') or 8) # Seconds /api/artist/<id>/playlists may spend
+    PLAYLIST_SEARCH_MAX_PAGES = int(os.environ.get('PLAYLIST_SEARCH_MAX_PAGES') or 3) # 50-result pages per keyword, budget permitting
+
+    # MusicBrainz (about 1 request/s, so responses are cached and peer lookups have a deadline)
+    MUSICBRAINZ_CACHE_TTL = int(os.environ.get('MUSICBRAINZ_CACHE_TTL') or 7 * 24 * 3600) # Cached MusicBrainz responses
+    MARKETING_PEER_DEADLINE = float(os.environ.get('MARKETING_PEER_DEADLINE') or 10) # Seconds before partial peer data is used
+
+    # Upstream failures (breaker settings are read from BREAKER_* in app/breaker.py)
+    NEGATIVE_CACHE_TTL = int(os.environ.get('NEGATIVE_CACHE_TTL') or 24 * 3600) # Remembered 404s / empty searches per upstream
+
+    # Identical upstream calls in flight at once are made only once (scraper calls across workers,
+    # Spotify calls within each worker); set SINGLEFLIGHT_LOCK_FILE to an empty string to
+    # coalesce them all within each worker only
+    SINGLEFLIGHT_LOCK_FILE = os.environ.get('SINGLEFLIGHT_LOCK_FILE', './.singleflight/upstream.lock')
+    SINGLEFLIGHT_WAIT = float(os.environ.get('SINGLEFLIGHT_WAIT') or 30) # Max seconds to wait on another worker's call
+    SINGLEFLIGHT_RESULT_TTL = int(os.environ.get('SINGLEFLIGHT_RESULT_TTL') or 60) # How long a handed-over result is kept
 
     # Gemini API
     GEMINI_API_KEY = os.environ.get("GEMINI_API_KEY")
     GEMINI_MODEL_NAME = os.environ.get("GEMINI_MODEL_NAME") or "gemini-2.0-flash-lite"
+    LLM_MAX_CONCURRENCY = int(os.environ.get('LLM_MAX_CONCURRENCY') or 4) # Gemini calls in flight per worker process
+    LLM_TIMEOUT = int(os.environ.get('LLM_TIMEOUT') or 90) # Seconds per Gemini request
+    # Seconds a Gemini response is reused for an identical prompt, per call type (0 = never cached).
+    # Email variations are sampled at temperature 0.8 so "generate" gives fresh wording each time.
+    LLM_CACHE_TTL = {
+        'artist_bio': int(os.environ.get('LLM_CACHE_TTL_ARTIST_BIO') or 7 * 24 * 3600),
+        'intent': int(os.environ.get('LLM_CACHE_TTL_INTENT') or 30 * 24 * 3600),
+        'label_pitch': int(os.environ.get('LLM_CACHE_TTL_LABEL_PITCH') or 24 * 3600),
+        'marketing_strategy': int(os.environ.get('LLM_CACHE_TTL_MARKETING_STRATEGY') or 24 * 3600),
+        'playlist_filter': int(os.environ.get('LLM_CACHE_TTL_PLAYLIST_FILTER') or 7 * 24 * 3600),
+        'email_variations': int(os.environ.get('LLM_CACHE_TTL_EMAIL_VARIATIONS') or 0),
+    }
+
+    # Genre clusters per language in one batch email generation request (the rest share a general pitch)
+    EMAIL_BATCH_MAX_CLUSTERS = int(os.environ.get('EMAIL_BATCH_MAX_CLUSTERS') or 6)
 
     # PlaylistSupply Credentials (USE WITH EXTREME CAUTION)
     PLAYLIST_SUPPLY_USER = os.environ.get("PLAYLIST_SUPPLY_USER")
@@ -31,4 +87,23 @@ class Config:
     SENDER_PASSWORD = os.environ.get("SENDER_PASSWORD") # Use App Password for Gmail
     SMTP_LOGIN_USER = os.environ.get("SMTP_LOGIN_USER") # <-- ADD THIS LINE
     SMTP_SERVER = os.environ.get("SMTP_SERVER") or "smtp.gmail.com"
-    SMTP_PORT = int(os.environ.get("SMTP_PORT") or 587)
\ No newline at end of file
+    SMTP_PORT = int(os.environ.get("SMTP_PORT") or 587)
+    SMTP_USE_TLS = (os.environ.get("SMTP_USE_TLS") or "1").lower() not in ("0", "false", "no") # STARTTLS on non-465 ports
+
+    # Email outbox (queued in SQLite, delivered by one sender thread per host)
+    OUTBOX_DB = os.environ.get('OUTBOX_DB') or './.outbox/outbox.sqlite3'
+    OUTBOX_SENDER_ENABLED = (os.environ.get("OUTBOX_SENDER_ENABLED") or "1").lower() not in ("0", "false", "no") # Off for scripts/one-off app contexts
+    OUTBOX_MIN_INTERVAL = float(os.environ.get('OUTBOX_MIN_INTERVAL') or 25) # Random pause between emails...
+    OUTBOX_MAX_INTERVAL = float(os.environ.get('OUTBOX_MAX_INTERVAL') or 60) # ...for deliverability
+    OUTBOX_MAX_ATTEMPTS = int(os.environ.get('OUTBOX_MAX_ATTEMPTS') or 5)
+    OUTBOX_RETRY_DELAY = float(os.environ.get('OUTBOX_RETRY_DELAY') or 60) # Doubled after each failed attempt
+    OUTBOX_IDLE_TIMEOUT = float(os.environ.get('OUTBOX_IDLE_TIMEOUT') or 240) # Close the SMTP connection after this
+
+    # Local full-text index of every playlist seen (SQLite FTS5), for instant results before a live search finishes
+    PLAYLIST_INDEX_DB = os.environ.get('PLAYLIST_INDEX_DB') or './.playlist_index/playlists.sqlite3'
+    PLAYLIST_INDEX_FOLLOWER_WEIGHT = float(os.environ.get('PLAYLIST_INDEX_FOLLOWER_WEIGHT') or 0.15) # Per ln(1 + followers), added to BM25
+    PLAYLIST_INDEX_LIMIT = int(os.environ.get('PLAYLIST_INDEX_LIMIT') or 200) # Local results shown per search
+
+    # Tag co-occurrence model (Last.fm tags + Spotify genres) used to expand AI filter queries
+    TAG_MODEL_DB = os.environ.get('TAG_MODEL_DB') or './.tag_model/tags.sqlite3'
+    TAG_MODEL_REFRESH = int(os.environ.get('TAG_MODEL_REFRESH') or 300) # Seconds between checks for new observations
\ No newline at end of file
@@ -0,0 +1,151 @@
+import time
+import functools
+import contextvars
+from contextlib import contextmanager
+
+from flask import current_app
+
+# Upstream calls are not started with less than this many seconds left
+MIN_TIMEOUT = 1.0
+
+_current = contextvars.ContextVar('request_deadline', default=None)
+
+
+class DeadlineExceeded(TimeoutError):
+    """Raised when an upstream call would start after the current request's deadline."""
+
+
+class Deadline:
+    """
+    A point in time (time.monotonic()) by which the current request must have answered.
+
+    Upstream clients shrink their timeouts to what is left and optional steps are skipped
+    once it gets close; whatever was left out is recorded in `incomplete` so the route can
+    return partial results flagged as such.
+    """
+
+    def __init__(self, seconds):
+        self.seconds = seconds
+        self.expires_at = time.monotonic() + seconds
+        self.incomplete = []
+
+    def remaining(self):
+        return max(0.0, self.expires_at - time.monotonic())
+
+    @property
+    def expired(self):
+        return self.remaining() <= 0
+
+    def mark_incomplete(self, part):
+        if part not in self.incomplete:
+            self.incomplete.append(part)
+
+
+@contextmanager
+def deadline_scope(seconds):
+    """
+    Runs the enclosed block with a deadline `seconds` from now (nested scopes only ever shorten
+    it). A nested scope reports incomplete upstreams to the outer one, whichever ends first.
+    """
+    outer = _current.get()
+    deadline = Deadline(seconds)
+    if outer is not None:
+        deadline.expires_at = min(deadline.expires_at, outer.expires_at)
+        deadline.incomplete = outer.incomplete
+    token = _current.set(deadline)
+    try:
+        yield deadline
+    finally:
+        _current.reset(token)
+
+
+def with_deadline(view):
+    """Gives a view REQUEST_DEADLINE seconds to answer."""
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        with deadline_scope(current_app.config['REQUEST_DEADLINE']):
+            return view(*args, **kwargs)
+    return wrapper
+
+
+def current_deadline():
+    return _current.get()
+
+
+def clamp_timeout(timeout, minimum=MIN_TIMEOUT, part=None):
+    """
+    The timeout to use for an upstream call: `timeout`, shortened to the time left.
+    Raises DeadlineExceeded if less than `minimum` seconds remain (recording `part` as
+    incomplete). A (connect, read) tuple is clamped element-wise.
+    """
+    deadline = _current.get()
+    if deadline is None:
+        return timeout
+    left = deadline.remaining()
+    if left < minimum:
+        if part:
+            deadline.mark_incomplete(part)
+        raise DeadlineExceeded(f"Request deadline reached ({deadline.seconds:.0f}s budget)")
+    if isinstance(timeout, tuple):
+        return tuple(left if t is None else min(t, left) for t in timeout)
+    return left if timeout is None else min(timeout, left)
+
+
+def has_time(seconds, part=None):
+    """
+    True if at least `seconds` remain (always, outside a deadline). Used to skip optional
+    work; when it returns False and `part` is given, `part` is recorded as incomplete.
+    """
+    deadline = _current.get()
+    if deadline is None or deadline.remaining() >= seconds:
+        return True
+    if part:
+        deadline.mark_incomplete(part)
+    return False
+
+
+def mark_incomplete(part):
+    """Records that `part` of the response was left out or cut short (no-op outside a deadline)."""
+    deadline = _current.get()
+    if deadline is not None:
+        deadline.mark_incomplete(part)
+
+
+def incomplete_parts():
+    deadline = _current.get()
+    return list(deadline.incomplete) if deadline is not None else []
+
+
+def within_deadline(iterable, deadline):
+    """
+    Iterates `iterable` (e.g. a streamed response body) with `deadline` in force while each
+    item is produced, since a generator's body runs after the view that created it returned.
+    """
+    iterator = iter(iterable)
+    try:
+        while True:
+            token = _current.set(deadline)
+            try:
+                item = next(iterator)
+            except StopIteration:
+                return
+            finally:
+                _current.reset(token)
+            yield item
+    finally:
+        close = getattr(iterator, 'close', None)
+        if close is not None:
+            close()
+
+
+def bind_context(func):
+    """
+    Wraps func so it runs in a copy of the caller's context (deadline included) in
+    whichever thread calls it. ThreadPoolExecutor does not carry contextvars over by itself.
+    """
+    context = contextvars.copy_context()
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        return context.copy().run(func, *args, **kwargs)
+    return wrapper
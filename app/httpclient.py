@@ -0,0 +1,74 @@
+import os
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from .breaker import CircuitOpen, get_breaker
+from .deadline import clamp_timeout, mark_incomplete
+
+# Connections kept open per upstream host. The requests default of 10 is smaller than the
+# number of requests a gthread/gevent worker serves at once, which makes urllib3 discard
+# and reopen connections under load.
+POOL_SIZE = int(os.environ.get('HTTP_POOL_SIZE') or 50)
+DEFAULT_TIMEOUT = 30 # For calls that don't pass their own
+SERVER_ERRORS = range(500, 600)
+
+
+class DeadlineSession(requests.Session):
+    """
+    requests.Session whose timeouts are shortened to the current request deadline.
+
+    Raises DeadlineExceeded instead of starting a request too close to it. Either that
+    or a timeout marks `upstream` as incomplete for the current request, so the route can
+    flag its partial result even though the client module swallows the error.
+
+    Calls also go through the upstream's circuit breaker: connection errors, timeouts and
+    responses with a status in `failure_statuses` count as failures, and while the
+    breaker is open requests fail straight away with CircuitOpen.
+    """
+
+    def __init__(self, upstream=None, failure_statuses=SERVER_ERRORS):
+        super().__init__()
+        self.upstream = upstream
+        self.failure_statuses = failure_statuses
+
+    def breaker(self, url=None):
+        return get_breaker(self.upstream or urlsplit(url).hostname)
+
+    def available(self):
+        """False while this upstream's breaker is open, so callers can skip work leading up to a call."""
+        return self.upstream is None or self.breaker().available()
+
+    def request(self, method, url, **kwargs):
+        upstream = self.upstream or urlsplit(url).hostname
+        kwargs['timeout'] = clamp_timeout(kwargs.get('timeout') or DEFAULT_TIMEOUT, part=upstream)
+        breaker = self.breaker(url)
+        if not breaker.allow():
+            mark_incomplete(upstream)
+            raise CircuitOpen(f"{upstream} is failing; not calling it for another {breaker.retry_in():.0f}s")
+        try:
+            response = super().request(method, url, **kwargs)
+        except requests.RequestException as e:
+            breaker.record(False)
+            if isinstance(e, requests.Timeout):
+                mark_incomplete(upstream)
+            raise
+        breaker.record(response.status_code not in self.failure_statuses)
+        return response
+
+
+def make_session(headers=None, upstream=None, failure_statuses=SERVER_ERRORS):
+    """
+    Returns a requests.Session for a module-level upstream client, sized for concurrent use.
+
+    Sessions are shared by every request thread (or greenlet, under gevent workers) in the
+    process, so the connection pool is sized to the worker's concurrency.
+    """
+    session = DeadlineSession(upstream, failure_statuses)
+    adapter = HTTPAdapter(pool_connections=POOL_SIZE, pool_maxsize=POOL_SIZE)
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    if headers:
+        session.headers.update(headers)
+    return session
@@ -0,0 +1,9 @@
+from flask import Blueprint
+
+# JSON/SSE API for background jobs, registered under /api/jobs
+jobs_bp = Blueprint('jobs', __name__, url_prefix='/api/jobs')
+
+from .runner import job_handler, JobFailed, JobQueueFull, init_jobs, get_job_runner  # noqa: E402,F401
+
+# Import routes after blueprint creation
+from .routes import job_urls, submit_job  # noqa: E402,F401
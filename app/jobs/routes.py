@@ -0,0 +1,80 @@
+from flask import request, jsonify, url_for, current_app
+
+from . import jobs_bp
+from .runner import get_job_runner, JobQueueFull
+from .store import FINISHED_STATUSES, DONE
+from ..sse import event_log_response
+
+
+def job_urls(job_id):
+    return {
+        'job_id': job_id,
+        'status_url': url_for('jobs.job_status', job_id=job_id),
+        'events_url': url_for('jobs.job_events', job_id=job_id),
+        'result_url': url_for('jobs.job_result', job_id=job_id),
+    }
+
+
+def submit_job(kind, params):
+    """Submits a job and returns the 202 response (or 503 when this worker is saturated)."""
+    try:
+        job_id = get_job_runner().submit(kind, params)
+    except JobQueueFull:
+        response = jsonify({'error': 'The server is busy with other jobs. Please try again shortly.'})
+        response.headers['Retry-After'] = '30'
+        return response, 503
+    return jsonify({'status': 'queued', **job_urls(job_id)}), 202
+
+
+@jobs_bp.route('/<kind>', methods=['POST'])
+def submit(kind):
+    params = request.get_json(silent=True) or {}
+    if not isinstance(params, dict):
+        return jsonify({'error': 'Job parameters must be a JSON object.'}), 400
+    try:
+        return submit_job(kind, params)
+    except KeyError:
+        return jsonify({'error': f"Unknown job type '{kind}'."}), 404
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+
+@jobs_bp.route('/<job_id>', methods=['GET'])
+def job_status(job_id):
+    job = get_job_runner().store.get(job_id)
+    if job is None:
+        return jsonify({'error': 'Job not found.'}), 404
+    return jsonify({
+        'job_id': job['id'], 'kind': job['kind'], 'status': job['status'],
+        'progress': job['progress'], 'message': job['message'], 'error': job['error'],
+    })
+
+
+@jobs_bp.route('/<job_id>/result', methods=['GET'])
+def job_result(job_id):
+    job = get_job_runner().store.get(job_id)
+    if job is None:
+        return jsonify({'error': 'Job not found.'}), 404
+    if job['status'] not in FINISHED_STATUSES:
+        return jsonify({'status': job['status'], 'progress': job['progress']}), 202
+    if job['status'] != DONE:
+        return jsonify({'status': job['status'], 'error': job['error']}), 500
+    return jsonify(job['result'])
+
+
+@jobs_bp.route('/<job_id>/events', methods=['GET'])
+def job_events(job_id):
+    """
+    Server-sent progress events for a job. Each response streams for at most
+    JOB_STREAM_WINDOW seconds so a sync worker is never held for long; EventSource
+    reconnects on its own and resumes from Last-Event-ID.
+    """
+    store = get_job_runner().store
+    if store.get(job_id) is None:
+        return jsonify({'error': 'Job not found.'}), 404
+    after_seq = request.headers.get('Last-Event-ID', type=int) or request.args.get('after', default=0, type=int)
+    return event_log_response(
+        lambda seq: store.events_after(job_id, seq),
+        lambda: store.get(job_id)['status'] in FINISHED_STATUSES,
+        after_seq, current_app.config['JOB_STREAM_WINDOW'],
+    )
@@ -0,0 +1,130 @@
+import time
+import inspect
+import threading
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+
+from flask import current_app
+
+from .store import JobStore, RUNNING, DONE, FAILED
+
+# Job kind -> handler(job, **params). Filled in by @job_handler in the blueprint modules.
+_handlers = {}
+
+
+def job_handler(kind):
+    """Registers a function as the handler for a job kind. It is called as handler(job, **params)."""
+    def decorator(func):
+        _handlers[kind] = func
+        return func
+    return decorator
+
+
+class JobFailed(Exception):
+    """Raised by a handler to fail its job with a message that is safe to show the user."""
+
+
+class JobQueueFull(RuntimeError):
+    """Raised when this process already has JOB_MAX_PENDING jobs queued or running."""
+
+
+class JobContext:
+    """Handed to job handlers for reporting progress and streaming events to the client."""
+
+    def __init__(self, store, job_id):
+        self.store = store
+        self.id = job_id
+
+    def progress(self, percent, message):
+        percent = max(0, min(100, int(percent)))
+        self.store.update(self.id, progress=percent, message=message)
+        self.store.add_event(self.id, 'progress', {'percent': percent, 'message': message})
+
+    def event(self, name, data):
+        self.store.add_event(self.id, name, data)
+
+
+class JobRunner:
+    """
+    Runs registered job handlers on a bounded thread pool inside this worker process.
+
+    Jobs outlive the request that submitted them; state and events go to the JobStore
+    so any worker can report on them. At most `max_pending` jobs may be queued or
+    running per process, and `max_workers` run at once.
+    """
+
+    def __init__(self, app, store, max_workers=2, max_pending=20):
+        self.app = app
+        self.store = store
+        self.max_pending = max_pending
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='job')
+        self._pending = 0
+        self._lock = threading.Lock()
+
+    def submit(self, kind, params):
+        """
+        Queues a job and returns its id. Raises KeyError for unknown kinds, ValueError for
+        parameters the handler does not accept, and JobQueueFull when this process is saturated.
+        """
+        if kind not in _handlers:
+            raise KeyError(kind)
+        try:
+            inspect.signature(_handlers[kind]).bind(None, **params)
+        except TypeError as e:
+            raise ValueError(f"Invalid parameters for '{kind}' job: {e}") from e
+        with self._lock:
+            if self._pending >= self.max_pending:
+                raise JobQueueFull(f"{self._pending} jobs already pending.")
+            self._pending += 1
+        try:
+            job_id = self.store.create(kind, params)
+            self._executor.submit(self._run, job_id, kind, params)
+        except Exception:
+            with self._lock:
+                self._pending -= 1
+            raise
+        print(f"[Jobs] Queued {kind} job {job_id}.")
+        return job_id
+
+    def _run(self, job_id, kind, params):
+        store = self.store
+        job = JobContext(store, job_id)
+        start_time = time.time()
+        try:
+            with self.app.app_context():
+                store.update(job_id, status=RUNNING)
+                store.add_event(job_id, 'status', {'status': RUNNING})
+                result = _handlers[kind](job, **params)
+            store.update(job_id, status=DONE, progress=100, result=result)
+            store.add_event(job_id, 'end', {'status': DONE})
+            print(f"[Jobs] {kind} job {job_id} finished in {time.time() - start_time:.1f}s.")
+        except Exception as e:
+            if isinstance(e, JobFailed):
+                error = str(e)
+            else:
+                traceback.print_exc()
+                error = f"Unexpected error: {e}"
+            print(f"[Jobs] {kind} job {job_id} failed: {error}")
+            store.update(job_id, status=FAILED, error=error)
+            store.add_event(job_id, 'end', {'status': FAILED, 'error': error})
+        finally:
+            with self._lock:
+                self._pending -= 1
+
+
+def init_jobs(app):
+    """Creates this process's job store and runner and clears out jobs left behind by dead workers."""
+    store = JobStore(app.config['JOBS_DB'])
+    orphaned = store.fail_orphaned()
+    purged = store.purge(time.time() - app.config['JOB_RETENTION'])
+    if orphaned or purged:
+        print(f"[Jobs] Marked {orphaned} orphaned jobs as failed, purged {purged} old jobs.")
+    app.extensions['job_runner'] = JobRunner(
+        app, store,
+        max_workers=app.config['JOB_WORKERS'],
+        max_pending=app.config['JOB_MAX_PENDING'],
+    )
+
+
+def get_job_runner():
+    return current_app.extensions['job_runner']
@@ -0,0 +1,173 @@
+import os
+import json
+import time
+import uuid
+import sqlite3
+import threading
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    status TEXT NOT NULL,
+    params TEXT NOT NULL,
+    progress INTEGER NOT NULL DEFAULT 0,
+    message TEXT,
+    result TEXT,
+    error TEXT,
+    owner_pid INTEGER,
+    owner_token TEXT,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS job_events (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    job_id TEXT NOT NULL,
+    event TEXT NOT NULL,
+    data TEXT NOT NULL,
+    created_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS job_events_job ON job_events (job_id, seq);
+"""
+
+QUEUED = 'queued'
+RUNNING = 'running'
+DONE = 'done'
+FAILED = 'failed'
+FINISHED_STATUSES = (DONE, FAILED)
+
+_JOB_COLUMNS = 'id, kind, status, params, progress, message, result, error, created_at, updated_at'
+
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _process_token(pid):
+    """
+    Identifies the process running as `pid`: the boot id plus the process's start time,
+    so a pid reused after a restart (or a reboot) gives a different token. None where
+    /proc is not available.
+    """
+    try:
+        with open('/proc/sys/kernel/random/boot_id') as f:
+            boot_id = f.read().strip()
+        with open(f'/proc/{pid}/stat') as f:
+            # Fields after the command name, which may itself contain spaces or parentheses
+            fields = f.read().rsplit(')', 1)[1].split()
+        return f"{boot_id}:{fields[19]}"
+    except (OSError, IndexError):
+        return None
+
+
+def _owner_gone(pid, token):
+    if not pid or not _pid_alive(pid):
+        return True
+    # The pid is in use, but maybe by a different process than the one that owned the job
+    return token is not None and _process_token(pid) != token
+
+
+class JobStore:
+    """
+    SQLite-backed job state and progress events, shared by every worker process on the host.
+
+    A job row holds its status, last progress and final result; job_events is an
+    append-only log that progress streams read from, so a client can follow a job from
+    any worker and resume after reconnecting.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._connect() as conn:
+            conn.executescript(_SCHEMA)
+            columns = {row['name'] for row in conn.execute('PRAGMA table_info(jobs)')}
+            if 'owner_token' not in columns: # Stores created when jobs were owned by pid alone
+                conn.execute('ALTER TABLE jobs ADD COLUMN owner_token TEXT')
+
+    def _connect(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10)
+            conn.row_factory = sqlite3.Row
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+        return conn
+
+    def create(self, kind, params):
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        pid = os.getpid()
+        with self._connect() as conn:
+            conn.execute(
+                'INSERT INTO jobs (id, kind, status, params, owner_pid, owner_token, created_at, updated_at) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+                (job_id, kind, QUEUED, json.dumps(params), pid, _process_token(pid), now, now),
+            )
+        return job_id
+
+    def get(self, job_id):
+        row = self._connect().execute(f'SELECT {_JOB_COLUMNS} FROM jobs WHERE id = ?', (job_id,)).fetchone()
+        if row is None:
+            return None
+        job = dict(row)
+        job['params'] = json.loads(job['params'])
+        job['result'] = json.loads(job['result']) if job['result'] is not None else None
+        return job
+
+    def update(self, job_id, **fields):
+        if 'result' in fields:
+            fields['result'] = json.dumps(fields['result'], default=str)
+        fields['updated_at'] = time.time()
+        assignments = ', '.join(f"{column} = ?" for column in fields)
+        with self._connect() as conn:
+            conn.execute(f'UPDATE jobs SET {assignments} WHERE id = ?', (*fields.values(), job_id))
+
+    def add_event(self, job_id, event, data):
+        with self._connect() as conn:
+            conn.execute(
+                'INSERT INTO job_events (job_id, event, data, created_at) VALUES (?, ?, ?, ?)',
+                (job_id, event, json.dumps(data, default=str), time.time()),
+            )
+
+    def events_after(self, job_id, after_seq=0, limit=200):
+        rows = self._connect().execute(
+            'SELECT seq, event, data FROM job_events WHERE job_id = ? AND seq > ? ORDER BY seq LIMIT ?',
+            (job_id, after_seq, limit),
+        ).fetchall()
+        return [(row['seq'], row['event'], json.loads(row['data'])) for row in rows]
+
+    def fail_orphaned(self):
+        """
+        Marks unfinished jobs whose owning process is gone as failed. Returns how many.
+        A job counts as orphaned when its owner's pid is dead or now belongs to another
+        process (its process token no longer matches).
+        """
+        rows = self._connect().execute(
+            'SELECT id, owner_pid, owner_token FROM jobs WHERE status IN (?, ?)', (QUEUED, RUNNING)
+        ).fetchall()
+        orphaned = [row['id'] for row in rows if _owner_gone(row['owner_pid'], row['owner_token'])]
+        for job_id in orphaned:
+            self.update(job_id, status=FAILED, error='Interrupted by a server restart.')
+            self.add_event(job_id, 'end', {'status': FAILED, 'error': 'Interrupted by a server restart.'})
+        return len(orphaned)
+
+    def purge(self, older_than):
+        """Deletes finished jobs (and their events) last updated before `older_than`."""
+        with self._connect() as conn:
+            stale = [row['id'] for row in conn.execute(
+                'SELECT id FROM jobs WHERE status IN (?, ?) AND updated_at < ?', (DONE, FAILED, older_than)
+            )]
+            conn.executemany('DELETE FROM job_events WHERE job_id = ?', [(job_id,) for job_id in stale])
+            conn.executemany('DELETE FROM jobs WHERE id = ?', [(job_id,) for job_id in stale])
+        return len(stale)
@@ -8,8 +8,14 @@ import time
 import random # Import random for delays
 import re
 
-# Use a persistent session for requests
-SESSION = requests.Session()
+from ..cache import known_missing, remember_missing
+from ..httpclient import make_session
+from ..singleflight import coalesced
+from ..deadline import has_time, MIN_TIMEOUT
+
+# Use a persistent session for requests. 403/406/429 mean Last.fm is blocking us, so they
+# count against its circuit breaker along with server errors.
+SESSION = make_session(upstream='lastfm', failure_statuses={403, 406, 429, *range(500, 600)})
 
 # --- UPDATED Headers (Mimic Browser More Closely) ---
 SESSION.headers.update({
@@ -40,10 +46,13 @@ SESSION.headers.update({
 def _add_random_delay(min_sec=0.8, max_sec=2.5):
     """Adds a random delay to mimic human browsing."""
     delay = random.uniform(min_sec, max_sec)
+    if not has_time(delay + MIN_TIMEOUT) or not SESSION.available():
+        return # Politeness delays are the first thing dropped near a request deadline (or before a refused call)
     # print(f"    -> Waiting {delay:.2f}s...") # Optional: uncomment for debugging
     time.sleep(delay)
 
 
+@coalesced('lastfm_similar')
 def scrape_all_lastfm_similar_artists_names(artist_name, max_pages=5):
     """
     Scrapes similar artists for a given artist from ALL Last.fm pages (up to max_pages).
@@ -67,12 +76,15 @@ def scrape_all_lastfm_similar_artists_names(artist_name, max_pages=5):
             return [] if page > 1 else None
 
         artists_found_on_page = 0
+        if known_missing('lastfm', url):
+            break
         try:
             _add_random_delay(1.0, 3.0) # Longer delay between page loads
             response = SESSION.get(url, timeout=20)
 
             if response.status_code == 404:
                 print(f"[Last.fm Scraper]  Page {page} returned 404. Assuming end of results or invalid artist.")
+                remember_missing('lastfm', url)
                 break
 
             # Explicitly check for 406 after the request, before raise_for_status
@@ -137,6 +149,7 @@ def scrape_all_lastfm_similar_artists_names(artist_name, max_pages=5):
     return final_list
 
 
+@coalesced('lastfm_events')
 def scrape_lastfm_upcoming_events(artist_name):
     """
     Scrapes upcoming events for a given artist from Last.fm using the table structure.
@@ -155,12 +168,15 @@ def scrape_lastfm_upcoming_events(artist_name):
         return []
 
     events = []
+    if known_missing('lastfm', url):
+        return []
     try:
         _add_random_delay() # Add delay before the request
         response = SESSION.get(url, timeout=15) # Uses updated SESSION headers
 
         if response.status_code == 404:
              print(f"[Last.fm Events] Page not found (404) for '{artist_name}' events.")
+             remember_missing('lastfm', url)
              return []
 
         # Check for 406 specifically
@@ -230,6 +246,7 @@ def scrape_lastfm_upcoming_events(artist_name):
         return []
 
 
+@coalesced('lastfm_tags')
 def scrape_lastfm_tags(artist_name):
     """
     Scrapes artist tags from Last.fm.
@@ -248,12 +265,15 @@ def scrape_lastfm_tags(artist_name):
         return []
 
     tags = []
+    if known_missing('lastfm', url):
+        return []
     try:
         _add_random_delay() # Add delay before the request
         response = SESSION.get(url, timeout=15) # Uses updated SESSION headers
 
         if response.status_code == 404:
             print(f"[Last.fm Tags] Page not found (404) for '{artist_name}' tags.")
+            remember_missing('lastfm', url)
             return []
 
         # Check for 406 specifically
@@ -294,6 +314,7 @@ def scrape_lastfm_tags(artist_name):
         traceback.print_exc()
         return []
 
+@coalesced('lastfm_stats')
 def scrape_lastfm_artist_stats(artist_name):
     """
     Scrape Last.fm artist page for listener count and total scrobbles.
@@ -308,10 +329,14 @@ def scrape_lastfm_artist_stats(artist_name):
     except Exception:
         return {}
 
+    if known_missing('lastfm', url):
+        return {}
     try:
         _add_random_delay(0.5, 1.2)
         response = SESSION.get(url, timeout=15)
 
+        if response.status_code == 404:
+            remember_missing('lastfm', url)
         if response.status_code in (404, 406):
             return {}
         response.raise_for_status()
@@ -0,0 +1,294 @@
+import os
+import re
+import math
+import time
+import sqlite3
+import threading
+from collections import defaultdict
+
+from flask import current_app
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS artists (
+    artist_key TEXT PRIMARY KEY,
+    name TEXT NOT NULL,
+    popularity INTEGER,
+    updated REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS artist_tags (
+    artist_key TEXT NOT NULL,
+    source TEXT NOT NULL, -- 'lastfm' or 'spotify'
+    tag TEXT NOT NULL,
+    weight REAL NOT NULL,
+    PRIMARY KEY (artist_key, source, tag)
+);
+"""
+
+_NON_WORD = re.compile(r'[\W_]+')
+
+# Tags kept per artist when counting co-occurrences (bounds the pairs per artist)
+_TAGS_PER_ARTIST = 15
+# Neighbours and artists precomputed per tag
+_NEIGHBOURS_PER_TAG = 10
+_ARTISTS_PER_TAG = 60
+_MAX_NGRAM = 4
+
+
+def normalize_tag(tag):
+    """'Hip-Hop', 'hip hop' and 'HIP_HOP' all become 'hip hop'."""
+    return _NON_WORD.sub(' ', str(tag).lower()).strip()
+
+
+def _lastfm_weight(rank):
+    """Last.fm lists tags most-applied first; later tags count for less."""
+    return 1.0 / (1.0 + 0.15 * rank)
+
+
+class Expansion:
+    """Result of TagModel.expand(): what the query matched and what it expands to."""
+    __slots__ = ('tags', 'related_tags', 'artists')
+
+    def __init__(self, tags, related_tags, artists):
+        self.tags = tags # Known tags found in the query
+        self.related_tags = related_tags # [(tag, cosine similarity)], best first
+        self.artists = artists # Representative artist names, best first
+
+    def __bool__(self):
+        return bool(self.tags)
+
+
+class TagModel:
+    """
+    Sparse tag x artist and tag x tag co-occurrence model built from the Last.fm tags
+    and Spotify genres the app has already fetched.
+
+    Each tag is a vector over artists (Last.fm tags weighted by their rank on the
+    artist's tag page, Spotify genres 1.0). Tag x tag co-occurrence is the dot product
+    of those vectors, and neighbours are ranked by cosine similarity. Neighbours and top
+    artists are precomputed per tag when the model is built, so expand() is a handful
+    of dict lookups.
+    """
+
+    def __init__(self, rows, popularity):
+        """rows: (artist_name, tag, weight); popularity: {artist_name: 0-100 or None}."""
+        artist_tags = defaultdict(dict)
+        for artist, tag, weight in rows:
+            tag = normalize_tag(tag)
+            if tag:
+                tags = artist_tags[artist]
+                tags[tag] = max(weight, tags.get(tag, 0))
+
+        tag_artists = defaultdict(dict)
+        cooccurrence = defaultdict(lambda: defaultdict(float))
+        for artist, tags in artist_tags.items():
+            top = sorted(tags.items(), key=lambda item: -item[1])[:_TAGS_PER_ARTIST]
+            for i, (tag, weight) in enumerate(top):
+                tag_artists[tag][artist] = weight
+                for other, other_weight in top[i + 1:]:
+                    cooccurrence[tag][other] += weight * other_weight
+                    cooccurrence[other][tag] += weight * other_weight
+        norms = {tag: math.sqrt(sum(w * w for w in artists.values())) for tag, artists in tag_artists.items()}
+
+        self.neighbours = {}
+        for tag, others in cooccurrence.items():
+            similar = [(other, dot / (norms[tag] * norms[other])) for other, dot in others.items()]
+            similar.sort(key=lambda item: -item[1])
+            self.neighbours[tag] = [(other, round(sim, 3)) for other, sim in similar[:_NEIGHBOURS_PER_TAG]]
+
+        # An artist's relevance to a tag: its tag weight, nudged up by popularity so
+        # well-known artists (the ones playlist titles and descriptions name) lead
+        self.top_artists = {}
+        for tag, artists in tag_artists.items():
+            ranked = sorted(
+                ((weight * (1.0 + (popularity.get(artist) or 0) / 100.0), artist) for artist, weight in artists.items()),
+                reverse=True,
+            )
+            self.top_artists[tag] = [(artist, score) for score, artist in ranked[:_ARTISTS_PER_TAG]]
+
+        self.artist_count = len(artist_tags)
+        self.tag_count = len(tag_artists)
+
+    def known_tags(self, query):
+        """Tags in the query, longest match first ("indie pop" rather than "indie" and "pop")."""
+        words = normalize_tag(query).split()
+        found = []
+        i = 0
+        while i < len(words):
+            for n in range(min(_MAX_NGRAM, len(words) - i), 0, -1):
+                phrase = ' '.join(words[i:i + n])
+                if phrase in self.top_artists:
+                    found.append(phrase)
+                    i += n
+                    break
+            else:
+                i += 1
+        return list(dict.fromkeys(found))
+
+    def expand(self, query, max_artists=30, max_related=8):
+        """
+        Expands a free-text query into related tags and representative artists.
+        Returns an Expansion that is falsy when the query contains no known tag.
+        """
+        tags = self.known_tags(query)
+        if not tags:
+            return Expansion([], [], [])
+        related = {}
+        for tag in tags:
+            for other, sim in self.neighbours.get(tag, ()):
+                if other not in tags:
+                    related[other] = max(sim, related.get(other, 0))
+        related_tags = sorted(related.items(), key=lambda item: -item[1])[:max_related]
+
+        artist_scores = defaultdict(float)
+        for tag, tag_weight in [*((tag, 1.0) for tag in tags), *related_tags]:
+            for artist, score in self.top_artists[tag]:
+                artist_scores[artist] += tag_weight * score
+        artists = sorted(artist_scores, key=lambda artist: -artist_scores[artist])[:max_artists]
+        return Expansion(tags, related_tags, artists)
+
+
+class TagModelStore:
+    """
+    The observations a TagModel is built from, in SQLite so every worker process
+    contributes to and builds from the same data. Each observation replaces what was
+    previously recorded for that artist from the same source.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._connect() as conn:
+            conn.executescript(_SCHEMA)
+
+    def _connect(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+        return conn
+
+    def record(self, observations):
+        """
+        observations: iterable of (artist_name, source, [(tag, weight)], popularity).
+        Observations with no tags are skipped.
+        """
+        now = time.time()
+        written = 0
+        with self._connect() as conn:
+            for name, source, tags, popularity in observations:
+                key = normalize_tag(name)
+                tags = [(normalize_tag(tag), weight) for tag, weight in tags if normalize_tag(tag)]
+                if not key or not tags:
+                    continue
+                conn.execute(
+                    'INSERT INTO artists (artist_key, name, popularity, updated) VALUES (?, ?, ?, ?) '
+                    'ON CONFLICT(artist_key) DO UPDATE SET name = excluded.name, '
+                    'popularity = COALESCE(excluded.popularity, artists.popularity), updated = excluded.updated',
+                    (key, name, popularity, now),
+                )
+                conn.execute('DELETE FROM artist_tags WHERE artist_key = ? AND source = ?', (key, source))
+                conn.executemany(
+                    'INSERT OR REPLACE INTO artist_tags (artist_key, source, tag, weight) VALUES (?, ?, ?, ?)',
+                    [(key, source, tag, weight) for tag, weight in tags],
+                )
+                written += 1
+        return written
+
+    def version(self):
+        return self._connect().execute('SELECT COUNT(*), MAX(updated) FROM artists').fetchone()
+
+    def build(self):
+        conn = self._connect()
+        names, popularity = {}, {}
+        for key, name, pop in conn.execute('SELECT artist_key, name, popularity FROM artists'):
+            names[key] = name
+            popularity[name] = pop
+        rows = [(names[key], tag, weight) for key, tag, weight in
+                conn.execute('SELECT artist_key, tag, weight FROM artist_tags') if key in names]
+        return TagModel(rows, popularity)
+
+
+class TagModelService:
+    """
+    This process's TagModel, rebuilt from the store when other requests or workers
+    have recorded new observations (checked at most every `refresh_interval` seconds).
+    While a rebuild runs, other requests keep using the previous model.
+    """
+
+    def __init__(self, store, refresh_interval=300):
+        self.store = store
+        self.refresh_interval = refresh_interval
+        self._model = None
+        self._version = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+
+    def model(self):
+        if self._model is not None and time.monotonic() - self._checked_at < self.refresh_interval:
+            return self._model
+        if not self._lock.acquire(blocking=self._model is None):
+            return self._model
+        try:
+            if self._model is None or time.monotonic() - self._checked_at >= self.refresh_interval:
+                version = self.store.version()
+                if version != self._version or self._model is None:
+                    started = time.perf_counter()
+                    self._model = self.store.build()
+                    self._version = version
+                    print(f"[TagModel] Built from {self._model.artist_count} artists, {self._model.tag_count} tags "
+                          f"in {(time.perf_counter() - started) * 1000:.0f} ms.")
+                self._checked_at = time.monotonic()
+            return self._model
+        finally:
+            self._lock.release()
+
+    def expand(self, query, max_artists=30):
+        return self.model().expand(query, max_artists=max_artists)
+
+    def observe_artist(self, artist, lastfm_tags=None):
+        """Records a Spotify artist dict's genres and, if scraped, its Last.fm tags."""
+        if not artist or not artist.get('name'):
+            return
+        name, popularity = artist['name'], artist.get('popularity')
+        self.store.record([
+            (name, 'spotify', [(genre, 1.0) for genre in artist.get('genres') or []], popularity),
+            (name, 'lastfm', [(tag, _lastfm_weight(rank)) for rank, tag in enumerate(lastfm_tags or [])], popularity),
+        ])
+
+    def observe_artists(self, artists):
+        """Records the genres of many Spotify artist dicts (e.g. a similar-artist pool) at once."""
+        self.store.record(
+            (artist['name'], 'spotify', [(genre, 1.0) for genre in artist.get('genres') or []], artist.get('popularity'))
+            for artist in artists if artist and artist.get('name')
+        )
+
+
+def init_tag_model(app):
+    """Opens this process's handle on the shared tag co-occurrence store."""
+    app.extensions['tag_model'] = TagModelService(
+        TagModelStore(app.config['TAG_MODEL_DB']), refresh_interval=app.config['TAG_MODEL_REFRESH'],
+    )
+
+
+def get_tag_model():
+    return current_app.extensions['tag_model']
+
+
+def observe_artist(artist, lastfm_tags=None):
+    """Best-effort: feeds an artist's genres and Last.fm tags to the tag model; never breaks the caller."""
+    try:
+        get_tag_model().observe_artist(artist, lastfm_tags)
+    except Exception as e:
+        print(f"[TagModel] Could not record tags for {(artist or {}).get('name')}: {e}")
+
+
+def observe_artists(artists):
+    try:
+        get_tag_model().observe_artists(artists)
+    except Exception as e:
+        print(f"[TagModel] Could not record genres for {len(artists)} artists: {e}")
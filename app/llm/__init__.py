@@ -0,0 +1,4 @@
+# Gemini access shared by the blueprints: one gateway per process and a response cache
+from .cache import cached_generate, cached_stream, llm_cache_stats, response_cache_key  # noqa: F401
+from .jsonstream import JSONObjectStream, iter_json_members  # noqa: F401
+from .gateway import LLMGateway, LLMUnavailable, init_llm, get_llm  # noqa: F401
@@ -0,0 +1,96 @@
+import json
+import hashlib
+import threading
+
+from flask import current_app
+
+from ..cache import get_cache
+from ..singleflight import SingleFlight
+
+_flight = SingleFlight()
+_counter_lock = threading.Lock()
+_counters = {} # call type -> {'hits': n, 'misses': n}, per process
+
+
+def normalize_prompt(prompt):
+    """Trailing whitespace and indentation-only differences should not miss the cache."""
+    return '\n'.join(line.rstrip() for line in prompt.strip().splitlines())
+
+
+def response_cache_key(model_name, prompt, generation_config=None, safety_settings=None):
+    material = json.dumps(
+        [model_name, normalize_prompt(prompt), generation_config or {}, safety_settings or []],
+        sort_keys=True, separators=(',', ':'), default=str,
+    )
+    return 'llm:' + hashlib.sha256(material.encode('utf-8')).hexdigest()
+
+
+def _count(call_type, outcome):
+    with _counter_lock:
+        counters = _counters.setdefault(call_type, {'hits': 0, 'misses': 0})
+        counters[outcome] += 1
+
+
+def cached_generate(call_type, model_name, prompt, generate, generation_config=None, safety_settings=None):
+    """
+    Returns the Gemini response text for a prompt, calling generate() only on a cache miss.
+
+    Entries are keyed by (model name, normalized prompt, generation config, safety
+    settings) and kept for LLM_CACHE_TTL[call_type] seconds in a disk cache shared by
+    all workers; a TTL of 0 turns caching off for that call type. Identical prompts
+    arriving together in one process share a single call. Empty responses and errors
+    are not cached.
+    """
+    ttl = current_app.config['LLM_CACHE_TTL'].get(call_type, 0)
+    if not ttl:
+        return generate()
+    cache = get_cache('llm_responses')
+    key = response_cache_key(model_name, prompt, generation_config, safety_settings)
+    text = cache.get(key)
+    if text is not None:
+        _count(call_type, 'hits')
+        return text
+    _count(call_type, 'misses')
+
+    def generate_and_store():
+        text = cache.get(key) # Another worker may have just stored it
+        if text is None:
+            text = generate()
+            if text:
+                cache.set(key, text, ttl=ttl)
+        return text
+
+    return _flight.do(key, generate_and_store)
+
+
+def cached_stream(call_type, model_name, prompt, stream, generation_config=None, safety_settings=None):
+    """
+    Streaming counterpart of cached_generate: yields the text chunks from stream(), or
+    the whole cached response as a single chunk on a hit. A stream that runs to the end
+    is stored under the same key, so streamed and plain calls share entries. Streams are
+    not merged with identical in-flight prompts.
+    """
+    ttl = current_app.config['LLM_CACHE_TTL'].get(call_type, 0)
+    cache = get_cache('llm_responses') if ttl else None
+    key = response_cache_key(model_name, prompt, generation_config, safety_settings)
+    if cache is not None:
+        text = cache.get(key)
+        if text is not None:
+            _count(call_type, 'hits')
+            yield text
+            return
+        _count(call_type, 'misses')
+    chunks = []
+    for chunk in stream():
+        chunks.append(chunk)
+        yield chunk
+    text = ''.join(chunks).strip()
+    if cache is not None and text:
+        cache.set(key, text, ttl=ttl)
+
+
+def llm_cache_stats():
+    """Per-call-type hit/miss counts for this process, plus the shared cache's totals."""
+    with _counter_lock:
+        by_type = {call_type: dict(counters) for call_type, counters in _counters.items()}
+    return {'by_call_type': by_type, **get_cache('llm_responses').stats()}
@@ -0,0 +1,172 @@
+import time
+import threading
+
+from flask import current_app
+
+from .cache import cached_generate, cached_stream
+from ..deadline import clamp_timeout
+
+
+# A Gemini call is not started with less time than this left before the request deadline
+_MIN_CALL_SECONDS = 5
+
+
+class LLMUnavailable(RuntimeError):
+    """Raised when Gemini is not configured or every call slot stayed busy for too long."""
+
+
+class LLMGateway:
+    """
+    The one way the app talks to Gemini.
+
+    genai is configured once, and one GenerativeModel is kept per model name so its
+    client and transport are reused. At most `max_concurrency` calls run at once in this
+    process (callers wait up to `queue_timeout` seconds for a slot), each call gets a
+    `timeout`, and latency and token usage are counted per call type. Text calls go
+    through the shared response cache.
+    """
+
+    def __init__(self, api_key, default_model, max_concurrency=4, timeout=90, queue_timeout=30):
+        import google.generativeai as genai
+        self._genai = genai
+        self.api_key = api_key
+        self.default_model = default_model
+        self.timeout = timeout
+        self.queue_timeout = queue_timeout
+        self._slots = threading.BoundedSemaphore(max_concurrency)
+        self._models = {}
+        self._lock = threading.Lock()
+        self._metrics = {}
+        if api_key:
+            genai.configure(api_key=api_key)
+
+    @property
+    def configured(self):
+        return bool(self.api_key)
+
+    def model(self, model_name=None):
+        model_name = model_name or self.default_model
+        model = self._models.get(model_name)
+        if model is None:
+            with self._lock:
+                model = self._models.setdefault(model_name, self._genai.GenerativeModel(model_name))
+        return model
+
+    def _record(self, call_type, started, response=None, error=False):
+        elapsed = time.perf_counter() - started
+        usage = getattr(response, 'usage_metadata', None)
+        with self._lock:
+            metrics = self._metrics.setdefault(call_type, {
+                'calls': 0, 'errors': 0, 'total_seconds': 0.0, 'max_seconds': 0.0,
+                'prompt_tokens': 0, 'output_tokens': 0,
+            })
+            metrics['calls'] += 1
+            metrics['errors'] += int(error)
+            metrics['total_seconds'] += elapsed
+            metrics['max_seconds'] = max(metrics['max_seconds'], elapsed)
+            if usage is not None:
+                metrics['prompt_tokens'] += getattr(usage, 'prompt_token_count', 0) or 0
+                metrics['output_tokens'] += getattr(usage, 'candidates_token_count', 0) or 0
+
+    def generate(self, call_type, prompt, model_name=None, generation_config=None, safety_settings=None):
+        """Calls Gemini and returns the raw response. Not cached."""
+        if not self.configured:
+            raise LLMUnavailable('GEMINI_API_KEY not configured')
+        timeout = clamp_timeout(self.timeout, minimum=_MIN_CALL_SECONDS, part='gemini')
+        if not self._slots.acquire(timeout=min(self.queue_timeout, timeout)):
+            raise LLMUnavailable('Too many AI requests in progress. Please try again shortly.')
+        started = time.perf_counter()
+        try:
+            response = self.model(model_name).generate_content(
+                prompt, generation_config=generation_config, safety_settings=safety_settings,
+                request_options={'timeout': clamp_timeout(timeout, minimum=_MIN_CALL_SECONDS, part='gemini')},
+            )
+        except Exception:
+            self._record(call_type, started, error=True)
+            raise
+        finally:
+            self._slots.release()
+        self._record(call_type, started, response)
+        return response
+
+    def generate_text(self, call_type, prompt, model_name=None, generation_config=None, safety_settings=None):
+        """
+        Returns the stripped response text, from the response cache when possible.
+        Raises ValueError when Gemini returns no content (e.g. a blocked prompt).
+        """
+        model_name = model_name or self.default_model
+
+        def generate():
+            response = self.generate(call_type, prompt, model_name, generation_config, safety_settings)
+            if not response.parts:
+                feedback = response.prompt_feedback
+                raise ValueError(f"AI generation failed or was empty. Reason: {feedback.block_reason if feedback else 'Unknown'}")
+            return response.text.strip()
+
+        return cached_generate(call_type, model_name, prompt, generate, generation_config, safety_settings)
+
+    def stream_text(self, call_type, prompt, model_name=None, generation_config=None, safety_settings=None):
+        """
+        Yields the response text in chunks as Gemini produces them (generate_content with
+        stream=True), or the cached response as one chunk. The call slot is held until the
+        stream is exhausted or closed. Raises ValueError when Gemini returns no content.
+        """
+        model_name = model_name or self.default_model
+
+        def stream():
+            if not self.configured:
+                raise LLMUnavailable('GEMINI_API_KEY not configured')
+            timeout = clamp_timeout(self.timeout, minimum=_MIN_CALL_SECONDS, part='gemini')
+            if not self._slots.acquire(timeout=min(self.queue_timeout, timeout)):
+                raise LLMUnavailable('Too many AI requests in progress. Please try again shortly.')
+            started = time.perf_counter()
+            response = None
+            try:
+                response = self.model(model_name).generate_content(
+                    prompt, generation_config=generation_config, safety_settings=safety_settings,
+                    stream=True, request_options={'timeout': clamp_timeout(timeout, minimum=_MIN_CALL_SECONDS, part='gemini')},
+                )
+                produced = False
+                for chunk in response:
+                    if chunk.parts:
+                        produced = True
+                        yield chunk.text
+                if not produced:
+                    feedback = response.prompt_feedback
+                    raise ValueError(f"AI generation failed or was empty. Reason: {feedback.block_reason if feedback else 'Unknown'}")
+            except Exception:
+                self._record(call_type, started, error=True)
+                raise
+            else:
+                self._record(call_type, started, response)
+            finally:
+                self._slots.release()
+
+        return cached_stream(call_type, model_name, prompt, stream, generation_config, safety_settings)
+
+    def metrics(self):
+        with self._lock:
+            snapshot = {call_type: dict(metrics) for call_type, metrics in self._metrics.items()}
+        for metrics in snapshot.values():
+            metrics['avg_seconds'] = round(metrics['total_seconds'] / metrics['calls'], 3) if metrics['calls'] else None
+            metrics['total_seconds'] = round(metrics['total_seconds'], 3)
+            metrics['max_seconds'] = round(metrics['max_seconds'], 3)
+        return snapshot
+
+
+def init_llm(app):
+    """Creates this process's Gemini gateway."""
+    app.extensions['llm_gateway'] = LLMGateway(
+        app.config.get('GEMINI_API_KEY'),
+        app.config['GEMINI_MODEL_NAME'],
+        max_concurrency=app.config['LLM_MAX_CONCURRENCY'],
+        timeout=app.config['LLM_TIMEOUT'],
+    )
+    if app.config.get('GEMINI_API_KEY'):
+        print(f"Gemini configured: {app.config.get('GEMINI_MODEL_NAME')}")
+    else:
+        print("Warning: GEMINI_API_KEY not set.")
+
+
+def get_llm():
+    return current_app.extensions['llm_gateway']
@@ -0,0 +1,131 @@
+import json
+
+# Scanner states
+_SEEK_OBJECT, _SEEK_KEY, _KEY, _SEEK_COLON, _SEEK_VALUE, _VALUE, _SEEK_NEXT, _DONE = range(8)
+_WHITESPACE = ' \t\r\n'
+
+
+class JSONObjectStream:
+    """
+    Incremental parser for the single JSON object a model writes, fed text as it streams.
+
+    feed() returns the (key, value) pairs of top-level members whose values completed
+    in that chunk, so each section can be used before the rest of the object has been
+    generated. Anything before the opening brace (a ```json fence, a stray sentence) and
+    after the closing brace is ignored. Each chunk is scanned once; only the member
+    currently being written is kept in the buffer. Malformed members raise ValueError.
+    """
+
+    def __init__(self):
+        self._buffer = ''
+        self._pos = 0
+        self._state = _SEEK_OBJECT
+        self._start = 0 # Buffer offset of the key or value being scanned
+        self._key = None
+        self._depth = 0
+        self._in_string = False
+        self._escaped = False
+
+    @property
+    def complete(self):
+        return self._state == _DONE
+
+    def feed(self, text):
+        if self._state == _DONE:
+            return []
+        self._buffer += text
+        members = []
+        buffer = self._buffer
+        i = self._pos
+        while i < len(buffer) and self._state != _DONE:
+            c = buffer[i]
+            state = self._state
+            if state == _SEEK_OBJECT:
+                if c == '{':
+                    self._state = _SEEK_KEY
+            elif state == _SEEK_KEY:
+                if c == '"':
+                    self._start, self._escaped, self._state = i, False, _KEY
+                elif c == '}':
+                    self._state = _DONE
+                elif c not in _WHITESPACE and c != ',':
+                    raise ValueError(f"Expected an object key, got {c!r}")
+            elif state == _KEY:
+                if self._escaped:
+                    self._escaped = False
+                elif c == '\\':
+                    self._escaped = True
+                elif c == '"':
+                    self._key = json.loads(buffer[self._start:i + 1])
+                    self._state = _SEEK_COLON
+            elif state == _SEEK_COLON:
+                if c == ':':
+                    self._state = _SEEK_VALUE
+                elif c not in _WHITESPACE:
+                    raise ValueError(f"Expected ':' after key {self._key!r}, got {c!r}")
+            elif state == _SEEK_VALUE:
+                if c not in _WHITESPACE:
+                    self._start, self._depth, self._in_string, self._escaped = i, 0, False, False
+                    self._state = _VALUE
+                    continue # Scan this character as part of the value
+            elif state == _VALUE:
+                end = self._scan_value(c, i)
+                if end is not None:
+                    members.append((self._key, json.loads(buffer[self._start:end])))
+                    if end == i: # A number or literal, ended by the delimiter at i
+                        self._state = _DONE if c == '}' else _SEEK_KEY
+                    else:
+                        self._state = _SEEK_NEXT
+            elif state == _SEEK_NEXT:
+                if c == ',':
+                    self._state = _SEEK_KEY
+                elif c == '}':
+                    self._state = _DONE
+                elif c not in _WHITESPACE:
+                    raise ValueError(f"Expected ',' or '}}' after {self._key!r}, got {c!r}")
+            i += 1
+
+        # Keep only the member still being written
+        keep_from = self._start if self._state in (_KEY, _VALUE) else i
+        self._buffer = buffer[keep_from:]
+        self._start -= keep_from
+        self._pos = i - keep_from
+        return members
+
+    def _scan_value(self, c, i):
+        """Advances the value scanner by one character; returns the value's end offset once it is complete."""
+        if self._in_string:
+            if self._escaped:
+                self._escaped = False
+            elif c == '\\':
+                self._escaped = True
+            elif c == '"':
+                self._in_string = False
+                if self._depth == 0:
+                    return i + 1
+        elif c == '"':
+            self._in_string = True
+        elif c in '{[':
+            self._depth += 1
+        elif c in '}]':
+            if self._depth == 0:
+                return i
+            self._depth -= 1
+            if self._depth == 0:
+                return i + 1
+        elif c == ',' and self._depth == 0:
+            return i
+        return None
+
+    def close(self):
+        """Raises ValueError if the text ended before the object did."""
+        if self._state != _DONE:
+            raise ValueError("AI response ended before the JSON object was complete.")
+
+
+def iter_json_members(chunks):
+    """Yields (key, value) for each top-level member of the JSON object spread over `chunks`."""
+    parser = JSONObjectStream()
+    for chunk in chunks:
+        yield from parser.feed(chunk)
+    parser.close()
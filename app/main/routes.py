@@ -1,39 +1,50 @@
+import os
 import time
 import traceback
 import math
-import pandas as pd
-import io
-import requests
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FuturesTimeout
 from flask import (
-    render_template, redirect, url_for, flash, request, current_app, session, Response, jsonify
+    render_template, redirect, url_for, flash, request, current_app, session, Response, jsonify,
+    stream_with_context
 )
 import spotipy
 
 from . import main_bp
 from ..spotify.auth import get_spotify_client_credentials_client
-from ..spotify.data import (
-    fetch_release_details, fetch_similar_artists_by_genre,
-    fetch_spotify_details_for_names
-)
+from ..spotify.data import fetch_release_details, fetch_similar_artists_by_genre
 from ..spotify.utils import calculate_release_stats
+from ..spotify.pool_store import pool_handle
+from ..spotify.ratelimit import get_spotify_governor
+from ..spotify.labels import album_labels, harvest_labels
+from ..cache import get_cache
+from ..httpclient import make_session
+from ..breaker import breaker_states
+from ..singleflight import coalesce_stats
+from ..deadline import (
+    with_deadline, within_deadline, current_deadline, has_time, incomplete_parts, bind_context
+)
+from ..jobs import job_handler, JobFailed
+from ..llm import get_llm, llm_cache_stats, JSONObjectStream
+from ..sse import sse_event
+from ..playlists.search_index import index_playlists
+from ..lastfm.tag_model import observe_artist
+from ..spotify.similar_pool import similar_artist_pool
+from ..spotify.export import (
+    export_columns, iter_similar_artists_csv, write_similar_artists_xlsx, iter_file_chunks,
+    CSV_MIMETYPE, XLSX_MIMETYPE,
+)
 from ..lastfm.scraper import (
-    scrape_all_lastfm_similar_artists_names,
     scrape_lastfm_upcoming_events,
     scrape_lastfm_tags,
     scrape_lastfm_artist_stats,
 )
 
-def _ai_call(prompt: str) -> str:
-    """Call Gemini and return the text response."""
-    import google.generativeai as genai
-    api_key = current_app.config.get('GEMINI_API_KEY')
-    if not api_key:
-        raise RuntimeError('GEMINI_API_KEY not configured')
-    model_name = current_app.config.get('GEMINI_MODEL_NAME')
-    genai.configure(api_key=api_key)
-    model = genai.GenerativeModel(model_name)
-    response = model.generate_content(prompt)
-    return response.text.strip() if response.text else ''
+# ReccoBeats audio features; shares the request deadline like the other upstream clients
+_RECCOBEATS = make_session(upstream='reccobeats')
+
+def _ai_call(prompt: str, call_type: str) -> str:
+    """Call Gemini through the shared gateway (cached per prompt) and return the text response."""
+    return get_llm().generate_text(call_type, prompt)
 
 
 _MARKET_REGIONS = {
@@ -77,6 +88,24 @@ def index():
     return redirect(url_for('main.search_artist'))
 
 
+@main_bp.route('/api/metrics')
+def metrics_api():
+    """
+    Counters for this worker process: Gemini calls (latency, tokens), cache hit rates,
+    upstream breakers, Spotify pacing and coalesced upstream calls.
+    """
+    disk_caches = current_app.extensions.get('disk_caches', {})
+    return jsonify({
+        'pid': os.getpid(),
+        'llm': get_llm().metrics(),
+        'llm_cache': llm_cache_stats(),
+        'disk_caches': {name: cache.stats() for name, cache in disk_caches.items()},
+        'breakers': breaker_states(),
+        'spotify': get_spotify_governor().metrics(),
+        'coalesced_calls': coalesce_stats(),
+    })
+
+
 @main_bp.route('/artist/<artist_id>')
 def artist_intel(artist_id):
     """Comprehensive artist intelligence dashboard."""
@@ -139,42 +168,40 @@ def artist_intel(artist_id):
     )
 
 
-def _generate_ai_bio(artist, lastfm_tags, lastfm_stats, mb_data, wiki_extract, artist_labels, release_stats, audio_averages=None):
-    """Use Gemini to synthesize all available data into a professional artist profile."""
-    try:
-
-        followers = artist.get('followers', {}).get('total', 0) or 0
-        genres = artist.get('genres', [])
-        popularity = artist.get('popularity', 0) or 0
-        name = artist.get('name', '')
-
-        mb_area = mb_data.get('area') or mb_data.get('begin_area') if mb_data else None
-        mb_type = mb_data.get('type') if mb_data else None
-
-        rstats = release_stats or {}
-        listeners_fmt = f"{lastfm_stats.get('listeners'):,}" if lastfm_stats.get('listeners') else 'N/A'
-        scrobbles_fmt = f"{lastfm_stats.get('scrobbles'):,}" if lastfm_stats.get('scrobbles') else 'N/A'
-
-        audio_section = 'N/A'
-        if audio_averages:
-            _lbl = {
-                'energy':           ['very low energy','low energy','moderate energy','high energy','very high energy'],
-                'danceability':     ['not danceable','slightly danceable','moderately danceable','danceable','highly danceable'],
-                'valence':          ['dark/melancholic','somewhat dark','neutral mood','upbeat','euphoric'],
-                'acousticness':     ['heavily electronic','mostly electronic','mixed','mostly acoustic','fully acoustic'],
-                'instrumentalness': ['vocal-led','mostly vocal','balanced','mostly instrumental','fully instrumental'],
-            }
-            lines = []
-            for k in ['energy','danceability','valence','acousticness','instrumentalness']:
-                v = audio_averages.get(k)
-                if v is not None:
-                    lbl = _lbl[k][min(int(v * 5), 4)]
-                    lines.append(f"  {k.title()}: {v} ({lbl})")
-            if 'tempo' in audio_averages:
-                lines.append(f"  Tempo: {audio_averages['tempo']} BPM")
-            audio_section = '\n'.join(lines) if lines else 'N/A'
-
-        prompt = f"""You are a senior music industry analyst. Analyze the data below and return a structured JSON object — nothing else, no markdown, no code fences, just the raw JSON.
+def _ai_bio_prompt(artist, lastfm_tags, lastfm_stats, mb_data, wiki_extract, artist_labels, release_stats, audio_averages=None):
+    """Builds the Gemini prompt that turns all available data into a professional artist profile."""
+    followers = artist.get('followers', {}).get('total', 0) or 0
+    genres = artist.get('genres', [])
+    popularity = artist.get('popularity', 0) or 0
+    name = artist.get('name', '')
+
+    mb_area = mb_data.get('area') or mb_data.get('begin_area') if mb_data else None
+    mb_type = mb_data.get('type') if mb_data else None
+
+    rstats = release_stats or {}
+    listeners_fmt = f"{lastfm_stats.get('listeners'):,}" if lastfm_stats.get('listeners') else 'N/A'
+    scrobbles_fmt = f"{lastfm_stats.get('scrobbles'):,}" if lastfm_stats.get('scrobbles') else 'N/A'
+
+    audio_section = 'N/A'
+    if audio_averages:
+        _lbl = {
+            'energy':           ['very low energy','low energy','moderate energy','high energy','very high energy'],
+            'danceability':     ['not danceable','slightly danceable','moderately danceable','danceable','highly danceable'],
+            'valence':          ['dark/melancholic','somewhat dark','neutral mood','upbeat','euphoric'],
+            'acousticness':     ['heavily electronic','mostly electronic','mixed','mostly acoustic','fully acoustic'],
+            'instrumentalness': ['vocal-led','mostly vocal','balanced','mostly instrumental','fully instrumental'],
+        }
+        lines = []
+        for k in ['energy','danceability','valence','acousticness','instrumentalness']:
+            v = audio_averages.get(k)
+            if v is not None:
+                lbl = _lbl[k][min(int(v * 5), 4)]
+                lines.append(f"  {k.title()}: {v} ({lbl})")
+        if 'tempo' in audio_averages:
+            lines.append(f"  Tempo: {audio_averages['tempo']} BPM")
+        audio_section = '\n'.join(lines) if lines else 'N/A'
+
+    prompt = f"""You are a senior music industry analyst. Analyze the data below and return a structured JSON object — nothing else, no markdown, no code fences, just the raw JSON.
 
 ARTIST DATA:
 Name: {name}
@@ -200,8 +227,13 @@ Return exactly this JSON structure (all strings, use real data — NO filler phr
   "market_snapshot": "2–3 sentences on where they stand commercially: follower count vs popularity score analysis, release cadence verdict, career stage (emerging / mid-tier / established).",
   "label_career": "1–2 sentences on their label history and what it signals about their deal structure or independence."
 }}"""
+    return prompt
+
 
-        raw = _ai_call(prompt)
+def _generate_ai_bio(*bio_data, **kwargs):
+    """Use Gemini to synthesize all available data into a professional artist profile."""
+    try:
+        raw = _ai_call(_ai_bio_prompt(*bio_data, **kwargs), 'artist_bio')
         if not raw:
             return None
         # Strip accidental markdown fences
@@ -228,12 +260,6 @@ def _parse_intent(intent: str, artist_name: str) -> dict:
     if not intent or len(intent) < 5:
         return {}
     try:
-        import google.generativeai as genai
-        from flask import current_app
-        api_key = current_app.config.get('GEMINI_API_KEY')
-        model_name = current_app.config.get('GEMINI_MODEL_NAME')
-        genai.configure(api_key=api_key)
-        model = genai.GenerativeModel(model_name)
         prompt = (
             f'Artist: {artist_name}\n'
             f'Goal statement: "{intent}"\n\n'
@@ -254,8 +280,7 @@ def _parse_intent(intent: str, artist_name: str) -> dict:
             'target_markets are ONLY geographic places explicitly mentioned.'
         )
         import re as _re, json as _json
-        resp = model.generate_content(prompt)
-        text = (resp.text or '').strip()
+        text = get_llm().generate_text('intent', prompt)
         m = _re.search(r'\{.*\}', text, _re.DOTALL)
         if m:
             return _json.loads(m.group())
@@ -289,7 +314,7 @@ def _fetch_reference_artist_context(sp, names: list) -> str:
             t_ids = [t['id'] for t in tops if t.get('id')]
             a_audio = {}
             if t_ids:
-                rb = requests.get(
+                rb = _RECCOBEATS.get(
                     'https://api.reccobeats.com/v1/audio-features',
                     params={'ids': ','.join(t_ids)},
                     timeout=8,
@@ -329,10 +354,15 @@ def _fetch_reference_artist_context(sp, names: list) -> str:
 
 
 @main_bp.route('/api/artist/<artist_id>/intel')
+@with_deadline
 def artist_intel_api(artist_id):
     """
     Async endpoint: Last.fm tags/stats/events, MusicBrainz contacts,
     Wikipedia data, and Gemini AI bio. Called by the frontend after render.
+
+    With ?stream=1 the response is server-sent events instead: 'intel' with everything
+    but the bio (ai_bio null, bio_pending true), a 'bio_section' ({key, value}) as each
+    bio field is generated, then 'end' with the complete ai_bio.
     """
     sp = get_spotify_client_credentials_client()
     if not sp:
@@ -340,10 +370,62 @@ def artist_intel_api(artist_id):
 
     try:
         artist = sp.artist(artist_id)
-        artist_name = artist.get('name', '') if artist else ''
     except Exception:
         return jsonify({'error': 'Artist not found'}), 404
 
+    if request.args.get('stream'):
+        return Response(
+            stream_with_context(within_deadline(_stream_artist_intel(sp, artist_id, artist), current_deadline())),
+            mimetype='text/event-stream',
+            headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'},
+        )
+
+    result, bio_data = _collect_artist_intel(sp, artist_id, artist)
+    if has_time(15, 'ai_bio'):
+        try:
+            result['ai_bio'] = _generate_ai_bio(**bio_data)
+        except Exception as e:
+            print(f"[IntelAPI] AI bio error: {e}")
+
+    result['incomplete'] = incomplete_parts()
+    return jsonify(result)
+
+
+def _stream_artist_intel(sp, artist_id, artist):
+    """Event stream for artist_intel_api(stream=1); the bio is parsed as Gemini writes it."""
+    yield ': connected\n\n' # Sends the headers before the slow lookups start
+    result, bio_data = _collect_artist_intel(sp, artist_id, artist)
+    bio_pending = has_time(15, 'ai_bio')
+    yield sse_event('intel', {**result, 'bio_pending': bio_pending, 'incomplete': incomplete_parts()})
+    if not bio_pending:
+        yield sse_event('end', {'ai_bio': None, 'incomplete': incomplete_parts()})
+        return
+
+    bio, chunks = {}, []
+    try:
+        parser = JSONObjectStream()
+        for chunk in get_llm().stream_text('artist_bio', _ai_bio_prompt(**bio_data)):
+            chunks.append(chunk)
+            for key, value in parser.feed(chunk):
+                bio[key] = value
+                yield sse_event('bio_section', {'key': key, 'value': value})
+        parser.close()
+    except ValueError as e:
+        # Not the JSON we asked for; show the text as written, like the plain endpoint
+        print(f"[IntelAPI] AI bio parse error: {e}")
+        bio = ''.join(chunks).strip() or None
+    except Exception as e:
+        print(f"[IntelAPI] AI bio error: {e}")
+        bio = bio or None
+    yield sse_event('end', {'ai_bio': bio, 'incomplete': incomplete_parts()})
+
+
+def _collect_artist_intel(sp, artist_id, artist):
+    """
+    Runs the artist intel lookups. Returns (result, bio_data): the endpoint's JSON
+    without the bio, and the keyword arguments for _ai_bio_prompt/_generate_ai_bio.
+    """
+    artist_name = artist.get('name', '') if artist else ''
     result = {
         'lastfm_tags': [],
         'lastfm_events': [],
@@ -357,11 +439,13 @@ def artist_intel_api(artist_id):
         result['lastfm_tags'] = scrape_lastfm_tags(artist_name) or []
     except Exception as e:
         print(f"[IntelAPI] Last.fm tags error: {e}")
+    observe_artist(artist, result['lastfm_tags'])
 
-    try:
-        result['lastfm_events'] = scrape_lastfm_upcoming_events(artist_name) or []
-    except Exception as e:
-        print(f"[IntelAPI] Last.fm events error: {e}")
+    if has_time(20, 'lastfm_events'):
+        try:
+            result['lastfm_events'] = scrape_lastfm_upcoming_events(artist_name) or []
+        except Exception as e:
+            print(f"[IntelAPI] Last.fm events error: {e}")
 
     try:
         result['lastfm_stats'] = scrape_lastfm_artist_stats(artist_name) or {}
@@ -391,14 +475,7 @@ def artist_intel_api(artist_id):
     # Gather labels from artist's recent releases for AI bio context
     artist_labels = []
     try:
-        simplified = sp.artist_albums(artist_id, album_type='album,single', limit=5).get('items', [])
-        seen = set()
-        for rel in simplified:
-            full = sp.album(rel['id'])
-            lbl = full.get('label')
-            if lbl and lbl not in seen:
-                seen.add(lbl)
-                artist_labels.append(lbl)
+        artist_labels = list(harvest_labels(sp, [(artist_id, artist_name, 5, 5)]))
     except Exception:
         pass
 
@@ -413,10 +490,12 @@ def artist_intel_api(artist_id):
     # ── Audio features via ReccoBeats ────────────────────────────────────
     audio_averages = {}
     try:
+        if not has_time(20, 'audio_features'):
+            raise TimeoutError('skipped, request deadline is close')
         sp_top = sp.artist_top_tracks(artist_id, country='US').get('tracks', [])[:5]
         track_ids = [t['id'] for t in sp_top if t.get('id')]
         if track_ids:
-            rb = requests.get(
+            rb = _RECCOBEATS.get(
                 'https://api.reccobeats.com/v1/audio-features',
                 params={'ids': ','.join(track_ids)},
                 timeout=10,
@@ -431,16 +510,12 @@ def artist_intel_api(artist_id):
         print(f"[IntelAPI] Audio features error: {e}")
     result['audio_averages'] = audio_averages
 
-    try:
-        result['ai_bio'] = _generate_ai_bio(
-            artist, result['lastfm_tags'], result['lastfm_stats'],
-            result['musicbrainz'], wiki_extract, artist_labels, release_stats,
-            audio_averages=audio_averages,
-        )
-    except Exception as e:
-        print(f"[IntelAPI] AI bio error: {e}")
-
-    return jsonify(result)
+    bio_data = {
+        'artist': artist, 'lastfm_tags': result['lastfm_tags'], 'lastfm_stats': result['lastfm_stats'],
+        'mb_data': result['musicbrainz'], 'wiki_extract': wiki_extract, 'artist_labels': artist_labels,
+        'release_stats': release_stats, 'audio_averages': audio_averages,
+    }
+    return result, bio_data
 
 
 @main_bp.route('/artist/<artist_id>/pitch')
@@ -469,7 +544,58 @@ def artist_pitch(artist_id):
     return render_template('pitch.html', artist=artist, top_tracks=top_tracks)
 
 
+def _search_playlist_pages(sp, governor, keywords, deadline, max_pages):
+    """
+    Runs the Spotify playlist searches for all keywords concurrently, 50 results per
+    page. Keywords whose page came back full are searched one page deeper in the next
+    round, while the previous round's duration still fits before `deadline`.
+    Returns [(keyword, items)] in keyword order.
+    """
+    pages = {kw: [] for kw in keywords}
+    pending = list(keywords)
+    for page in range(max_pages):
+        round_started = time.monotonic()
+
+        def search(kw, offset=page * 50):
+            return sp.search(q=kw, type='playlist', limit=50, offset=offset)
+
+        next_round = []
+        for kw, results, error in governor.map(search, pending, deadline=deadline):
+            if error is not None:
+                print(f"[PlaylistAPI] Error for keyword '{kw}' (page {page + 1}): {error}")
+                continue
+            listing = (results or {}).get('playlists') or {}
+            items = listing.get('items') or []
+            pages[kw].extend(items)
+            if len(items) == 50 and (listing.get('total') or 0) > (page + 1) * 50:
+                next_round.append(kw)
+        pending = next_round
+        if not pending or time.monotonic() + (time.monotonic() - round_started) > deadline:
+            break
+    return list(pages.items())
+
+
+def _playlist_followers(sp, governor, playlist_ids, deadline):
+    """Follower counts by playlist id, from the shared cache or fetched concurrently."""
+    cache = get_cache('playlist_followers', default_ttl=current_app.config['PLAYLIST_FOLLOWERS_TTL'])
+    followers = {}
+    missing = []
+    for pl_id in playlist_ids:
+        count = cache.get(pl_id)
+        if count is None:
+            missing.append(pl_id)
+        else:
+            followers[pl_id] = count
+    for pl_id, full, error in governor.map(lambda pl_id: sp.playlist(pl_id, fields='followers,id'), missing, deadline=deadline):
+        if error is not None:
+            continue # Shown as 0 and retried on the next request
+        followers[pl_id] = ((full or {}).get('followers') or {}).get('total', 0) or 0
+        cache.set(pl_id, followers[pl_id])
+    return followers
+
+
 @main_bp.route('/api/artist/<artist_id>/playlists')
+@with_deadline
 def artist_playlists_api(artist_id):
     """
     Search Spotify for playlists matching genre/artist keywords.
@@ -490,39 +616,36 @@ def artist_playlists_api(artist_id):
     keywords = list({artist_name} | {g for g in genres[:6]})
 
     found = {}
-    for kw in keywords[:15]:
-        try:
-            results = sp.search(q=kw, type='playlist', limit=20)
-            items = results.get('playlists', {}).get('items', []) or []
-            for pl in items:
-                if not pl or not pl.get('id'):
-                    continue
-                owner = pl.get('owner', {}) or {}
-                owner_id = owner.get('id', '')
-                # Skip official Spotify editorial playlists
-                if owner_id.lower() in ('spotify', 'spotifycharts', 'spotifypodcasts',
-                                        'spotify_germany', 'spotify_france'):
-                    continue
-                pl_id = pl['id']
-                tracks_total = pl.get('tracks', {}).get('total', 0) or 0
-                if pl_id not in found:
-                    found[pl_id] = {
-                        'id': pl_id,
-                        'name': pl.get('name', ''),
-                        'description': (pl.get('description') or '')[:200],
-                        'tracks_total': tracks_total,
-                        'owner_name': owner.get('display_name') or owner_id or 'Unknown',
-                        'owner_id': owner_id,
-                        'url': (pl.get('external_urls') or {}).get('spotify', ''),
-                        'image': pl['images'][0]['url'] if pl.get('images') else None,
-                        'found_by': [kw],
-                    }
-                else:
-                    if kw not in found[pl_id]['found_by']:
-                        found[pl_id]['found_by'].append(kw)
-            time.sleep(0.12)
-        except Exception as e:
-            print(f"[PlaylistAPI] Error for keyword '{kw}': {e}")
+    governor = get_spotify_governor()
+    deadline = time.monotonic() + current_app.config['PLAYLIST_SEARCH_BUDGET']
+    pages = _search_playlist_pages(sp, governor, keywords[:15], deadline, current_app.config['PLAYLIST_SEARCH_MAX_PAGES'])
+    for kw, items in pages:
+        for pl in items:
+            if not pl or not pl.get('id'):
+                continue
+            owner = pl.get('owner', {}) or {}
+            owner_id = owner.get('id', '')
+            # Skip official Spotify editorial playlists
+            if owner_id.lower() in ('spotify', 'spotifycharts', 'spotifypodcasts',
+                                    'spotify_germany', 'spotify_france'):
+                continue
+            pl_id = pl['id']
+            tracks_total = pl.get('tracks', {}).get('total', 0) or 0
+            if pl_id not in found:
+                found[pl_id] = {
+                    'id': pl_id,
+                    'name': pl.get('name', ''),
+                    'description': (pl.get('description') or '')[:200],
+                    'tracks_total': tracks_total,
+                    'owner_name': owner.get('display_name') or owner_id or 'Unknown',
+                    'owner_id': owner_id,
+                    'url': (pl.get('external_urls') or {}).get('spotify', ''),
+                    'image': pl['images'][0]['url'] if pl.get('images') else None,
+                    'found_by': [kw],
+                }
+            else:
+                if kw not in found[pl_id]['found_by']:
+                    found[pl_id]['found_by'].append(kw)
 
     # Sort: most keyword matches first, then by track count
     sorted_pls = sorted(
@@ -532,24 +655,21 @@ def artist_playlists_api(artist_id):
     )
 
     # Enrich top 40 with actual follower counts
-    enriched = []
-    for pl in sorted_pls[:40]:
-        try:
-            full = sp.playlist(pl['id'], fields='followers,id')
-            pl['followers'] = (full.get('followers') or {}).get('total', 0)
-        except Exception:
-            pl['followers'] = 0
-        enriched.append(pl)
-        time.sleep(0.05)
+    enriched = sorted_pls[:40]
+    followers = _playlist_followers(sp, governor, [pl['id'] for pl in enriched], deadline)
+    for pl in enriched:
+        pl['followers'] = followers.get(pl['id'], 0)
 
     # Re-sort by followers for top 40, keep rest at end
     enriched.sort(key=lambda p: p.get('followers', 0), reverse=True)
     final = enriched + sorted_pls[40:]
+    index_playlists(final, 'spotify_search')
 
-    return jsonify({'playlists': final[:200], 'keywords_used': keywords})
+    return jsonify({'playlists': final[:200], 'keywords_used': keywords, 'incomplete': incomplete_parts()})
 
 
 @main_bp.route('/api/artist/<artist_id>/label-contacts')
+@with_deadline
 def label_contacts_api(artist_id):
     """
     Aggregate labels from the artist's own releases + top similar artists,
@@ -589,39 +709,23 @@ def label_contacts_api(artist_id):
         if credited_artist_name and credited_artist_name not in labels_map[label_name]['artists']:
             labels_map[label_name]['artists'].append(credited_artist_name)
 
-    # Artist's own releases
-    try:
-        own_releases = sp.artist_albums(artist_id, album_type='album,single', limit=10).get('items', [])
-        for rel in own_releases[:6]:
-            try:
-                full = sp.album(rel['id'])
-                _add_label(full.get('label'), artist_name)
-            except Exception:
-                pass
-            time.sleep(0.05)
-    except Exception as e:
-        print(f"[LabelContacts] Error fetching own releases: {e}")
-
-    # Top similar artists' labels (genre-based Spotify search)
+    # Artist's own 6 latest releases, then 2 from each of the top 12 similar artists
+    # (genre-based Spotify search, by popularity): release lists are fetched
+    # concurrently, then all release ids are resolved in batched album lookups
+    sources = [(artist_id, artist_name, 6, 10)]
     try:
         similar = fetch_similar_artists_by_genre(sp, artist_id, artist_name, artist_genres,
                                                  candidates_per_genre=15)
-        # Sort by popularity, take top 12
         similar.sort(key=lambda a: a.get('popularity', 0), reverse=True)
-        for sim in similar[:12]:
-            try:
-                sim_releases = sp.artist_albums(sim['id'], album_type='album,single', limit=3)
-                for rel in (sim_releases.get('items') or [])[:2]:
-                    try:
-                        full = sp.album(rel['id'])
-                        _add_label(full.get('label'), sim.get('name', ''))
-                    except Exception:
-                        pass
-                time.sleep(0.05)
-            except Exception:
-                pass
+        sources += [(sim['id'], sim.get('name', ''), 2, 3) for sim in similar[:12] if sim.get('id')]
     except Exception as e:
         print(f"[LabelContacts] Error fetching similar artists: {e}")
+    try:
+        for label_name, harvested in harvest_labels(sp, sources).items():
+            for credited_artist_name in harvested['artists']:
+                _add_label(label_name, credited_artist_name)
+    except Exception as e:
+        print(f"[LabelContacts] Error fetching release labels: {e}")
 
     print(f"[LabelContacts] Found {len(labels_map)} unique labels before MB enrichment")
 
@@ -630,7 +734,7 @@ def label_contacts_api(artist_id):
         from ..musicbrainz.api import get_label_contacts
         enrich_count = 0
         for label_name, label_data in labels_map.items():
-            if enrich_count >= 15:
+            if enrich_count >= 15 or not has_time(5, 'label_contacts'):
                 break
             try:
                 mb = get_label_contacts(label_name)
@@ -654,7 +758,7 @@ def label_contacts_api(artist_id):
         reverse=True
     )
 
-    return jsonify({'labels': sorted_labels})
+    return jsonify({'labels': sorted_labels, 'incomplete': incomplete_parts()})
 
 
 @main_bp.route('/api/artist/<artist_id>/label-pitch', methods=['POST'])
@@ -695,6 +799,7 @@ def label_pitch_api(artist_id):
         lastfm_tags = scrape_lastfm_tags(artist_name) or []
     except Exception:
         pass
+    observe_artist(artist, lastfm_tags)
 
     release_stats_obj = {}
     try:
@@ -736,7 +841,7 @@ Write a professional cold pitch email. Rules:
 
 Return ONLY the email (subject + body). No explanations."""
 
-        pitch_text = _ai_call(prompt)
+        pitch_text = _ai_call(prompt, 'label_pitch')
         return jsonify({'pitch': pitch_text})
     except Exception as e:
         print(f"[LabelPitch] Claude error: {e}")
@@ -764,6 +869,7 @@ def artist_marketing(artist_id):
 
 
 @main_bp.route('/api/artist/<artist_id>/marketing-strategy', methods=['GET', 'POST'])
+@with_deadline
 def marketing_strategy_api(artist_id):
     """Generate a full AI marketing strategy using Gemini."""
     sp = get_spotify_client_credentials_client()
@@ -778,18 +884,166 @@ def marketing_strategy_api(artist_id):
     else:
         intent = (request.args.get('intent') or '').strip()[:1500]
 
+    try:
+        return jsonify({**_build_marketing_strategy(sp, artist_id, intent), 'incomplete': incomplete_parts()})
+    except LookupError as e:
+        return jsonify({'error': str(e)}), 404
+    except Exception as e:
+        print(f"[MarketingAPI] Claude/parse error: {e}")
+        traceback.print_exc()
+        return jsonify({'error': f'Strategy generation failed: {e}'}), 500
+
+
+@job_handler('marketing_strategy')
+def marketing_strategy_job(job, artist_id, intent=''):
+    """Background-job version of marketing_strategy_api; the result has the same JSON shape."""
+    sp = get_spotify_client_credentials_client()
+    if not sp:
+        raise JobFailed('Spotify unavailable')
+    try:
+        return _build_marketing_strategy(
+            sp, artist_id, (intent or '').strip()[:1500], progress=job.progress, emit=job.event,
+        )
+    except LookupError as e:
+        raise JobFailed(str(e)) from e
+    except Exception as e:
+        raise JobFailed(f'Strategy generation failed: {e}') from e
+
+
+def _collect_benchmark_peers(app, sp, artist_id, followers, popularity, state):
+    """
+    Fills `state['collab_targets']` and `state['benchmark_peers']` for the marketing
+    strategy, in place so a caller that stops waiting still sees what is done.
+
+    Peers are listed as soon as the related artists are known. Their releases and top
+    tracks are then fetched concurrently under the Spotify governor, and MusicBrainz
+    management and labels for the top 2 peers are looked up in parallel (served from
+    the MusicBrainz cache when possible).
+    """
+    with app.app_context():
+        related = sp.artist_related_artists(artist_id).get('artists', [])
+
+        # Collaboration targets (similar-level artists)
+        collab_pool = [
+            a for a in related
+            if a.get('popularity', 0) > 0
+            and (a.get('followers', {}).get('total', 0) or 0) < max(followers, 1) * 2.5
+            and a.get('popularity', 0) < popularity + 10
+        ]
+        collab_pool.sort(key=lambda x: abs((x.get('followers', {}).get('total', 0) or 0) - followers))
+        state['collab_targets'] = [
+            {'name': a.get('name', ''),
+             'followers': (a.get('followers', {}).get('total', 0) or 0),
+             'genres': a.get('genres', [])[:2]}
+            for a in collab_pool[:5]
+        ]
+
+        # Benchmark peers: similar artists with stronger metrics
+        candidates = [
+            a for a in related
+            if (a.get('popularity', 0) >= popularity + 8
+                or (a.get('followers', {}).get('total', 0) or 0) >= max(followers, 1) * 2)
+            and a.get('popularity', 0) > 0
+        ]
+        candidates.sort(key=lambda x: (x.get('followers', {}).get('total', 0) or 0), reverse=True)
+        candidates = candidates[:5]
+        peers = []
+        for peer in candidates:
+            peer_followers = (peer.get('followers', {}).get('total', 0) or 0)
+            peers.append({
+                'name': peer.get('name', ''),
+                'followers': peer_followers,
+                'popularity': peer.get('popularity', 0),
+                'genres': peer.get('genres', [])[:3],
+                'total_releases': 'N/A',
+                'active_since': 'Unknown',
+                'followers_multiplier': round(peer_followers / max(followers, 1), 1),
+                'top_track': None,
+                'top_track_popularity': 0,
+                'manager': None,
+                'booking_agent': None,
+                'mb_labels': [],
+            })
+        state['benchmark_peers'] = peers
+
+        from ..spotify.utils import calculate_release_stats as _crs
+        from ..musicbrainz.api import find_artist_mbid as _mb_find, get_artist_intel as _mb_intel
+
+        def spotify_details(i):
+            peer_id = candidates[i]['id']
+            try:
+                peer_stats = _crs(sp.artist_albums(peer_id, album_type='album,single', limit=10).get('items', [])) or {}
+                peers[i]['total_releases'] = peer_stats.get('total_releases', 'N/A')
+                peers[i]['active_since'] = peer_stats.get('first_release_year', 'Unknown')
+            except Exception:
+                pass
+            try:
+                top_tracks = sp.artist_top_tracks(peer_id).get('tracks', [])
+                if top_tracks:
+                    top = max(top_tracks, key=lambda t: t.get('popularity', 0))
+                    peers[i]['top_track'] = top.get('name')
+                    peers[i]['top_track_popularity'] = top.get('popularity', 0)
+            except Exception:
+                pass
+
+        def musicbrainz_details(i):
+            with app.app_context():
+                peer_mbid = _mb_find(peers[i]['name'])
+                peer_mb = _mb_intel(peer_mbid) if peer_mbid else None
+                if not peer_mb:
+                    return
+                for m in peer_mb.get('management', []):
+                    role = m.get('role', '').lower()
+                    if 'booking' in role or 'agent' in role:
+                        peers[i]['booking_agent'] = m['name']
+                    elif 'manag' in role:
+                        peers[i]['manager'] = m['name']
+                peers[i]['mb_labels'] = [l['name'] for l in peer_mb.get('labels', []) if not l.get('ended')][:2]
+
+        # MB lookup only for the top 2 peers (MusicBrainz allows ~1 request/s)
+        with ThreadPoolExecutor(max_workers=2, thread_name_prefix='peers-mb') as mb_pool:
+            mb_futures = [mb_pool.submit(bind_context(musicbrainz_details), i) for i in range(min(2, len(peers)))]
+            get_spotify_governor().map(spotify_details, range(len(peers)))
+            for future in mb_futures:
+                try:
+                    future.result()
+                except Exception as e:
+                    print(f"[MarketingAPI] Peer MusicBrainz error: {e}")
+
+
+def _build_marketing_strategy(sp, artist_id, intent, progress=None, emit=None):
+    """
+    Gathers artist data, benchmarks and intent context and asks Gemini for a marketing strategy.
+    Returns {'strategy', 'benchmark_peers', 'intent'}. Raises LookupError if the artist
+    is unknown; other failures propagate.
+
+    The strategy is streamed: `emit(event, data)` receives 'strategy_benchmarks' once the
+    peers are known, 'strategy_text' for each chunk of Gemini output and 'strategy_section'
+    ({key, value}) as soon as each top-level strategy field is complete.
+    """
+    progress = progress or (lambda percent, message: None)
+    emit = emit or (lambda event, data: None)
+    progress(5, 'Fetching artist profile...')
     try:
         artist = sp.artist(artist_id)
-        if not artist:
-            return jsonify({'error': 'Artist not found'}), 404
     except Exception:
-        return jsonify({'error': 'Artist not found'}), 404
+        artist = None
+    if not artist:
+        raise LookupError('Artist not found')
 
     artist_name = artist.get('name', '')
     genres = artist.get('genres', [])
     followers = (artist.get('followers') or {}).get('total', 0)
     popularity = artist.get('popularity', 0)
 
+    # Peer benchmarking only needs the artist, so it runs alongside everything below
+    peer_state = {'collab_targets': [], 'benchmark_peers': []}
+    peer_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix='peers')
+    peer_future = peer_pool.submit(
+        bind_context(_collect_benchmark_peers), current_app._get_current_object(), sp, artist_id, followers, popularity, peer_state,
+    )
+    peer_deadline = time.monotonic() + current_app.config['MARKETING_PEER_DEADLINE']
+
     # Gather extra data
     lastfm_tags, lastfm_stats, artist_labels, release_stats_obj = [], {}, [], {}
     available_markets = []
@@ -797,18 +1051,17 @@ def marketing_strategy_api(artist_id):
         lastfm_tags = scrape_lastfm_tags(artist_name) or []
     except Exception:
         pass
+    observe_artist(artist, lastfm_tags)
     try:
         lastfm_stats = scrape_lastfm_artist_stats(artist_name) or {}
     except Exception:
         pass
     try:
         simplified = sp.artist_albums(artist_id, album_type='album,single', limit=10).get('items', [])
-        seen_labels = set()
+        labels = album_labels(sp, [rel['id'] for rel in simplified[:5]])
         for rel in simplified[:5]:
-            full = sp.album(rel['id'])
-            lbl = full.get('label')
-            if lbl and lbl not in seen_labels:
-                seen_labels.add(lbl)
+            lbl = labels.get(rel['id'])
+            if lbl and lbl not in artist_labels:
                 artist_labels.append(lbl)
         from ..spotify.utils import calculate_release_stats
         release_stats_obj = calculate_release_stats(simplified) or {}
@@ -843,6 +1096,7 @@ def marketing_strategy_api(artist_id):
     market_breakdown = _compute_market_breakdown(available_markets)
 
     # ── Phase 1: NLP intent parsing ───────────────────────────────────────
+    progress(30, 'Understanding your goal...')
     parsed_intent = {}
     if intent:
         try:
@@ -861,6 +1115,7 @@ def marketing_strategy_api(artist_id):
     p_key_context   = (parsed_intent.get('key_context') or '').strip()
 
     # ── Top tracks + audio features ──────────────────────────────────────
+    progress(40, 'Analysing top tracks...')
     # For sync_licensing intent, fetch more tracks for a broader sonic picture
     top_track_limit = 10 if 'sync_licensing' in p_intent_types else 5
     top_tracks_data = []
@@ -874,7 +1129,7 @@ def marketing_strategy_api(artist_id):
         ]
         track_ids = [t['id'] for t in sp_top if t.get('id')]
         if track_ids:
-            rb_resp = requests.get(
+            rb_resp = _RECCOBEATS.get(
                 'https://api.reccobeats.com/v1/audio-features',
                 params={'ids': ','.join(track_ids)},
                 timeout=10,
@@ -899,7 +1154,7 @@ def marketing_strategy_api(artist_id):
             or any(kw in intent.lower() for kw in ['ep', 'album', 'single', 'track', 'release'])
         )
     )
-    if needs_release:
+    if needs_release and has_time(30, 'release_context'):
         try:
             all_releases = sp.artist_albums(
                 artist_id, album_type='album,single', limit=20, country='US'
@@ -943,7 +1198,7 @@ def marketing_strategy_api(artist_id):
                 rel_feat_map = {}
                 rel_audio_avgs = {}
                 if rel_track_ids:
-                    rb2 = requests.get(
+                    rb2 = _RECCOBEATS.get(
                         'https://api.reccobeats.com/v1/audio-features',
                         params={'ids': ','.join(rel_track_ids)},
                         timeout=10,
@@ -1020,111 +1275,26 @@ def marketing_strategy_api(artist_id):
 
     # ── Phase 2b: Reference artist lookup (sonic benchmarks from intent) ──
     ref_artists_section = ""
-    if p_ref_artists:
+    if p_ref_artists and has_time(30, 'reference_artists'):
         try:
             ref_artists_section = _fetch_reference_artist_context(sp, p_ref_artists)
         except Exception as e:
             print(f"[MarketingAPI] Reference artist error: {e}")
 
-    # ── Related artists (shared pool for benchmarks + collabs) ───────────
-    _related_all = []
-    try:
-        _related_all = sp.artist_related_artists(artist_id).get('artists', [])
-    except Exception as e:
-        print(f"[MarketingAPI] Related artists error: {e}")
-
-    # ── Collaboration targets (similar-level artists) ─────────────────────
-    collab_targets = []
-    try:
-        _collab_pool = [
-            a for a in _related_all
-            if a.get('popularity', 0) > 0
-            and (a.get('followers', {}).get('total', 0) or 0) < max(followers, 1) * 2.5
-            and a.get('popularity', 0) < popularity + 10
-        ]
-        _collab_pool.sort(key=lambda x: abs((x.get('followers', {}).get('total', 0) or 0) - followers))
-        collab_targets = [
-            {'name': a.get('name', ''),
-             'followers': (a.get('followers', {}).get('total', 0) or 0),
-             'genres': a.get('genres', [])[:2]}
-            for a in _collab_pool[:5]
-        ]
-    except Exception as e:
-        print(f"[MarketingAPI] Collab targets error: {e}")
-
-    # ── Benchmark peers: similar artists with stronger metrics ──────────
-    benchmark_peers = []
+    # ── Related artists, collab targets and benchmark peers ──────────────
+    # Started right after the artist lookup and running alongside the work above;
+    # whatever peer data is ready by the deadline is used
+    progress(55, 'Benchmarking similar artists...')
     try:
-        candidates = [
-            a for a in _related_all
-            if (a.get('popularity', 0) >= popularity + 8
-                or (a.get('followers', {}).get('total', 0) or 0) >= max(followers, 1) * 2)
-            and a.get('popularity', 0) > 0
-        ]
-        candidates.sort(
-            key=lambda x: (x.get('followers', {}).get('total', 0) or 0),
-            reverse=True
-        )
-        from ..spotify.utils import calculate_release_stats as _crs
-        from ..musicbrainz.api import find_artist_mbid as _mb_find, get_artist_intel as _mb_intel
-        for peer in candidates[:5]:
-            peer_id = peer['id']
-            peer_followers = (peer.get('followers', {}).get('total', 0) or 0)
-            peer_name = peer.get('name', '')
-            peer_genres = peer.get('genres', [])
-            peer_popularity = peer.get('popularity', 0)
-            peer_stats = {}
-            peer_top_track = None
-            peer_top_track_pop = 0
-            peer_manager = None
-            peer_booking_agent = None
-            peer_mb_labels = []
-            try:
-                peer_releases = sp.artist_albums(peer_id, album_type='album,single', limit=10).get('items', [])
-                peer_stats = _crs(peer_releases) or {}
-            except Exception:
-                pass
-            try:
-                top_tracks = sp.artist_top_tracks(peer_id).get('tracks', [])
-                if top_tracks:
-                    top = max(top_tracks, key=lambda t: t.get('popularity', 0))
-                    peer_top_track = top.get('name')
-                    peer_top_track_pop = top.get('popularity', 0)
-            except Exception:
-                pass
-            # MB lookup only for top 2 peers (1.1s rate limit per call)
-            if len(benchmark_peers) < 2:
-                try:
-                    peer_mbid = _mb_find(peer_name)
-                    if peer_mbid:
-                        peer_mb = _mb_intel(peer_mbid)
-                        if peer_mb:
-                            mgmt = peer_mb.get('management', [])
-                            for m in mgmt:
-                                role = m.get('role', '').lower()
-                                if 'booking' in role or 'agent' in role:
-                                    peer_booking_agent = m['name']
-                                elif 'manag' in role:
-                                    peer_manager = m['name']
-                            peer_mb_labels = [l['name'] for l in peer_mb.get('labels', []) if not l.get('ended')][:2]
-                except Exception:
-                    pass
-            benchmark_peers.append({
-                'name': peer_name,
-                'followers': peer_followers,
-                'popularity': peer_popularity,
-                'genres': peer_genres[:3],
-                'total_releases': peer_stats.get('total_releases', 'N/A'),
-                'active_since': peer_stats.get('first_release_year', 'Unknown'),
-                'followers_multiplier': round(peer_followers / max(followers, 1), 1),
-                'top_track': peer_top_track,
-                'top_track_popularity': peer_top_track_pop,
-                'manager': peer_manager,
-                'booking_agent': peer_booking_agent,
-                'mb_labels': peer_mb_labels,
-            })
+        peer_future.result(timeout=max(0.0, peer_deadline - time.monotonic()))
+    except FuturesTimeout:
+        print("[MarketingAPI] Peer enrichment past its deadline; using partial peer data")
     except Exception as e:
         print(f"[MarketingAPI] Benchmark peers error: {e}")
+    finally:
+        peer_pool.shutdown(wait=False)
+    collab_targets = list(peer_state['collab_targets'])
+    benchmark_peers = [dict(peer) for peer in peer_state['benchmark_peers']]
 
     def _audio_label(key, val):
         thresholds = {
@@ -1416,19 +1586,17 @@ Return ONLY a valid JSON object. No markdown. No explanation. Exactly this schem
   }}
 }}"""
 
-    try:
-        import re as re_module
-        text = _ai_call(prompt)
-        # Strip any markdown code fences
-        text = re_module.sub(r'^```(?:json)?\s*', '', text)
-        text = re_module.sub(r'\s*```$', '', text)
-        import json as json_module
-        strategy = json_module.loads(text)
-        return jsonify({'strategy': strategy, 'benchmark_peers': benchmark_peers, 'intent': intent})
-    except Exception as e:
-        print(f"[MarketingAPI] Claude/parse error: {e}")
-        traceback.print_exc()
-        return jsonify({'error': f'Strategy generation failed: {e}'}), 500
+    emit('strategy_benchmarks', {'benchmark_peers': benchmark_peers})
+    progress(80, 'Writing your strategy...')
+    strategy = {}
+    parser = JSONObjectStream() # Skips any markdown code fences around the object
+    for chunk in get_llm().stream_text('marketing_strategy', prompt):
+        emit('strategy_text', {'text': chunk})
+        for key, value in parser.feed(chunk):
+            strategy[key] = value
+            emit('strategy_section', {'key': key, 'value': value})
+    parser.close()
+    return {'strategy': strategy, 'benchmark_peers': benchmark_peers, 'intent': intent}
 
 
 @main_bp.route('/search', methods=['GET'])
@@ -1455,6 +1623,18 @@ def search_artist():
     return render_template('search.html', query=query, error=error)
 
 
+def _similar_artists_pool(sp, artist_id):
+    """
+    Returns the PoolIndex of an artist's similar-artist pool from the shared pool service.
+    The session only remembers the store handle.
+    """
+    pool = similar_artist_pool.get(sp, artist_id)
+    session_key = f"similar_artists_pool_{artist_id}"
+    if session.get(session_key) != pool_handle(artist_id):
+        session[session_key] = pool_handle(artist_id)
+    return pool
+
+
 @main_bp.route('/similar-artists/<artist_id>', methods=['GET'])
 def similar_artists(artist_id):
     sp = get_spotify_client_credentials_client()
@@ -1467,59 +1647,28 @@ def similar_artists(artist_id):
         max_followers = request.args.get('max_followers', default=None, type=int)
         min_popularity = request.args.get('min_popularity', default=None, type=int)
         max_popularity = request.args.get('max_popularity', default=None, type=int)
+        genre = request.args.get('genre') or None
         page = request.args.get('page', default=1, type=int)
         if page < 1:
             page = 1
     except ValueError:
         flash("Invalid filter or page value.", "warning")
-        min_followers = max_followers = min_popularity = max_popularity = None
+        min_followers = max_followers = min_popularity = max_popularity = genre = None
         page = 1
 
     per_page = 24
-    source_artist = None
-    pool_key = f"similar_artists_pool_{artist_id}"
+    source_artist_name = None
 
     try:
-        source_artist = sp.artist(artist_id)
-        source_artist_name = source_artist.get('name', 'Selected Artist')
-        source_artist_genres = source_artist.get('genres', [])
-
-        spotify_genre_artists = fetch_similar_artists_by_genre(sp, artist_id, source_artist_name, source_artist_genres)
-        lastfm_names = scrape_all_lastfm_similar_artists_names(source_artist_name, max_pages=5)
-        lastfm_spotify_artists = fetch_spotify_details_for_names(sp, lastfm_names or [])
-
-        combined_artists_map = {a['id']: a for a in spotify_genre_artists if a and a.get('id') != artist_id}
-        for a in lastfm_spotify_artists:
-            if a and a.get('id') != artist_id:
-                combined_artists_map[a['id']] = a
-        combined_pool = list(combined_artists_map.values())
-
-        session[pool_key] = combined_pool
-
-        total_pool_size = len(combined_pool)
-        aggregated_genres = {}
-        for a in combined_pool:
-            for genre in a.get('genres', []):
-                gk = genre.lower()
-                aggregated_genres[gk] = aggregated_genres.get(gk, {'display_name': genre, 'count': 0})
-                aggregated_genres[gk]['count'] += 1
-        sorted_genres = sorted(aggregated_genres.values(), key=lambda x: x['count'], reverse=True)
-
-        filtered_artists = []
-        for a in combined_pool:
-            followers = a.get('followers', {}).get('total')
-            popularity = a.get('popularity')
-            if min_followers is not None and (followers is None or followers < min_followers): continue
-            if max_followers is not None and (followers is None or followers > max_followers): continue
-            if min_popularity is not None and (popularity is None or popularity < min_popularity): continue
-            if max_popularity is not None and (popularity is None or popularity > max_popularity): continue
-            filtered_artists.append(a)
-
-        filtered_artists.sort(key=lambda a: a.get('popularity', 0), reverse=True)
-        total_artists = len(filtered_artists)
+        pool = _similar_artists_pool(sp, artist_id)
+        source_artist_name = pool.source['name']
+        source_artist_genres = pool.source['genres']
+
+        rows = pool.query(min_followers, max_followers, min_popularity, max_popularity, genre=genre)
+        total_artists = len(rows)
         total_pages = math.ceil(total_artists / per_page)
         offset = (page - 1) * per_page
-        artists_on_page = filtered_artists[offset: offset + per_page]
+        artists_on_page = pool.rows_to_artists(rows[offset: offset + per_page])
 
         return render_template(
             'similar_artists.html',
@@ -1531,14 +1680,14 @@ def similar_artists(artist_id):
             min_popularity=min_popularity, max_popularity=max_popularity,
             current_page=page, total_pages=total_pages,
             total_artists=total_artists, per_page=per_page,
-            aggregated_genres=sorted_genres, total_pool_size=total_pool_size,
+            aggregated_genres=pool.genre_facets, total_pool_size=len(pool), genre=genre,
         )
 
     except Exception as e:
         print(f"Unexpected error in similar_artists route: {e}")
         traceback.print_exc()
         flash('An unexpected error occurred while finding similar artists.', 'error')
-        source_name = source_artist.get('name', 'the artist') if source_artist else 'the artist'
+        source_name = source_artist_name or 'the artist'
         return render_template(
             'similar_artists.html', artists=[], source_artist_name=source_name,
             source_artist_id=artist_id, aggregated_genres=[], total_pool_size=0,
@@ -1552,72 +1701,33 @@ def download_similar_artists(artist_id):
         return "Spotify API client could not be initialized.", 500
 
     try:
-        pool_key = f"similar_artists_pool_{artist_id}"
-        combined_pool = session.get(pool_key)
-
-        source_artist = sp.artist(artist_id)
-        source_artist_name = source_artist.get('name', 'artist').replace(" ", "_")
-
-        if combined_pool is None:
-            source_artist_genres = source_artist.get('genres', [])
-            real_source_name = source_artist.get('name', 'artist')
-            spotify_genre_artists = fetch_similar_artists_by_genre(sp, artist_id, real_source_name, source_artist_genres)
-            lastfm_names = scrape_all_lastfm_similar_artists_names(real_source_name, max_pages=5)
-            lastfm_spotify_artists = fetch_spotify_details_for_names(sp, lastfm_names or [])
-            combined_artists_map = {a['id']: a for a in spotify_genre_artists if a and a.get('id') != artist_id}
-            for a in lastfm_spotify_artists:
-                if a and a.get('id') != artist_id:
-                    combined_artists_map[a['id']] = a
-            combined_pool = list(combined_artists_map.values())
+        pool = _similar_artists_pool(sp, artist_id)
+        source_artist_name = pool.source['name'].replace(" ", "_")
 
         min_followers = request.args.get('min_followers', default=None, type=int)
         max_followers = request.args.get('max_followers', default=None, type=int)
         min_popularity = request.args.get('min_popularity', default=None, type=int)
         max_popularity = request.args.get('max_popularity', default=None, type=int)
-        columns = request.args.get('columns', 'name,followers,popularity').split(',')
+        columns = export_columns(request.args.get('columns', 'name,followers,popularity').split(','))
         file_format = request.args.get('format', 'csv')
 
-        filtered_artists = []
-        for a in combined_pool:
-            followers = a.get('followers', {}).get('total')
-            popularity = a.get('popularity')
-            if min_followers is not None and (followers is None or followers < min_followers): continue
-            if max_followers is not None and (followers is None or followers > max_followers): continue
-            if min_popularity is not None and (popularity is None or popularity < min_popularity): continue
-            if max_popularity is not None and (popularity is None or popularity > max_popularity): continue
-            filtered_artists.append(a)
-
-        if not filtered_artists:
+        genre = request.args.get('genre') or None
+        rows = pool.query(min_followers, max_followers, min_popularity, max_popularity, genre=genre)
+        if not len(rows):
             return "No artists match the specified filters.", 404
-
-        df = pd.DataFrame(filtered_artists)
-        column_mappers = {
-            'name': lambda r: r.get('name', 'N/A'),
-            'followers': lambda r: r.get('followers', {}).get('total'),
-            'popularity': lambda r: r.get('popularity'),
-            'genres': lambda r: ', '.join(r.get('genres', [])),
-            'url': lambda r: r.get('external_urls', {}).get('spotify'),
-            'image_url': lambda r: r['images'][0]['url'] if r.get('images') else None,
-        }
-
-        output_df = pd.DataFrame()
-        for col in columns:
-            if col in column_mappers:
-                output_df[col] = df.apply(column_mappers[col], axis=1)
-
-        output = io.BytesIO()
-        filename = f"similar_to_{source_artist_name}.{file_format}"
+        rows = pool.rows_to_artists(rows)
 
         if file_format == 'xlsx':
-            output_df.to_excel(output, index=False, sheet_name='Similar Artists')
-            mimetype = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+            filename = f"similar_to_{source_artist_name}.xlsx"
+            body = iter_file_chunks(write_similar_artists_xlsx(rows, columns))
+            mimetype = XLSX_MIMETYPE
         else:
-            output_df.to_csv(output, index=False, encoding='utf-8')
-            mimetype = 'text/csv'
+            filename = f"similar_to_{source_artist_name}.csv"
+            body = iter_similar_artists_csv(rows, columns)
+            mimetype = CSV_MIMETYPE
 
-        output.seek(0)
         return Response(
-            output,
+            stream_with_context(body),
             mimetype=mimetype,
             headers={"Content-Disposition": f"attachment;filename={filename}"},
         )
@@ -1,36 +1,74 @@
 import requests
 import time
+import threading
 import traceback
 
+from flask import current_app, has_app_context
+
+from ..cache import get_cache, known_missing, remember_missing
+from ..httpclient import make_session
+from ..singleflight import coalesce
+
 MB_BASE = "https://musicbrainz.org/ws/2"
 
-SESSION = requests.Session()
+SESSION = make_session(upstream='musicbrainz')
 SESSION.headers.update({
     'User-Agent': 'FuzzTracks/1.0 (contact@fuzztracks.com)',
     'Accept': 'application/json',
 })
 
 _last_request_time = 0
+_throttle_lock = threading.Lock()
 
 
-def _mb_get(endpoint, params=None):
+def _wait_for_slot():
+    """MusicBrainz allows ~1 request/s; concurrent callers each reserve the next free slot."""
     global _last_request_time
-    elapsed = time.time() - _last_request_time
-    if elapsed < 1.1:
-        time.sleep(1.1 - elapsed)
+    with _throttle_lock:
+        slot = max(time.time(), _last_request_time + 1.1)
+        _last_request_time = slot
+    if slot > time.time():
+        time.sleep(slot - time.time())
+
+
+def _response_cache():
+    # Lookups are shared by every worker; outside an app context they are simply not cached
+    if not has_app_context():
+        return None
+    return get_cache('musicbrainz', default_ttl=current_app.config['MUSICBRAINZ_CACHE_TTL'])
 
+
+def _mb_get(endpoint, params=None):
     url = f"{MB_BASE}/{endpoint}"
     if params is None:
         params = {}
     params['fmt'] = 'json'
 
+    cache = _response_cache()
+    cache_key = endpoint + '?' + '&'.join(f"{k}={v}" for k, v in sorted(params.items()))
+    if cache is not None:
+        cached = cache.get(cache_key)
+        if cached is not None:
+            return cached
+    if known_missing('musicbrainz', cache_key):
+        return None
+    # Identical lookups in flight (e.g. intel and label contacts for the same artist) share one request
+    return coalesce('musicbrainz', cache_key, _mb_fetch, endpoint, url, params, cache_key, cache)
+
+
+def _mb_fetch(endpoint, url, params, cache_key, cache):
+    _wait_for_slot()
     try:
         resp = SESSION.get(url, params=params, timeout=15)
-        _last_request_time = time.time()
         resp.raise_for_status()
-        return resp.json()
+        data = resp.json()
+        if cache is not None:
+            cache.set(cache_key, data)
+        return data
     except requests.exceptions.HTTPError as e:
         print(f"[MusicBrainz] HTTP error for {endpoint}: {e}")
+        if e.response is not None and e.response.status_code == 404:
+            remember_missing('musicbrainz', cache_key)
         return None
     except Exception as e:
         print(f"[MusicBrainz] Error fetching {endpoint}: {e}")
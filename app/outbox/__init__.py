@@ -0,0 +1,10 @@
+from flask import Blueprint
+
+# JSON/SSE API for following email campaigns, registered under /api/outbox
+outbox_bp = Blueprint('outbox', __name__, url_prefix='/api/outbox')
+
+from .store import OutboxStore  # noqa: E402,F401
+from .sender import OutboxSender, init_outbox, get_outbox  # noqa: E402,F401
+
+# Import routes after blueprint creation
+from .routes import campaign_urls  # noqa: E402,F401
@@ -0,0 +1,50 @@
+from flask import request, jsonify, url_for, current_app
+
+from . import outbox_bp
+from .sender import get_outbox
+from ..sse import event_log_response
+
+
+def campaign_urls(campaign_id):
+    """Same shape as job_urls, so the client follows a campaign like any background job."""
+    return {
+        'campaign_id': campaign_id,
+        'status_url': url_for('outbox.campaign_status', campaign_id=campaign_id),
+        'events_url': url_for('outbox.campaign_events', campaign_id=campaign_id),
+        'result_url': url_for('outbox.campaign_result', campaign_id=campaign_id),
+    }
+
+
+@outbox_bp.route('/campaigns/<campaign_id>', methods=['GET'])
+def campaign_status(campaign_id):
+    campaign = get_outbox().store.get_campaign(campaign_id)
+    if campaign is None:
+        return jsonify({'error': 'Campaign not found.'}), 404
+    return jsonify({**campaign, 'variants': get_outbox().store.variant_counts(campaign_id)})
+
+
+@outbox_bp.route('/campaigns/<campaign_id>/result', methods=['GET'])
+def campaign_result(campaign_id):
+    campaign = get_outbox().store.get_campaign(campaign_id)
+    if campaign is None:
+        return jsonify({'error': 'Campaign not found.'}), 404
+    if campaign['finished_at'] is None:
+        return jsonify({'status': 'sending', 'sent': campaign['sent'], 'total': campaign['total']}), 202
+    return jsonify({
+        'sent': campaign['sent'], 'errors': campaign['failed'],
+        'message': f"Sent: {campaign['sent']}, Errors: {campaign['failed']}.",
+    })
+
+
+@outbox_bp.route('/campaigns/<campaign_id>/events', methods=['GET'])
+def campaign_events(campaign_id):
+    """Server-sent delivery events for a campaign. Only reads the outbox; sending happens in the sender thread."""
+    store = get_outbox().store
+    if store.get_campaign(campaign_id) is None:
+        return jsonify({'error': 'Campaign not found.'}), 404
+    after_seq = request.headers.get('Last-Event-ID', type=int) or request.args.get('after', default=0, type=int)
+    return event_log_response(
+        lambda seq: store.events_after(campaign_id, seq),
+        lambda: store.get_campaign(campaign_id)['finished_at'] is not None,
+        after_seq, current_app.config['JOB_STREAM_WINDOW'],
+    )
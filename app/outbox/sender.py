@@ -0,0 +1,206 @@
+import os
+import time
+import uuid
+import random
+import smtplib
+import threading
+import traceback
+from email.message import EmailMessage
+
+from flask import current_app
+
+from .store import OutboxStore
+
+_LEASE_TTL = 120 # Seconds; renewed every loop, so well above the SMTP timeout
+_POLL_INTERVAL = 5 # How often an idle or non-leader sender looks at the store again
+_SMTP_TIMEOUT = 30
+
+# SMTP failures worth retrying later: dropped connections and 4xx replies
+_TRANSIENT_ERRORS = (smtplib.SMTPServerDisconnected, smtplib.SMTPConnectError, ConnectionError, TimeoutError, OSError)
+
+
+def _is_transient(error):
+    code = getattr(error, 'smtp_code', None)
+    if isinstance(error, smtplib.SMTPRecipientsRefused):
+        codes = [code for code, _ in error.recipients.values()]
+        return bool(codes) and all(400 <= code < 500 for code in codes)
+    if code is not None:
+        return 400 <= code < 500
+    return isinstance(error, _TRANSIENT_ERRORS)
+
+
+class OutboxSender:
+    """
+    Background thread that delivers queued outbox messages over one reused SMTP connection.
+
+    Every worker process runs a sender, but only the holder of the store's lease sends,
+    so there is one connection and one pacing schedule per host. Between messages the
+    thread waits on an Event until the next message is due (OUTBOX_MIN_INTERVAL to
+    OUTBOX_MAX_INTERVAL seconds after the previous send, as before); wake() cuts the wait
+    short when new mail is queued in this process. A dropped connection is reopened and
+    the message retried once straight away; other temporary failures go back to the queue
+    with a backoff, up to OUTBOX_MAX_ATTEMPTS. So does a claimed message whose delivery
+    was cut short by an unexpected error (e.g. the store staying locked).
+
+    For local testing, point SMTP_SERVER/SMTP_PORT at `python -m aiosmtpd -n -l localhost:8025`
+    with SMTP_USE_TLS=0 and no SENDER_PASSWORD.
+    """
+
+    def __init__(self, store, config):
+        self.store = store
+        self.config = config
+        self._wakeup = threading.Event()
+        self._stopped = threading.Event()
+        self._thread = None
+        self._smtp = None
+        self._smtp_used_at = 0
+        self._token = None
+        self._interrupted = None # (message, error) left in 'sending' by a failed loop iteration
+
+    def start(self):
+        # Identifies this sender's lease; pids repeat across restarts, so they can't
+        self._token = f"{os.getpid()}-{uuid.uuid4().hex}"
+        self._thread = threading.Thread(target=self._run, name='outbox-sender', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stopped.set()
+        self._wakeup.set()
+        if self._thread:
+            self._thread.join(timeout=_SMTP_TIMEOUT)
+
+    def wake(self):
+        self._wakeup.set()
+
+    def _wait(self, seconds):
+        self._wakeup.wait(timeout=seconds)
+        self._wakeup.clear()
+
+    def _run(self):
+        print(f"[Outbox] Sender started in process {os.getpid()}.")
+        while not self._stopped.is_set():
+            message = None
+            try:
+                if not self.store.acquire_lease(self._token, _LEASE_TTL):
+                    self._interrupted = None # Whoever took over the lease requeued it
+                    self._close()
+                    self._wait(_POLL_INTERVAL)
+                    continue
+                if self._interrupted is not None:
+                    self._requeue(*self._interrupted)
+                    self._interrupted = None
+                message = self.store.claim_next()
+                if message is None:
+                    if self._smtp and time.time() - self._smtp_used_at > self.config['OUTBOX_IDLE_TIMEOUT']:
+                        self._close()
+                    due_in = self.store.seconds_until_due()
+                    self._wait(_POLL_INTERVAL if due_in is None else min(due_in, _POLL_INTERVAL))
+                    continue
+                self._deliver(message)
+            except Exception as e:
+                print(f"[Outbox] Sender loop error: {e}")
+                traceback.print_exc()
+                if message is not None:
+                    # Put it back on the next iteration, so its campaign can still finish
+                    self._interrupted = (message, f"{type(e).__name__}: {e}")
+                self._close()
+                self._wait(_POLL_INTERVAL)
+        self._close()
+        self.store.release_lease(self._token)
+
+    # --- SMTP connection ---
+
+    def _connection(self):
+        if self._smtp is None:
+            config = self.config
+            host, port = config['SMTP_SERVER'], config['SMTP_PORT']
+            print(f"[Outbox] Connecting to SMTP server {host}:{port}...")
+            if port == 465:
+                smtp = smtplib.SMTP_SSL(host, port, timeout=_SMTP_TIMEOUT)
+            else:
+                smtp = smtplib.SMTP(host, port, timeout=_SMTP_TIMEOUT)
+                if config['SMTP_USE_TLS']:
+                    smtp.starttls()
+            if config.get('SENDER_PASSWORD'):
+                smtp.login(config.get('SMTP_LOGIN_USER') or config['SENDER_EMAIL'], config['SENDER_PASSWORD'])
+            self._smtp = smtp
+        return self._smtp
+
+    def _close(self):
+        if self._smtp is None:
+            return
+        try:
+            self._smtp.quit()
+        except Exception:
+            pass
+        self._smtp = None
+
+    # --- Delivery ---
+
+    def _build(self, message):
+        msg = EmailMessage()
+        msg['Subject'] = message['subject']
+        msg['From'] = f"FuzzTracks <{self.config['SENDER_EMAIL']}>"
+        msg['To'] = message['recipient']
+        if message['bcc']:
+            msg['Bcc'] = message['bcc']
+        msg.set_content(message['body']) # Plain text only, for domain warm-up
+        return msg
+
+    def _send(self, msg):
+        reused = self._smtp is not None
+        try:
+            self._connection().send_message(msg)
+        except smtplib.SMTPServerDisconnected:
+            self._close()
+            if not reused:
+                raise
+            self._connection().send_message(msg) # The server closed an idle connection; retry once
+        self._smtp_used_at = time.time()
+
+    def _requeue(self, message, error):
+        if message['attempts'] < self.config['OUTBOX_MAX_ATTEMPTS']:
+            self.store.defer(message, error, self.config['OUTBOX_RETRY_DELAY'])
+        else:
+            self.store.mark_failed(message, error)
+
+    def _deliver(self, message):
+        config = self.config
+        try:
+            self._send(self._build(message))
+        except Exception as e:
+            refused = isinstance(e, (smtplib.SMTPResponseException, smtplib.SMTPRecipientsRefused))
+            if not refused or isinstance(e, smtplib.SMTPAuthenticationError):
+                self._close() # The connection itself may be broken; reopen it for the next message
+            error = f"{type(e).__name__}: {e}"
+            if isinstance(e, smtplib.SMTPAuthenticationError):
+                # Nothing will get through until the credentials are fixed; hold the queue
+                print(f"[Outbox] SMTP authentication failed: {e}")
+                self.store.defer(message, 'SMTP authentication failed', config['OUTBOX_RETRY_DELAY'] * 10)
+            elif _is_transient(e) and message['attempts'] < config['OUTBOX_MAX_ATTEMPTS']:
+                self.store.defer(message, error, config['OUTBOX_RETRY_DELAY'] * 2 ** (message['attempts'] - 1))
+            else:
+                self.store.mark_failed(message, error)
+            return
+        pause = random.uniform(config['OUTBOX_MIN_INTERVAL'], config['OUTBOX_MAX_INTERVAL'])
+        self.store.mark_sent(message, next_send_at=time.time() + pause)
+
+
+def init_outbox(app):
+    """
+    Creates this process's outbox store and starts its sender thread, if SMTP is configured
+    and OUTBOX_SENDER_ENABLED is on (turn it off for scripts and one-off app contexts).
+    """
+    store = OutboxStore(app.config['OUTBOX_DB'])
+    sender = OutboxSender(store, app.config)
+    app.extensions['outbox'] = sender
+    if not app.config['OUTBOX_SENDER_ENABLED']:
+        return
+    if app.config.get('SENDER_EMAIL') and app.config.get('SMTP_SERVER'):
+        sender.start()
+    else:
+        print("Warning: SENDER_EMAIL or SMTP_SERVER not set; the email outbox will not send.")
+
+
+def get_outbox():
+    return current_app.extensions['outbox']
@@ -0,0 +1,262 @@
+import os
+import json
+import time
+import uuid
+import sqlite3
+import threading
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS campaigns (
+    id TEXT PRIMARY KEY,
+    subject TEXT NOT NULL,
+    total INTEGER NOT NULL,
+    finished_at REAL,
+    created_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS messages (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    campaign_id TEXT NOT NULL,
+    recipient TEXT NOT NULL,
+    subject TEXT NOT NULL,
+    body TEXT NOT NULL,
+    bcc TEXT,
+    variant TEXT,
+    status TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    error TEXT,
+    not_before REAL NOT NULL,
+    sent_at REAL,
+    created_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS messages_due ON messages (status, not_before, id);
+CREATE INDEX IF NOT EXISTS messages_campaign ON messages (campaign_id, status);
+CREATE TABLE IF NOT EXISTS campaign_events (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    campaign_id TEXT NOT NULL,
+    event TEXT NOT NULL,
+    data TEXT NOT NULL,
+    created_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS campaign_events_campaign ON campaign_events (campaign_id, seq);
+CREATE TABLE IF NOT EXISTS sender_lease (
+    id INTEGER PRIMARY KEY CHECK (id = 1),
+    owner TEXT, -- Token of the sender holding the lease (see OutboxSender.start)
+    expires_at REAL NOT NULL DEFAULT 0,
+    next_send_at REAL NOT NULL DEFAULT 0
+);
+INSERT OR IGNORE INTO sender_lease (id) VALUES (1);
+"""
+
+PENDING = 'pending'
+SENDING = 'sending'
+SENT = 'sent'
+FAILED = 'failed'
+
+
+class OutboxStore:
+    """
+    SQLite-backed outbox shared by every worker process on the host.
+
+    A campaign is a batch of rendered messages. Messages move pending -> sending ->
+    sent/failed; a failed attempt that may succeed later goes back to pending with a
+    later not_before. Delivery is recorded as campaign events in the same shape as job
+    events, so progress streams only read this store.
+
+    The single sender_lease row decides which process sends, and carries the
+    host-wide pacing (next_send_at) so every process honours the same gap between emails.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._connect() as conn:
+            conn.executescript(_SCHEMA)
+            columns = {row['name'] for row in conn.execute('PRAGMA table_info(messages)')}
+            if 'variant' not in columns: # Outboxes created before variant tracking
+                conn.execute('ALTER TABLE messages ADD COLUMN variant TEXT')
+            columns = {row['name'] for row in conn.execute('PRAGMA table_info(sender_lease)')}
+            if 'owner' not in columns: # Outboxes whose lease was keyed by pid
+                conn.execute('ALTER TABLE sender_lease ADD COLUMN owner TEXT')
+
+    def _connect(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10)
+            conn.row_factory = sqlite3.Row
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+        return conn
+
+    def _add_event(self, conn, campaign_id, event, data):
+        conn.execute(
+            'INSERT INTO campaign_events (campaign_id, event, data, created_at) VALUES (?, ?, ?, ?)',
+            (campaign_id, event, json.dumps(data), time.time()),
+        )
+
+    # --- Campaigns ---
+
+    def create_campaign(self, subject, messages, notes=()):
+        """
+        Queues a campaign. `messages` are dicts with recipient, subject, body, bcc and
+        variant (the template variant id); `notes` are status lines (e.g. skipped
+        playlists) recorded before sending starts. Returns the campaign id.
+        """
+        campaign_id = uuid.uuid4().hex
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute(
+                'INSERT INTO campaigns (id, subject, total, created_at) VALUES (?, ?, ?, ?)',
+                (campaign_id, subject, len(messages), now),
+            )
+            conn.executemany(
+                'INSERT INTO messages (campaign_id, recipient, subject, body, bcc, variant, status, not_before, created_at) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                [(campaign_id, m['recipient'], m['subject'], m['body'], m.get('bcc') or None, m.get('variant'),
+                  PENDING, now, now) for m in messages],
+            )
+            self._add_event(conn, campaign_id, 'status', f"Queued {len(messages)} emails for sending.")
+            for note in notes:
+                self._add_event(conn, campaign_id, 'status', note)
+            self._finish_if_complete(conn, campaign_id)
+        return campaign_id
+
+    def get_campaign(self, campaign_id):
+        conn = self._connect()
+        row = conn.execute('SELECT * FROM campaigns WHERE id = ?', (campaign_id,)).fetchone()
+        if row is None:
+            return None
+        campaign = dict(row)
+        counts = dict(conn.execute(
+            'SELECT status, COUNT(*) FROM messages WHERE campaign_id = ? GROUP BY status', (campaign_id,)
+        ).fetchall())
+        campaign.update({status: counts.get(status, 0) for status in (PENDING, SENDING, SENT, FAILED)})
+        return campaign
+
+    def variant_counts(self, campaign_id):
+        """Per template variant: how many of the campaign's messages were sent and failed."""
+        rows = self._connect().execute(
+            'SELECT variant, SUM(status = ?) AS sent, SUM(status = ?) AS failed FROM messages '
+            'WHERE campaign_id = ? AND variant IS NOT NULL GROUP BY variant ORDER BY variant',
+            (SENT, FAILED, campaign_id),
+        ).fetchall()
+        return {row['variant']: {'sent': row['sent'], 'failed': row['failed']} for row in rows}
+
+    def _finish_if_complete(self, conn, campaign_id):
+        remaining = conn.execute(
+            'SELECT COUNT(*) FROM messages WHERE campaign_id = ? AND status IN (?, ?)',
+            (campaign_id, PENDING, SENDING),
+        ).fetchone()[0]
+        if remaining:
+            return
+        now = time.time()
+        updated = conn.execute(
+            'UPDATE campaigns SET finished_at = ? WHERE id = ? AND finished_at IS NULL', (now, campaign_id)
+        ).rowcount
+        if not updated:
+            return
+        created_at, sent, failed = conn.execute(
+            'SELECT c.created_at, '
+            'SUM(m.status = ?), SUM(m.status = ?) '
+            'FROM campaigns c LEFT JOIN messages m ON m.campaign_id = c.id WHERE c.id = ?',
+            (SENT, FAILED, campaign_id),
+        ).fetchone()
+        message = f"Finished in {round(now - created_at)}s. Sent: {sent or 0}, Errors: {failed or 0}."
+        self._add_event(conn, campaign_id, 'done', message)
+        self._add_event(conn, campaign_id, 'end', {'status': 'done'})
+
+    def events_after(self, campaign_id, after_seq=0, limit=200):
+        rows = self._connect().execute(
+            'SELECT seq, event, data FROM campaign_events WHERE campaign_id = ? AND seq > ? ORDER BY seq LIMIT ?',
+            (campaign_id, after_seq, limit),
+        ).fetchall()
+        return [(row['seq'], row['event'], json.loads(row['data'])) for row in rows]
+
+    # --- Sending (called by the lease holder only) ---
+
+    def acquire_lease(self, token, ttl):
+        """
+        Takes or renews the sender lease for the sender identified by `token` (unique per
+        sender, so a restarted process that got the same pid is still a new holder). On
+        takeover, messages the previous holder left in 'sending' go back to pending (they
+        may be delivered twice; never dropped).
+        """
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute('BEGIN IMMEDIATE')
+            owner, expires_at = conn.execute('SELECT owner, expires_at FROM sender_lease WHERE id = 1').fetchone()
+            if owner != token and expires_at > now:
+                return False
+            conn.execute('UPDATE sender_lease SET owner = ?, expires_at = ? WHERE id = 1', (token, now + ttl))
+            if owner != token:
+                requeued = conn.execute(
+                    'UPDATE messages SET status = ? WHERE status = ?', (PENDING, SENDING)
+                ).rowcount
+                if requeued:
+                    print(f"[Outbox] Requeued {requeued} messages interrupted mid-send.")
+        return True
+
+    def release_lease(self, token):
+        with self._connect() as conn:
+            conn.execute('UPDATE sender_lease SET owner = NULL, expires_at = 0 WHERE id = 1 AND owner = ?', (token,))
+
+    def claim_next(self):
+        """Marks the next due message as sending and returns it, or None if nothing may go out yet."""
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute('BEGIN IMMEDIATE')
+            next_send_at = conn.execute('SELECT next_send_at FROM sender_lease WHERE id = 1').fetchone()[0]
+            if next_send_at > now:
+                return None
+            row = conn.execute(
+                'SELECT * FROM messages WHERE status = ? AND not_before <= ? ORDER BY not_before, id LIMIT 1',
+                (PENDING, now),
+            ).fetchone()
+            if row is None:
+                return None
+            conn.execute(
+                'UPDATE messages SET status = ?, attempts = attempts + 1 WHERE id = ?', (SENDING, row['id'])
+            )
+        message = dict(row)
+        message['attempts'] += 1
+        return message
+
+    def seconds_until_due(self):
+        """Seconds until a message could be claimed (pacing included), or None if the outbox is empty."""
+        conn = self._connect()
+        due = conn.execute('SELECT MIN(not_before) FROM messages WHERE status = ?', (PENDING,)).fetchone()[0]
+        if due is None:
+            return None
+        next_send_at = conn.execute('SELECT next_send_at FROM sender_lease WHERE id = 1').fetchone()[0]
+        return max(0.0, max(due, next_send_at) - time.time())
+
+    def mark_sent(self, message, next_send_at):
+        with self._connect() as conn:
+            conn.execute(
+                'UPDATE messages SET status = ?, sent_at = ?, error = NULL WHERE id = ?',
+                (SENT, time.time(), message['id']),
+            )
+            conn.execute('UPDATE sender_lease SET next_send_at = ? WHERE id = 1', (next_send_at,))
+            self._add_event(conn, message['campaign_id'], 'success', f"-> Email sent to {message['recipient']}.")
+            self._finish_if_complete(conn, message['campaign_id'])
+
+    def mark_failed(self, message, error):
+        with self._connect() as conn:
+            conn.execute('UPDATE messages SET status = ?, error = ? WHERE id = ?', (FAILED, error, message['id']))
+            self._add_event(conn, message['campaign_id'], 'error', f"-> SMTP Error for {message['recipient']}: {error}")
+            self._finish_if_complete(conn, message['campaign_id'])
+
+    def defer(self, message, error, delay):
+        """Puts a message back in the queue after a temporary failure."""
+        with self._connect() as conn:
+            conn.execute(
+                'UPDATE messages SET status = ?, error = ?, not_before = ? WHERE id = ?',
+                (PENDING, error, time.time() + delay, message['id']),
+            )
+            self._add_event(
+                conn, message['campaign_id'], 'status',
+                f"-> Delivery to {message['recipient']} deferred ({error}); retrying in {round(delay)}s.",
+            )
@@ -6,16 +6,98 @@ import smtplib
 import traceback
 import json
 import random
+from collections import Counter, defaultdict
 from email.message import EmailMessage
-import google.generativeai as genai
 from flask import current_app
 
+from ..llm import get_llm, LLMUnavailable
+
 # --- Helper to Format Errors (Unchanged) ---
 def format_error_message(exception, context=""):
     """Formats an exception into a user-friendly string."""
     prefix = f"{context}: " if context else ""
     return f"{prefix}{str(exception)}"
 
+REQUIRED_SECTIONS = ['greetings', 'main_body', 'closings', 'signatures']
+GENERAL_CLUSTER = 'general'
+
+# What each variation section must contain; shared by the single and batch prompts
+_SECTION_RULES = [
+    "*   `greetings`: Variations for the opening line (e.g., 'Hi {{curator_name}},').",
+    "*   `main_body`: Variations for the main email body. Each variation MUST:",
+    "    1. Mention the curator's playlist using the `{{playlist_name}}` placeholder.",
+    "    2. Seamlessly and creatively integrate the user's song description.",
+    "    3. End with a sentence inviting the curator to listen (e.g., 'I'd love for you to give it a listen.').",
+    "    4. CRITICAL: Do NOT include the song's URL or any hyperlinks in this part. The link will be added separately.",
+    "*   `closings`: Variations for the closing sentence before the signature.",
+    "*   `signatures`: Variations for the sign-off (e.g., 'Best regards,').",
+]
+
+_SAFETY_SETTINGS = [{"category": c, "threshold": "BLOCK_MEDIUM_AND_ABOVE"} for c in ["HARM_CATEGORY_HARASSMENT", "HARM_CATEGORY_HATE_SPEECH", "HARM_CATEGORY_SEXUALLY_EXPLICIT", "HARM_CATEGORY_DANGEROUS_CONTENT"]]
+
+
+def subject_line(track_name, track_artist_name, language):
+    subject_translations = {
+        "Spanish": f'Propuesta Musical: "{track_name}" de {track_artist_name}',
+        "French": f'Soumission Musicale : "{track_name}" par {track_artist_name}',
+        "German": f'Musikvorschlag: "{track_name}" von {track_artist_name}',
+        "Portuguese": f'Proposta Musical: "{track_name}" por {track_artist_name}',
+        "Italian": f'Proposta Musicale: "{track_name}" di {track_artist_name}',
+    }
+    return subject_translations.get(language, f'Music Submission: "{track_name}" by {track_artist_name}')
+
+
+def call_to_action_line(track_url, language):
+    """The line with the track link, inserted between the main body and the closing."""
+    cta_line_translations = {
+        "Spanish": f"Puedes escuchar la canción aquí: {track_url}",
+        "French": f"Vous pouvez écouter le morceau ici : {track_url}",
+        "German": f"Sie können den Titel hier anhören: {track_url}",
+        "Portuguese": f"Você pode ouvir a faixa aqui: {track_url}",
+        "Italian": f"Puoi ascoltare il brano qui: {track_url}",
+    }
+    return cta_line_translations.get(language, f"You can listen to the track here: {track_url}")
+
+
+def _curator_name(owner_name):
+    if not owner_name or owner_name.lower() in ['n/a', 'spotify']:
+        return "Playlist Curator"
+    return owner_name
+
+
+def _is_variation_set(variations):
+    return isinstance(variations, dict) and all(
+        isinstance(variations.get(key), list) and variations[key] for key in REQUIRED_SECTIONS
+    )
+
+
+def _fallback_variations(song_description):
+    """A plain variation set used when Gemini can't provide one, so a batch still completes."""
+    return {
+        'greetings': ["Hi {{curator_name}},"],
+        'main_body': [
+            "I came across {{playlist_name}} and think my new song could be a good fit for it. "
+            f"{song_description} I'd love for you to give it a listen."
+        ],
+        'closings': ["Thanks for your time, and keep up the great curating!"],
+        'signatures': ["Best regards,"],
+    }
+
+
+def _template_and_preview(variations, call_to_action, signature_name, playlist_name, curator_name):
+    """The first variation of each section as the editable template, and that template personalised."""
+    template_body = "\n\n".join([
+        variations['greetings'][0],
+        variations['main_body'][0],
+        call_to_action,
+        variations['closings'][0],
+        variations['signatures'][0],
+        signature_name,
+    ])
+    preview_body = template_body.replace("{{curator_name}}", curator_name).replace("{{playlist_name}}", playlist_name)
+    return template_body, preview_body
+
+
 # --- Gemini Email Content Generation with Variations ---
 def generate_email_template_and_preview(track_details, playlist_details, song_description, language="English"):
     """
@@ -38,20 +120,9 @@ def generate_email_template_and_preview(track_details, playlist_details, song_de
         track_artist_name = track_details['artists'][0]['name'] if track_details.get('artists') else "Unknown Artist"
         track_url = track_details.get('external_urls', {}).get('spotify', '#')
         initial_playlist_name = playlist_details.get('name', 'Your Playlist')
-        initial_curator_name = playlist_details.get('owner_name')
-        if not initial_curator_name or initial_curator_name.lower() in ['n/a', 'spotify']:
-            initial_curator_name = "Playlist Curator"
+        initial_curator_name = _curator_name(playlist_details.get('owner_name'))
         signature_name = track_artist_name
-        
-        # Subject Line Generation (Unchanged)
-        subject_translations = {
-            "Spanish": f'Propuesta Musical: "{track_name}" de {track_artist_name}',
-            "French": f'Soumission Musicale : "{track_name}" par {track_artist_name}',
-            "German": f'Musikvorschlag: "{track_name}" von {track_artist_name}',
-            "Portuguese": f'Proposta Musical: "{track_name}" por {track_artist_name}',
-            "Italian": f'Proposta Musicale: "{track_name}" di {track_artist_name}',
-        }
-        subject_line = subject_translations.get(language, f'Music Submission: "{track_name}" by {track_artist_name}')
+        subject = subject_line(track_name, track_artist_name, language)
 
         # --- AI Prompt: Still instructs AI to OMIT the link for reliability ---
         prompt_parts = [
@@ -63,64 +134,35 @@ def generate_email_template_and_preview(track_details, playlist_details, song_de
             f"*   **Song:** \"{track_name}\" by {track_artist_name}",
             f"*   **User's Song Description:** {song_description}",
             "\n**JSON Structure Requirements:**",
-            "*   `greetings`: Variations for the opening line (e.g., 'Hi {{curator_name}},').",
-            "*   `main_body`: Variations for the main email body. Each variation MUST:",
-            "    1. Mention the curator's playlist using the `{{playlist_name}}` placeholder.",
-            "    2. Seamlessly and creatively integrate the user's song description.",
-            "    3. End with a sentence inviting the curator to listen (e.g., 'I'd love for you to give it a listen.').",
-            "    4. CRITICAL: Do NOT include the song's URL or any hyperlinks in this part. The link will be added separately.",
-            "*   `closings`: Variations for the closing sentence before the signature.",
-            "*   `signatures`: Variations for the sign-off (e.g., 'Best regards,').",
+            *_SECTION_RULES,
             "\n**CRITICAL:** Respond with ONLY the raw JSON object. Do not include markdown, explanations, or any text outside the JSON object.",
             f"\n---\nGENERATE THE {language.upper()} JSON NOW:",
         ]
         prompt_body = "\n".join(prompt_parts)
         
-        # Model Call (Unchanged)
-        model = genai.GenerativeModel(model_name)
-        generation_config = genai.GenerationConfig(temperature=0.8)
-        safety_settings=[ {"category": c, "threshold": "BLOCK_MEDIUM_AND_ABOVE"} for c in [ "HARM_CATEGORY_HARASSMENT", "HARM_CATEGORY_HATE_SPEECH", "HARM_CATEGORY_SEXUALLY_EXPLICIT", "HARM_CATEGORY_DANGEROUS_CONTENT" ] ]
+        # Model Call
+        generation_config = {'temperature': 0.8}
 
         print(f"[Email Gen] Generating {language} email variations...")
-        response = model.generate_content(prompt_body, generation_config=generation_config, safety_settings=safety_settings)
-
-        if not response.parts:
-             raise ValueError(f"AI generation failed or was empty. Reason: {response.prompt_feedback.block_reason if response.prompt_feedback else 'Unknown'}")
-        
-        json_text = response.text.strip().replace("```json", "").replace("```", "")
+        response_text = get_llm().generate_text(
+            'email_variations', prompt_body, model_name,
+            generation_config=generation_config, safety_settings=_SAFETY_SETTINGS,
+        )
+        json_text = response_text.replace("```json", "").replace("```", "")
         email_variations = json.loads(json_text)
 
-        required_keys = ['greetings', 'main_body', 'closings', 'signatures']
-        if not all(key in email_variations and isinstance(email_variations[key], list) and email_variations[key] for key in required_keys):
+        if not _is_variation_set(email_variations):
             raise ValueError("AI did not return the expected JSON structure with a 'main_body'.")
             
         # --- Manually construct the email body for the UI TEMPLATE and PREVIEW ---
         # This part is for the UI only and ensures the user sees what a complete email will look like.
-        cta_line_translations = {
-            "Spanish": f"Puedes escuchar la canción aquí: {track_url}",
-            "French": f"Vous pouvez écouter le morceau ici : {track_url}",
-            "German": f"Sie können den Titel hier anhören: {track_url}",
-            "Portuguese": f"Você pode ouvir a faixa aqui: {track_url}",
-            "Italian": f"Puoi ascoltare il brano qui: {track_url}",
-        }
-        call_to_action_line = cta_line_translations.get(language, f"You can listen to the track here: {track_url}")
-
-        # Build the base template string for the user to edit in the UI
-        template_body_parts = [
-            email_variations['greetings'][0],
-            email_variations['main_body'][0],
-            call_to_action_line,
-            email_variations['closings'][0],
-            email_variations['signatures'][0],
-            signature_name
-        ]
-        template_body = "\n\n".join(template_body_parts)
-
-        # Build the personalized preview body for the UI
-        preview_body = template_body.replace("{{curator_name}}", initial_curator_name).replace("{{playlist_name}}", initial_playlist_name)
+        template_body, preview_body = _template_and_preview(
+            email_variations, call_to_action_line(track_url, language), signature_name,
+            initial_playlist_name, initial_curator_name,
+        )
         
         print("[Email Gen] Template, variations, and preview generated successfully.")
-        return subject_line, preview_body, template_body, email_variations
+        return subject, preview_body, template_body, email_variations
 
     except Exception as e:
         print(f"[Email Gen] Error during email generation: {e}")
@@ -128,6 +170,148 @@ def generate_email_template_and_preview(track_details, playlist_details, song_de
         raise Exception(f"AI email generation failed: {str(e)}")
 
 
+# --- Batch Generation: many playlists, one Gemini call per language ---
+def cluster_playlists(records, default_language="English", max_clusters=6):
+    """
+    Groups playlist records by language and genre cluster, as {(language, cluster): [records]}.
+
+    A playlist's language is its 'language' field (default_language if unset). Its genre
+    cluster is the found_by keyword it shares with the most playlists in the batch, so
+    curators found through the same search get the same pitch. Per language, clusters
+    beyond the largest `max_clusters` and playlists without keywords go to 'general'.
+    """
+    keyword_counts = Counter(keyword for record in records for keyword in record.found_by)
+    by_language = defaultdict(lambda: defaultdict(list))
+    for record in records:
+        language = (record.extra or {}).get('language') or default_language
+        if record.found_by:
+            cluster = min(record.found_by, key=lambda keyword: (-keyword_counts[keyword], keyword))
+        else:
+            cluster = GENERAL_CLUSTER
+        by_language[language][cluster].append(record)
+
+    groups = {}
+    for language, clusters in by_language.items():
+        named = sorted((c for c in clusters if c != GENERAL_CLUSTER), key=lambda c: (-len(clusters[c]), c))
+        for cluster in named[max_clusters:]:
+            clusters[GENERAL_CLUSTER].extend(clusters.pop(cluster))
+        for cluster, members in clusters.items():
+            groups[(language, cluster)] = members
+    return groups
+
+
+def _batch_prompt(track_name, track_artist_name, song_description, language, clusters):
+    """Prompt asking for one variation set per cluster, keyed by cluster id. `clusters` is [(id, genre, records)]."""
+    cluster_lines = []
+    for cluster_id, genre, members in clusters:
+        samples = ', '.join(f'"{record.name}"' for record in members[:5] if record.name)
+        audience = 'a mix of genres' if genre == GENERAL_CLUSTER else f'"{genre}"'
+        cluster_lines.append(f"*   `{cluster_id}`: {len(members)} playlists found for {audience}, e.g. {samples or 'N/A'}")
+    prompt_parts = [
+        f"You are a professional music promoter. Generate a JSON object of email pitch variations written in {language}.",
+        f"The top-level keys must be exactly these cluster ids: {', '.join(c[0] for c in clusters)}.",
+        "Each cluster's value is an object with keys 'greetings', 'main_body', 'closings', and 'signatures'.",
+        "Each of those must be an array of at least 4 unique, friendly/professionally-toned string variations,",
+        "written for curators of that cluster's kind of playlist.",
+        "The placeholders {{curator_name}} and {{playlist_name}} MUST be used exactly as written.",
+        "\n**Context for Content:**",
+        f"*   **Song:** \"{track_name}\" by {track_artist_name}",
+        f"*   **User's Song Description:** {song_description}",
+        "\n**Playlist Clusters:**",
+        *cluster_lines,
+        "\n**Requirements for every cluster:**",
+        *_SECTION_RULES,
+        "\n**CRITICAL:** Respond with ONLY the raw JSON object. Do not include markdown, explanations, or any text outside the JSON object.",
+        f"\n---\nGENERATE THE {language.upper()} JSON NOW:",
+    ]
+    return "\n".join(prompt_parts)
+
+
+def generate_email_batch(track_details, records, song_description, default_language="English", max_clusters=6):
+    """
+    Email variations for many playlists at once.
+
+    Playlists are grouped with cluster_playlists and each language gets a single Gemini
+    request that returns one variation set per genre cluster, so a campaign costs one
+    call per language rather than one per preview. A cluster missing from the response
+    falls back to its own generate_email_template_and_preview call, and one that still has
+    no usable variations (Gemini unavailable or failing) gets a plain default set.
+
+    Returns (groups, calls): groups are dicts with key, language, genre, subject,
+    template_body, preview_body, variations and playlist_ids; calls is the number of
+    Gemini requests made.
+    """
+    if not current_app.config.get('GEMINI_API_KEY'):
+        raise ValueError("Gemini API Key is not configured.")
+    if not all([track_details, records, song_description]):
+        raise ValueError("Missing required details for email generation.")
+
+    model_name = current_app.config.get("GEMINI_MODEL_NAME", "gemini-1.5-flash")
+    track_name = track_details.get('name', 'N/A')
+    track_artist_name = track_details['artists'][0]['name'] if track_details.get('artists') else "Unknown Artist"
+    track_url = track_details.get('external_urls', {}).get('spotify', '#')
+
+    by_language = defaultdict(list)
+    for (language, genre), members in cluster_playlists(records, default_language or "English", max_clusters).items():
+        by_language[language].append((genre, members))
+
+    groups, calls = [], 0
+    llm_available = True
+    for language, clusters in by_language.items():
+        keyed = [(f"c{i + 1}", genre, members) for i, (genre, members) in enumerate(clusters)]
+        print(f"[Email Gen] Generating {language} variations for {len(keyed)} clusters ({sum(len(m) for _, _, m in keyed)} playlists)...")
+        calls += 1
+        try:
+            response_text = get_llm().generate_text(
+                'email_variations', _batch_prompt(track_name, track_artist_name, song_description, language, keyed),
+                model_name, generation_config={'temperature': 0.8}, safety_settings=_SAFETY_SETTINGS,
+            )
+            variation_sets = json.loads(response_text.replace("```json", "").replace("```", ""))
+        except ValueError as e:
+            print(f"[Email Gen] Batch response for {language} unusable, generating per cluster: {e}")
+            variation_sets = {}
+        except LLMUnavailable as e:
+            print(f"[Email Gen] Gemini unavailable for {language}, using the default template: {e}")
+            variation_sets, llm_available = {}, False
+        except Exception as e:
+            print(f"[Email Gen] Batch request for {language} failed, generating per cluster: {e}")
+            traceback.print_exc()
+            variation_sets = {}
+        if not isinstance(variation_sets, dict):
+            variation_sets = {}
+
+        cta = call_to_action_line(track_url, language)
+        for cluster_id, genre, members in keyed:
+            variations = variation_sets.get(cluster_id)
+            first = members[0]
+            if not _is_variation_set(variations) and llm_available:
+                calls += 1
+                try:
+                    _, _, _, variations = generate_email_template_and_preview(
+                        track_details, first.to_dict(), song_description, language,
+                    )
+                except Exception as e:
+                    print(f"[Email Gen] {language}/{genre} cluster falls back to the default template: {e}")
+                    llm_available = not isinstance(e.__cause__ or e.__context__, LLMUnavailable)
+            if not _is_variation_set(variations):
+                variations = _fallback_variations(song_description)
+            template_body, preview_body = _template_and_preview(
+                variations, cta, track_artist_name, first.name or 'Your Playlist', _curator_name(first.owner_name),
+            )
+            groups.append({
+                'key': f"set{len(groups) + 1}",
+                'language': language,
+                'genre': genre,
+                'subject': subject_line(track_name, track_artist_name, language),
+                'template_body': template_body,
+                'preview_body': preview_body,
+                'variations': variations,
+                'playlist_ids': [record.id for record in members],
+            })
+    print(f"[Email Gen] Batch of {len(records)} playlists: {len(groups)} variation sets from {calls} Gemini calls.")
+    return groups, calls
+
+
 # --- create_curator_outreach_html (This function is now UNUSED but kept for the future) ---
 def create_curator_outreach_html(track_details, personalized_body):
     """
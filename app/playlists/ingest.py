@@ -0,0 +1,146 @@
+import io
+import csv
+
+import numpy as np
+import pandas as pd
+from openpyxl import load_workbook
+
+from ..spotify.utils import parse_follower_counts
+from .records import PlaylistRecord
+
+# Spreadsheet header -> playlist key. Only these columns are read from uploads.
+UPLOAD_COLUMN_MAP = {
+    'Playlist Name': 'name', 'Spotify URL': 'url', 'Curator Name': 'owner_name',
+    'Curator Email': 'email', 'Followers': 'followers', 'Total Tracks': 'tracks_total',
+    'Description': 'description', 'Found By Keyword': 'found_by', 'Contacted': 'contacted'
+}
+REQUIRED_UPLOAD_COLUMNS = ['Playlist Name', 'Spotify URL']
+ALLOWED_UPLOAD_EXTENSIONS = ('.xlsx', '.xls', '.csv')
+
+_SPOTIFY_PLAYLIST_ID_PATTERN = r'open\.spotify\.com/playlist/([a-zA-Z0-9]+)'
+
+
+class UploadError(ValueError):
+    """Raised for uploads that are readable but unusable (missing columns, bad type)."""
+
+
+def _collect_columns(rows):
+    """
+    Consumes an iterator of row tuples (header first) and keeps only the mapped columns.
+    Returns a dict of header -> list of cell values, built one row at a time.
+    """
+    header = next(rows, None)
+    if not header:
+        return {}
+    wanted = {}
+    for index, title in enumerate(header):
+        title = str(title).strip() if title is not None else ''
+        if title in UPLOAD_COLUMN_MAP and title not in wanted.values():
+            wanted[index] = title
+    columns = {title: [] for title in wanted.values()}
+    targets = [(index, columns[title]) for index, title in wanted.items()]
+    for row in rows:
+        if not row:
+            continue
+        row_len = len(row)
+        for index, target in targets:
+            target.append(row[index] if index < row_len else None)
+    return columns
+
+
+def _iter_xlsx_rows(stream):
+    # read_only keeps openpyxl from materialising the whole sheet; rows are streamed from the zip
+    workbook = load_workbook(stream, read_only=True, data_only=True)
+    try:
+        yield from workbook.active.iter_rows(values_only=True)
+    finally:
+        workbook.close()
+
+
+def _iter_csv_rows(stream):
+    text_stream = io.TextIOWrapper(stream, encoding='utf-8-sig', newline='')
+    try:
+        for row in csv.reader(text_stream):
+            yield [value if value != '' else None for value in row]
+    finally:
+        text_stream.detach()
+
+
+def _read_upload_frame(file_storage):
+    filename = (file_storage.filename or '').lower()
+    if filename.endswith('.csv'):
+        columns = _collect_columns(_iter_csv_rows(file_storage.stream))
+    elif filename.endswith('.xlsx'):
+        columns = _collect_columns(_iter_xlsx_rows(file_storage.stream))
+    else:
+        # Legacy .xls cannot be streamed by openpyxl; fall back to pandas for those
+        frame = pd.read_excel(file_storage, usecols=lambda col: str(col).strip() in UPLOAD_COLUMN_MAP)
+        frame.columns = [str(col).strip() for col in frame.columns]
+        return frame.astype(object)
+    return pd.DataFrame(columns, dtype=object)
+
+
+def load_uploaded_playlists(file_storage):
+    """
+    Reads an uploaded curator export (.xlsx, .xls or .csv) into PlaylistRecords sorted by followers.
+
+    Rows are streamed and only the known columns are kept. Contacted rows are dropped,
+    Spotify IDs are extracted and followers parsed as whole columns.
+
+    Raises:
+        UploadError: If the file type is unsupported or required columns are missing.
+    """
+    filename = (file_storage.filename or '').lower()
+    if not filename.endswith(ALLOWED_UPLOAD_EXTENSIONS):
+        raise UploadError("Invalid file type. Please upload an Excel (.xlsx) or CSV file.")
+
+    df = _read_upload_frame(file_storage)
+    missing_cols = [col for col in REQUIRED_UPLOAD_COLUMNS if col not in df.columns]
+    if missing_cols:
+        raise UploadError(f"Missing required columns in uploaded file: {', '.join(missing_cols)}")
+
+    if 'Contacted' in df.columns:
+        contacted = pd.to_numeric(df['Contacted'], errors='coerce').fillna(0)
+        initial_count = len(df)
+        df = df[contacted.to_numpy() != 1]
+        print(f"[Upload] Filtered out {initial_count - len(df)} contacted playlists.")
+
+    ids = df['Spotify URL'].astype(str).str.extract(_SPOTIFY_PLAYLIST_ID_PATTERN, expand=False)
+    valid = ids.notna().to_numpy()
+    skipped = int((~valid).sum())
+    if skipped:
+        print(f"[Upload] Skipping {skipped} rows with invalid Spotify URLs.")
+    df = df[valid]
+    ids = ids[valid]
+
+    if 'Followers' in df.columns:
+        followers_counts, followers_null = parse_follower_counts(df['Followers'])
+    else:
+        followers_counts, followers_null = np.zeros(len(df), dtype=np.int64), np.ones(len(df), dtype=bool)
+    if 'Total Tracks' in df.columns:
+        tracks_counts, tracks_null = parse_follower_counts(df['Total Tracks'])
+    else:
+        tracks_counts, tracks_null = np.zeros(len(df), dtype=np.int64), np.ones(len(df), dtype=bool)
+
+    # Sort once on the precomputed follower column (stable, so file order breaks ties)
+    order = np.argsort(-followers_counts, kind='stable')
+
+    df = df.where(df.notna(), None)
+    present = [(title, UPLOAD_COLUMN_MAP[title]) for title in df.columns if title in UPLOAD_COLUMN_MAP]
+    column_values = {key: df[title].to_numpy() for title, key in present}
+    id_values = ids.to_numpy()
+
+    records = []
+    for position in order:
+        fields = {key: values[position] for key, values in column_values.items()}
+        found_by = fields.pop('found_by', None)
+        contacted = fields.pop('contacted', None)
+        records.append(PlaylistRecord(
+            id_values[position],
+            contacted=contacted,
+            found_by=str(found_by).split(',') if found_by is not None else ['uploaded'],
+            followers_count=None if followers_null[position] else int(followers_counts[position]),
+            tracks_count=None if tracks_null[position] else int(tracks_counts[position]),
+            **fields,
+        ))
+    return records
@@ -0,0 +1,101 @@
+import re
+
+
+def _normalize(keyword):
+    return ' '.join(str(keyword).lower().split())
+
+
+def _trie_pattern(root):
+    """
+    Regex for a character trie; longer continuations are tried before a keyword ends.
+    Built bottom-up with an explicit stack rather than recursion, as a keyword may be as
+    long as the user's query.
+    """
+    patterns = {}
+    stack = [(root, False)]
+    while stack:
+        node, children_done = stack.pop()
+        children = [(char, child) for char, child in sorted(node.items(), key=lambda item: item[0] or '')
+                    if char is not None]
+        if not children_done:
+            stack.append((node, True))
+            stack.extend((child, False) for _, child in children)
+            continue
+        branches = [(r'\s+' if char == ' ' else re.escape(char)) + patterns.pop(id(child)) for char, child in children]
+        if not branches:
+            patterns[id(node)] = ''
+            continue
+        body = branches[0] if len(branches) == 1 else '(?:' + '|'.join(branches) + ')'
+        # A keyword ends here, so the rest is optional
+        patterns[id(node)] = '(?:' + body + ')?' if None in node else body
+    return patterns[id(root)]
+
+
+class KeywordMatcher:
+    """
+    Whole-word multi-keyword matcher used by the AI playlist filter.
+
+    All keywords are merged into one character trie and compiled once into a single
+    regular expression, so each text is scanned once however many keywords there are,
+    with the matching done inside the re engine. Keywords only match as whole words:
+    "rock" matches "indie rock" but not "rocket". Whitespace inside a keyword matches
+    any run of whitespace. Where keywords overlap at the same position, the longest one
+    is reported.
+
+    `keywords` is an iterable of strings or a {keyword: weight} dict; a text's score is
+    the summed weight of the distinct keywords found in it.
+    """
+
+    def __init__(self, keywords):
+        weights = keywords if isinstance(keywords, dict) else dict.fromkeys(keywords, 1.0)
+        self.weights = {}
+        for keyword, weight in weights.items():
+            keyword = _normalize(keyword)
+            if keyword:
+                self.weights[keyword] = max(weight, self.weights.get(keyword, 0))
+        trie = {}
+        for keyword in self.weights:
+            node = trie
+            for char in keyword:
+                node = node.setdefault(char, {})
+            node[None] = True
+        self._findall = None
+        if trie:
+            # \b is much cheaper than a lookbehind but only means "word start" before a word character
+            start = r'\b' if all(re.match(r'\w', keyword) for keyword in self.weights) else r'(?<!\w)'
+            self._findall = re.compile(start + '(' + _trie_pattern(trie) + r')(?!\w)').findall
+        self._canonical = {keyword: keyword for keyword in self.weights} # Matched text -> keyword
+
+    def find(self, text):
+        """The distinct keywords found in lowercased text, as a set."""
+        if self._findall is None or not text:
+            return set()
+        found = set(self._findall(text))
+        canonical = self._canonical
+        if found.issubset(canonical):
+            return found
+        # The same keyword written with different whitespace
+        return {canonical.get(matched) or _normalize(matched) for matched in found}
+
+    def score(self, text):
+        return sum(self.weights[keyword] for keyword in self.find(text.lower()))
+
+    def match_records(self, records):
+        """
+        Scores each record's searchable text. Returns [(record, score, matched_keywords)]
+        for the records that matched, in input order.
+        """
+        if self._findall is None:
+            return []
+        find, weights = self.find, self.weights
+        matches = []
+        for record in records:
+            keywords = find(record.searchable_text())
+            if keywords:
+                matches.append((record, sum(weights[keyword] for keyword in keywords), keywords))
+        return matches
+
+
+def rank_matches(matches):
+    """Sorts (record, score, keywords) matches by score, then by followers, best first."""
+    return sorted(matches, key=lambda match: (-match[1], -(match[0].followers_count or 0)))
@@ -6,6 +6,8 @@ from bs4 import BeautifulSoup
 import time
 import re # Import the regular expressions module
 
+from ..httpclient import make_session
+
 # ... (login_to_playlistsupply function remains unchanged) ...
 def login_to_playlistsupply(username, password):
     # ... (no changes here)
@@ -15,7 +17,7 @@ def login_to_playlistsupply(username, password):
         return None
 
     login_url = "https://playlistsupply.com/amember/login"
-    session = requests.Session()
+    session = make_session(upstream='playlistsupply')
     session.headers.update({
         'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/110.0.0.0 Safari/537.36',
         'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,image/apng,*/*;q=0.8,application/signed-exchange;v=b3;q=0.7',
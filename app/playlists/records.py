@@ -0,0 +1,160 @@
+import sys
+import json
+from bisect import insort
+
+from ..spotify.utils import parse_follower_count, parse_follower_counts
+
+# Marks a count that was not pre-parsed by the caller (None is a valid parsed result).
+_UNPARSED = object()
+
+
+def _intern_keyword(keyword):
+    """Lowercases, strips and interns a found_by keyword so repeated keywords share one string."""
+    if not keyword or not isinstance(keyword, str):
+        return None
+    cleaned = keyword.strip().lower()
+    return sys.intern(cleaned) if cleaned else None
+
+
+class PlaylistRecord:
+    """
+    Compact in-memory representation of one playlist moving through the finder, upload,
+    AI filter and email routes.
+
+    Follower and track counts are parsed exactly once at ingestion (followers_count /
+    tracks_count) so sorting and filtering large result sets never re-parses the raw
+    display strings. found_by is kept as a sorted list of interned keywords.
+    """
+    __slots__ = (
+        'id', 'name', 'url', 'description', 'tracks_total', 'followers', 'email',
+        'owner_name', 'owner_url', 'last_modified', 'contacted', 'found_by',
+        'followers_count', 'tracks_count', 'extra',
+    )
+
+    # Keys serialized back to the frontend, in the order the JSON has always used.
+    FIELDS = (
+        'id', 'name', 'url', 'description', 'tracks_total', 'followers', 'email',
+        'owner_name', 'owner_url', 'last_modified',
+    )
+
+    def __init__(self, id, name='N/A', url=None, description='', tracks_total='N/A',
+                 followers='N/A', email=None, owner_name='N/A', owner_url=None,
+                 last_modified='unknown', contacted=None, found_by=None, extra=None,
+                 followers_count=_UNPARSED, tracks_count=_UNPARSED):
+        self.id = id
+        self.name = name
+        self.url = url
+        self.description = description
+        self.tracks_total = tracks_total
+        self.followers = followers
+        self.email = email
+        self.owner_name = owner_name
+        self.owner_url = owner_url
+        self.last_modified = last_modified
+        self.contacted = contacted
+        self.found_by = []
+        # Bulk ingestion paths parse whole columns at once and pass the counts in
+        self.followers_count = parse_follower_count(followers) if followers_count is _UNPARSED else followers_count
+        self.tracks_count = parse_follower_count(tracks_total) if tracks_count is _UNPARSED else tracks_count
+        self.extra = extra or None
+        if found_by:
+            self.add_keywords(found_by)
+
+    @classmethod
+    def from_dict(cls, data, found_by=None, followers_count=_UNPARSED, tracks_count=_UNPARSED):
+        """
+        Builds a record from a scraped/uploaded/frontend playlist dict.
+        Unknown keys (e.g. 'image', 'owner_id') are preserved in `extra`.
+        Counts already parsed by the caller may be passed in, as for the constructor.
+        Returns None if the dict has no id.
+        """
+        if not isinstance(data, dict) or not data.get('id'):
+            return None
+        known = {key: data[key] for key in cls.FIELDS if key in data}
+        extra = {
+            key: value for key, value in data.items()
+            if key not in known and key not in ('found_by', 'contacted', 'followers_count')
+        }
+        keywords = found_by if found_by is not None else data.get('found_by')
+        if isinstance(keywords, str):
+            keywords = keywords.split(',')
+        return cls(contacted=data.get('contacted'), found_by=keywords, extra=extra,
+                   followers_count=followers_count, tracks_count=tracks_count, **known)
+
+    def add_keyword(self, keyword):
+        """Adds one found_by keyword, keeping the list sorted and unique."""
+        keyword = _intern_keyword(keyword)
+        if keyword is None:
+            return
+        found_by = self.found_by
+        # found_by is short (a handful of keywords) so a linear membership test is cheapest
+        if keyword not in found_by:
+            insort(found_by, keyword)
+
+    def add_keywords(self, keywords):
+        for keyword in keywords:
+            self.add_keyword(keyword)
+
+    def searchable_text(self):
+        """Lowercased name, description and keywords joined for keyword matching."""
+        return ' '.join((
+            str(self.name or '').lower(),
+            str(self.description or '').lower(),
+            ' '.join(self.found_by),
+        ))
+
+    def to_dict(self):
+        """Serializes to the playlist dict shape the frontend expects."""
+        data = {
+            'id': self.id,
+            'name': self.name,
+            'url': self.url,
+            'description': self.description,
+            'tracks_total': self.tracks_total,
+            'followers': self.followers,
+            'email': self.email,
+            'owner_name': self.owner_name,
+            'owner_url': self.owner_url,
+            'last_modified': self.last_modified,
+            'found_by': list(self.found_by),
+            'followers_count': self.followers_count,
+        }
+        if self.contacted is not None:
+            data['contacted'] = self.contacted
+        if self.extra:
+            data.update(self.extra)
+        return data
+
+    def __repr__(self):
+        return f"PlaylistRecord(id={self.id!r}, name={self.name!r}, followers={self.followers_count!r})"
+
+
+def records_from_dicts(playlists):
+    """
+    Converts a list of playlist dicts into records, dropping entries without an id.
+    The followers and tracks_total columns are parsed in one pass each.
+    """
+    playlists = [playlist for playlist in playlists or [] if isinstance(playlist, dict) and playlist.get('id')]
+    if not playlists:
+        return []
+    followers_counts, followers_null = parse_follower_counts([p.get('followers', 'N/A') for p in playlists])
+    tracks_counts, tracks_null = parse_follower_counts([p.get('tracks_total', 'N/A') for p in playlists])
+    return [
+        PlaylistRecord.from_dict(
+            playlist,
+            followers_count=None if followers_null[position] else int(followers_counts[position]),
+            tracks_count=None if tracks_null[position] else int(tracks_counts[position]),
+        )
+        for position, playlist in enumerate(playlists)
+    ]
+
+
+def sort_by_followers(records):
+    """Sorts records in place by parsed follower count, largest first, and returns them."""
+    records.sort(key=lambda r: r.followers_count or 0, reverse=True)
+    return records
+
+
+def records_to_json(records):
+    """Serializes records to a compact JSON array string for embedding in the page/response."""
+    return json.dumps([record.to_dict() for record in records], separators=(',', ':'), default=str)
@@ -1,33 +1,39 @@
 # --- START OF (MODIFIED) FILE app/playlists/routes.py ---
 import os
 import re
-import pandas as pd
-import io
 import time
 import json
 import traceback
-import smtplib
-import google.generativeai as genai
-from email.message import EmailMessage
 from email.mime.multipart import MIMEMultipart
 from email.mime.text import MIMEText
 from email.mime.base import MIMEBase
-import pandas as pd
-import io
 from flask import (
-    render_template, redirect, url_for, flash, request, Response,
-    stream_with_context, jsonify, current_app
+    render_template, redirect, url_for, flash, request, jsonify, current_app
 )
 import spotipy
-import random
 
 from . import playlists_bp
 from ..spotify.auth import get_spotify_client_credentials_client
-from ..spotify.data import fetch_similar_artists_by_genre, fetch_release_details, fetch_spotify_details_for_names
-from ..spotify.utils import parse_follower_count
-from ..lastfm.scraper import scrape_lastfm_tags, scrape_all_lastfm_similar_artists_names
+from ..spotify.data import fetch_release_details
+from ..spotify.similar_pool import similar_artist_pool
+from ..lastfm.scraper import scrape_lastfm_tags
+from ..lastfm.tag_model import get_tag_model, observe_artist
 from .playlistsupply import login_to_playlistsupply, scrape_playlistsupply
-from .email import generate_email_template_and_preview, format_error_message, create_curator_outreach_html
+from .email import (
+    generate_email_template_and_preview, generate_email_batch, call_to_action_line,
+    format_error_message, create_curator_outreach_html,
+)
+from .templating import OutreachTemplate
+from .records import PlaylistRecord, records_from_dicts, sort_by_followers
+from .matching import KeywordMatcher, rank_matches
+from .ingest import load_uploaded_playlists, UploadError
+from .search_index import get_playlist_index, index_playlists
+from ..jobs import job_handler, get_job_runner, job_urls, JobFailed, JobQueueFull
+from ..outbox import get_outbox, campaign_urls
+from ..llm import get_llm
+
+# Longest AI filter query accepted; the whole query also becomes one keyword of the matcher
+MAX_FILTER_QUERY_LENGTH = 500
 
 
 # --- (The first parts of the file, including playlist_finder, upload_playlists, etc., are unchanged) ...
@@ -89,100 +95,97 @@ def playlist_finder(artist_id):
     selected_track_id = request.args.get('selected_track_id'); user_keywords_raw = request.args.get('user_keywords', ''); search_performed = bool(selected_track_id)
     all_artist_tracks = fetch_all_artist_tracks(sp, artist_id)
 
-    def generate_response():
-        lastfm_tags = []; keywords_list = []; ps_session = None; has_scrape_error = False; global_error_message = None
-        try:
-            tags_result = scrape_lastfm_tags(artist_name); lastfm_tags = tags_result if tags_result is not None else []
-        except Exception as e: print(f"[PlaylistFinder Stream] Error during initial tag fetch: {e}")
-        yield render_template('playlist_finder_base.html', artist_id=artist_id, artist_name=artist_name, artist_genres=artist_genres, lastfm_tags=lastfm_tags, all_artist_tracks=all_artist_tracks, selected_track_id=selected_track_id, user_keywords=user_keywords_raw, search_performed=search_performed, loading=search_performed, playlists=None, global_error=None)
-        if not search_performed: return
-        final_playlists = {}
+    lastfm_tags = []; search_job = None
+    try:
+        tags_result = scrape_lastfm_tags(artist_name); lastfm_tags = tags_result if tags_result is not None else []
+    except Exception as e: print(f"[PlaylistFinder] Error during initial tag fetch: {e}")
+    observe_artist(artist, lastfm_tags)
+    if search_performed:
+        # The search itself runs as a background job; the page follows its progress stream
         try:
-            if not selected_track_id: raise ValueError("Selected track ID is missing.")
-            market = 'US'; selected_track = sp.track(selected_track_id, market=market)
-            if not selected_track: raise ValueError(f"Track ID '{selected_track_id}' not found.")
-            selected_track_name = selected_track['name']; track_artist_name = selected_track['artists'][0]['name'] if selected_track['artists'] else artist_name
-            js_safe_track_name = json.dumps(selected_track_name); yield f'<script>document.title = "Searching playlists for " + {js_safe_track_name} + "...";</script>\n'
-            
-            yield f'<script>updateProgress(10, "Finding similar artists...");</script>\n'
-            print("[PlaylistFinder Stream] Building comprehensive similar artist pool for keywords...")
-            
-            spotify_genre_artists = fetch_similar_artists_by_genre(sp, artist_id, artist_name, artist_genres)
-            lastfm_names = scrape_all_lastfm_similar_artists_names(artist_name, max_pages=3)
-            lastfm_spotify_artists = fetch_spotify_details_for_names(sp, lastfm_names or [])
-            
-            combined_artists_map = {artist['id']: artist for artist in spotify_genre_artists if artist and artist.get('id') != artist_id}
-            for artist in lastfm_spotify_artists:
-                if artist and artist.get('id') != artist_id: combined_artists_map[artist['id']] = artist
-            similar_artists_pool = list(combined_artists_map.values())
-            print(f"[PlaylistFinder Stream]  -> Created a combined pool of {len(similar_artists_pool)} unique similar artists.")
-
-            print("[PlaylistFinder Stream] Aggregating common genres from similar artists...")
-            genre_counts = {}
-            for artist in similar_artists_pool:
-                for genre in artist.get('genres', []):
-                    genre_counts[genre] = genre_counts.get(genre, 0) + 1
-            sorted_genres = sorted(genre_counts.items(), key=lambda item: item[1], reverse=True)
-            common_genres_from_pool = [genre for genre, count in sorted_genres[:10]]
-            print(f"[PlaylistFinder Stream]  -> Top 10 common genres found: {common_genres_from_pool}")
-
-            keywords = set()
-            keywords.add(track_artist_name.lower()); keywords.add(artist_name.lower())
-            for genre in artist_genres[:5]: keywords.add(genre.lower().strip())
-            for tag in lastfm_tags[:10]: keywords.add(tag.lower().strip())
-            user_kws = [kw.strip().lower() for kw in user_keywords_raw.split(',') if kw.strip()]
-            for kw in user_kws: keywords.add(kw)
-            for sim_artist in similar_artists_pool: keywords.add(sim_artist["name"].lower())
-            for common_genre in common_genres_from_pool: keywords.add(common_genre.lower().strip())
-            
-            keywords_list = sorted(list(filter(None, keywords)))
-            if not keywords_list: raise ValueError("No valid keywords generated.")
-            print(f"[PlaylistFinder Stream] Generated {len(keywords_list)} keywords.")
-            total_keywords = len(keywords_list); js_keywords_preview = json.dumps(keywords_list[:15]); yield f'<script>updateKeywordsDisplay({js_keywords_preview});</script>\n'
-            ps_user = current_app.config.get('PLAYLIST_SUPPLY_USER'); ps_pass = current_app.config.get('PLAYLIST_SUPPLY_PASS')
-            if not ps_user or not ps_pass: raise ValueError("PlaylistSupply credentials missing.")
-            yield f'<script>updateProgress(20, "Logging in...");</script>\n'; ps_session = login_to_playlistsupply(ps_user, ps_pass)
-            if not ps_session: raise ConnectionError("Failed to log in to PlaylistSupply.")
-            processed_keywords = 0; initial_progress = 25; scrape_progress_range = 70
-            for keyword in keywords_list:
-                processed_keywords += 1; progress = initial_progress + int((processed_keywords / total_keywords) * scrape_progress_range); js_keyword = json.dumps(keyword); yield f'<script>updateProgress({progress}, "Searching: " + {js_keyword});</script>\n'
-                scrape_result = scrape_playlistsupply(keyword, ps_user, ps_session); time.sleep(0.4)
-                if scrape_result is None: has_scrape_error = True; continue
-                elif isinstance(scrape_result, dict) and "error" in scrape_result:
-                    has_scrape_error = True; error_info = scrape_result.get("message", "Error")
-                    if scrape_result.get("error") == "session_invalid": global_error_message = "PlaylistSupply Session Invalid/Expired."; break
-                    continue
-                elif isinstance(scrape_result, list):
-                    for pl in scrape_result:
-                        if isinstance(pl, dict) and pl.get('id'):
-                            pl_id = pl['id']
-                            if pl_id not in final_playlists: final_playlists[pl_id] = {"playlist_data": pl, "found_by": {keyword.lower()}}
-                            else: final_playlists[pl_id]["found_by"].add(keyword.lower())
-            if global_error_message: raise ConnectionError(global_error_message)
-            sorted_playlists = []
-            if final_playlists:
-                yield f'<script>updateProgress(95, "Sorting results...");</script>\n'
-                playlists_with_keywords = []
-                for pl_id, data in final_playlists.items():
-                    playlist_object = data['playlist_data']; playlist_object['found_by'] = sorted(list(data['found_by'])); playlists_with_keywords.append(playlist_object)
-                sorted_playlists = sorted(playlists_with_keywords, key=lambda p: parse_follower_count(p.get('followers')) or 0, reverse=True)
-            results_html = render_template('playlist_finder_results.html', selected_track_name=selected_track_name, playlists=sorted_playlists, has_scrape_error=has_scrape_error, search_performed=True, global_error=None)
-            js_escaped_html = json.dumps(results_html); js_escaped_playlist_data = json.dumps(sorted_playlists)
-            js_safe_final_title = json.dumps(f"Playlist Results for {selected_track_name}")
-            yield f'<script>injectResultsAndData({js_escaped_html}, {js_escaped_playlist_data}); document.title = {js_safe_final_title}; hideProgress();</script>\n'
-        except (ValueError, ConnectionError, spotipy.exceptions.SpotifyException) as e:
-            error_occurred = str(e); js_safe_error = json.dumps(error_occurred)
-            error_html = render_template('playlist_finder_results.html', playlists=None, search_performed=True, global_error=error_occurred)
-            js_escaped_error_html = json.dumps(error_html)
-            yield f'<script>injectResultsAndData({js_escaped_error_html}, []); hideProgress(); showSearchError("Playlist Search Error: " + {js_safe_error});</script>\n'
-        except Exception as e:
-            error_occurred = f"Unexpected error: {str(e)}"; traceback.print_exc(); js_safe_error = json.dumps(error_occurred)
-            error_html = render_template('playlist_finder_results.html', playlists=None, search_performed=True, global_error=error_occurred)
-            js_escaped_error_html = json.dumps(error_html)
-            yield f'<script>injectResultsAndData({js_escaped_error_html}, []); hideProgress(); showSearchError("Unexpected Error: " + {js_safe_error});</script>\n'
-        finally:
-            yield f'<script>hideProgress();</script>\n'
-    return Response(stream_with_context(generate_response()), mimetype='text/html')
+            search_job = job_urls(get_job_runner().submit('playlist_finder', {
+                'artist_id': artist_id, 'artist_name': artist_name, 'artist_genres': artist_genres,
+                'lastfm_tags': lastfm_tags, 'selected_track_id': selected_track_id, 'user_keywords': user_keywords_raw,
+            }))
+            # Playlists already in the local index are shown while the live sweep runs
+            local_keywords = [artist_name, *artist_genres[:5], *lastfm_tags[:10], *user_keywords_raw.split(',')]
+            search_job['local_url'] = url_for('playlists.local_playlist_search', track_id=selected_track_id,
+                                              keywords=','.join(filter(None, (kw.strip() for kw in local_keywords))))
+        except JobQueueFull:
+            flash('The server is busy with other searches. Please try again in a minute.', 'warning')
+    return render_template('playlist_finder_base.html', artist_id=artist_id, artist_name=artist_name, artist_genres=artist_genres, lastfm_tags=lastfm_tags, all_artist_tracks=all_artist_tracks, selected_track_id=selected_track_id, user_keywords=user_keywords_raw, search_performed=search_performed, loading=search_job is not None, search_job=search_job, playlists=None, global_error=None)
+
+
+@job_handler('playlist_finder')
+def playlist_finder_job(job, artist_id, artist_name, artist_genres, lastfm_tags, selected_track_id, user_keywords=''):
+    """
+    Builds the keyword set for a track and scrapes PlaylistSupply for each keyword.
+    Returns the rendered results HTML plus the playlist data the page injects.
+    """
+    sp = get_spotify_client_credentials_client()
+    if not sp: raise JobFailed('Spotify API client could not be initialized.')
+    final_playlists = {}; has_scrape_error = False; global_error_message = None
+    try:
+        if not selected_track_id: raise ValueError("Selected track ID is missing.")
+        market = 'US'; selected_track = sp.track(selected_track_id, market=market)
+        if not selected_track: raise ValueError(f"Track ID '{selected_track_id}' not found.")
+        selected_track_name = selected_track['name']; track_artist_name = selected_track['artists'][0]['name'] if selected_track['artists'] else artist_name
+        job.event('track', {'name': selected_track_name})
+
+        job.progress(10, "Finding similar artists...")
+        print("[PlaylistFinder Job] Building comprehensive similar artist pool for keywords...")
+
+        similar_artists_pool = similar_artist_pool.get(sp, artist_id)
+        print(f"[PlaylistFinder Job]  -> Using a combined pool of {len(similar_artists_pool)} unique similar artists.")
+
+        common_genres_from_pool = [facet['key'] for facet in similar_artists_pool.genre_facets[:10]]
+        print(f"[PlaylistFinder Job]  -> Top 10 common genres found: {common_genres_from_pool}")
+
+        keywords = set()
+        keywords.add(track_artist_name.lower()); keywords.add(artist_name.lower())
+        for genre in artist_genres[:5]: keywords.add(genre.lower().strip())
+        for tag in lastfm_tags[:10]: keywords.add(tag.lower().strip())
+        user_kws = [kw.strip().lower() for kw in user_keywords.split(',') if kw.strip()]
+        for kw in user_kws: keywords.add(kw)
+        for sim_artist in similar_artists_pool.artists: keywords.add(sim_artist["name"].lower())
+        for common_genre in common_genres_from_pool: keywords.add(common_genre.lower().strip())
+
+        keywords_list = sorted(list(filter(None, keywords)))
+        if not keywords_list: raise ValueError("No valid keywords generated.")
+        print(f"[PlaylistFinder Job] Generated {len(keywords_list)} keywords.")
+        total_keywords = len(keywords_list); job.event('keywords', keywords_list[:15])
+        ps_user = current_app.config.get('PLAYLIST_SUPPLY_USER'); ps_pass = current_app.config.get('PLAYLIST_SUPPLY_PASS')
+        if not ps_user or not ps_pass: raise ValueError("PlaylistSupply credentials missing.")
+        job.progress(20, "Logging in..."); ps_session = login_to_playlistsupply(ps_user, ps_pass)
+        if not ps_session: raise ConnectionError("Failed to log in to PlaylistSupply.")
+        processed_keywords = 0; initial_progress = 25; scrape_progress_range = 70
+        for keyword in keywords_list:
+            processed_keywords += 1; progress = initial_progress + int((processed_keywords / total_keywords) * scrape_progress_range); job.progress(progress, f"Searching: {keyword}")
+            scrape_result = scrape_playlistsupply(keyword, ps_user, ps_session); time.sleep(0.4)
+            if scrape_result is None: has_scrape_error = True; continue
+            elif isinstance(scrape_result, dict) and "error" in scrape_result:
+                has_scrape_error = True
+                if scrape_result.get("error") == "session_invalid": global_error_message = "PlaylistSupply Session Invalid/Expired."; break
+                continue
+            elif isinstance(scrape_result, list):
+                for pl in scrape_result:
+                    if isinstance(pl, dict) and pl.get('id'):
+                        record = final_playlists.get(pl['id'])
+                        if record is None:
+                            record = PlaylistRecord.from_dict(pl, found_by=())
+                            final_playlists[record.id] = record
+                        record.add_keyword(keyword)
+        # Indexed once after the sweep, with every keyword each playlist was found by
+        index_playlists(list(final_playlists.values()), 'playlistsupply')
+        if global_error_message: raise ConnectionError(global_error_message)
+    except (ValueError, ConnectionError, spotipy.exceptions.SpotifyException) as e:
+        raise JobFailed(str(e)) from e
+    sorted_playlists = []
+    if final_playlists:
+        job.progress(95, "Sorting results...")
+        sorted_playlists = sort_by_followers(list(final_playlists.values()))
+    results_html = render_template('playlist_finder_results.html', selected_track_name=selected_track_name, playlists=sorted_playlists, has_scrape_error=has_scrape_error, search_performed=True, global_error=None)
+    return {'selected_track_name': selected_track_name, 'results_html': results_html, 'playlists': [record.to_dict() for record in sorted_playlists]}
 
 
 @playlists_bp.route('/playlist-finder/upload/<artist_id>', methods=['POST'])
@@ -192,68 +195,55 @@ def upload_playlists(artist_id):
     file = request.files['playlist_file']
     if file.filename == '':
         return jsonify({"error": "No file selected."}), 400
-    if not file or not (file.filename.endswith('.xlsx') or file.filename.endswith('.xls')):
-        return jsonify({"error": "Invalid file type. Please upload an Excel file (.xlsx)."}), 400
 
     try:
-        df = pd.read_excel(file)
-        
-        column_map = {
-            'Playlist Name': 'name', 'Spotify URL': 'url', 'Curator Name': 'owner_name',
-            'Curator Email': 'email', 'Followers': 'followers', 'Total Tracks': 'tracks_total',
-            'Description': 'description', 'Found By Keyword': 'found_by', 'Contacted': 'contacted'
-        }
-        
-        required_cols = ['Playlist Name', 'Spotify URL']
-        missing_cols = [col for col in required_cols if col not in df.columns]
-        if missing_cols:
-            return jsonify({"error": f"Missing required columns in Excel file: {', '.join(missing_cols)}"}), 400
-
-        if 'Contacted' in df.columns:
-            df['Contacted'] = pd.to_numeric(df['Contacted'], errors='coerce').fillna(0)
-            initial_count = len(df)
-            df = df[df['Contacted'] != 1]
-            print(f"[Upload] Filtered out {initial_count - len(df)} contacted playlists.")
-
-        processed_playlists = []
-        for _, row in df.iterrows():
-            playlist_dict = {}
-            for excel_col, dict_key in column_map.items():
-                if excel_col in row:
-                    value = row[excel_col]
-                    playlist_dict[dict_key] = None if pd.isna(value) else value
-            
-            spotify_id = None
-            playlist_url = playlist_dict.get('url')
-            if playlist_url and isinstance(playlist_url, str) and 'open.spotify.com/playlist/' in playlist_url:
-                match = re.search(r'playlist/([a-zA-Z0-9]+)', playlist_url)
-                if match:
-                    spotify_id = match.group(1)
-            
-            if not spotify_id:
-                print(f"[Upload] Skipping row with invalid Spotify URL: {playlist_url}")
-                continue
-
-            playlist_dict['id'] = spotify_id
-            
-            if 'found_by' in playlist_dict and isinstance(playlist_dict['found_by'], str):
-                playlist_dict['found_by'] = [kw.strip() for kw in playlist_dict['found_by'].split(',')]
-            elif 'found_by' not in playlist_dict:
-                 playlist_dict['found_by'] = ['uploaded']
-
-
-            processed_playlists.append(playlist_dict)
-        
-        sorted_playlists = sorted(processed_playlists, key=lambda p: parse_follower_count(p.get('followers')) or 0, reverse=True)
-
-        return jsonify({"playlists": sorted_playlists})
-
+        sorted_playlists = load_uploaded_playlists(file)
+        index_playlists(sorted_playlists, 'upload')
+        return jsonify({"playlists": [record.to_dict() for record in sorted_playlists]})
+    except UploadError as e:
+        return jsonify({"error": str(e)}), 400
     except Exception as e:
         print(f"Error processing uploaded playlist file: {e}")
         traceback.print_exc()
         return jsonify({"error": f"An unexpected error occurred while processing the file: {e}"}), 500
 
 
+@playlists_bp.route('/playlist-finder/local-search', methods=['GET'])
+def local_playlist_search():
+    """
+    Answers a playlist search from the local index of previously seen playlists.
+    `keywords` is comma-separated; `track_id` (optional) names the track in the heading.
+    """
+    keywords = [kw.strip() for kw in request.args.get('keywords', '').split(',') if kw.strip()]
+    if not keywords:
+        return jsonify({"error": "No keywords provided."}), 400
+    limit = min(request.args.get('limit', type=int) or current_app.config['PLAYLIST_INDEX_LIMIT'], 500)
+    start = time.perf_counter()
+    try:
+        matches = get_playlist_index().search(keywords, limit=limit)
+    except Exception as e:
+        print(f"[PlaylistIndex] Local search failed: {e}")
+        return jsonify({"error": "Local playlist index unavailable."}), 503
+    took_ms = round((time.perf_counter() - start) * 1000, 2)
+    playlists = [record for record, _ in matches]
+    selected_track_name = request.args.get('track_name')
+    track_id = request.args.get('track_id')
+    if not selected_track_name and track_id and playlists:
+        sp = get_spotify_client_credentials_client()
+        try:
+            selected_track_name = sp.track(track_id)['name'] if sp else None
+        except Exception as e:
+            print(f"[PlaylistIndex] Could not fetch track name for {track_id}: {e}")
+    results_html = render_template('playlist_finder_results.html', selected_track_name=selected_track_name, playlists=playlists, has_scrape_error=False, search_performed=True, global_error=None, local_preview=True) if playlists else ''
+    return jsonify({
+        "results_html": results_html,
+        "playlists": [record.to_dict() for record in playlists],
+        "scores": {record.id: score for record, score in matches},
+        "count": len(playlists),
+        "took_ms": took_ms,
+    })
+
+
 @playlists_bp.route('/generate-preview-email', methods=['POST'])
 def generate_preview_email_route():
     sp = get_spotify_client_credentials_client()
@@ -275,198 +265,181 @@ def generate_preview_email_route():
         print(f"Unexpected error generating email preview/template: {e}"); error_msg = format_error_message(e, "Unexpected error generating preview/template."); return jsonify({"error": error_msg}), 500
 
 
+@playlists_bp.route('/generate-email-batch', methods=['POST'])
+def generate_email_batch_route():
+    """
+    Generates email variations for many playlists of one track at once. Playlists are
+    grouped by language and genre cluster with one Gemini call per language; the response
+    lists the variation groups and which group each playlist belongs to. The groups can
+    be posted back to /send-emails as they are.
+    """
+    sp = get_spotify_client_credentials_client()
+    if not sp: return jsonify({"error": "Spotify API client failed to initialize."}), 503
+    if not current_app.config.get('GEMINI_API_KEY'): return jsonify({"error": "AI API Key is not configured."}), 500
+    data = request.get_json()
+    if not data: return jsonify({"error": "Missing request data."}), 400
+    track_id = data.get('track_id'); song_description = data.get('song_description')
+    playlists = records_from_dicts(data.get('playlists') or [])
+    if not all([track_id, song_description, playlists]): return jsonify({"error": "Missing required fields (track_id, song_description, playlists)."}), 400
+    try:
+        track = sp.track(track_id, market='US')
+        if not track: raise ValueError(f"Could not fetch details for track ID: {track_id}")
+        groups, calls = generate_email_batch(
+            track, playlists, song_description, data.get('language') or 'English',
+            max_clusters=current_app.config['EMAIL_BATCH_MAX_CLUSTERS'],
+        )
+        assignments = {playlist_id: group['key'] for group in groups for playlist_id in group['playlist_ids']}
+        return jsonify({"groups": groups, "assignments": assignments, "ai_calls": calls})
+    except (ValueError, spotipy.exceptions.SpotifyException) as e:
+        error_msg = format_error_message(e, "Batch Generation Failed"); status_code = 400 if isinstance(e, ValueError) else 502
+        print(f"Error generating email batch: {error_msg}"); return jsonify({"error": error_msg}), status_code
+    except Exception as e:
+        print(f"Unexpected error generating email batch: {e}"); traceback.print_exc()
+        return jsonify({"error": format_error_message(e, "Unexpected error generating email batch.")}), 500
+
+
 @playlists_bp.route('/send-emails', methods=['POST'])
 def send_emails_route():
+    """
+    Renders one personalised plain-text email per contactable playlist and queues them in
+    the outbox as a campaign. Returns 202 with the campaign's progress URLs; delivery and
+    pacing happen in the outbox sender, so closing the page or restarting does not stop it.
+
+    Instead of one `variations` set, the body may carry the `groups` returned by
+    /generate-email-batch: each playlist is then rendered with its group's variations,
+    language and subject (playlists outside every group use `variations`, if given).
+    """
     sp = get_spotify_client_credentials_client()
     if not sp:
-        return Response("event: error\ndata: Spotify client error\n\n", mimetype='text/event-stream', status=503)
+        return jsonify({"error": "Spotify client error"}), 503
 
     sender_email = current_app.config.get("SENDER_EMAIL")
-    sender_password = current_app.config.get("SENDER_PASSWORD")
     smtp_server_host = current_app.config.get("SMTP_SERVER")
     smtp_port = current_app.config.get("SMTP_PORT")
 
-    if not all([sender_email, sender_password, smtp_server_host, smtp_port]):
-        return Response("event: error\ndata: SMTP credentials missing in config\n\n", mimetype='text/event-stream', status=500)
+    if not all([sender_email, smtp_server_host, smtp_port]):
+        return jsonify({"error": "SMTP credentials missing in config"}), 500
 
     data = request.get_json()
     if not data:
-        return Response("event: error\ndata: Missing request data\n\n", mimetype='text/event-stream', status=400)
-
-    edited_subject = data.get('subject')
-    selected_track_id = data.get('track_id')
-    playlists_to_contact = data.get('playlists', [])
-    email_variations = data.get('variations') 
-    bcc_email = data.get('bcc_email', '').strip()
+        return jsonify({"error": "Missing request data"}), 400
 
-    if not all(k in data for k in ['subject', 'track_id', 'playlists', 'variations']):
-        return Response("event: error\ndata: Missing required fields in request body\n\n", mimetype='text/event-stream', status=400)
-    
-    if not playlists_to_contact:
-        return Response("event: status\ndata: No playlists to contact.\nevent: done\ndata: Finished. Sent: 0, Errors: 0.\n\n", mimetype='text/event-stream')
-    
-    def email_stream():
-        track = None
-        total_emails_to_send = len(playlists_to_contact)
-        sent_count = 0
-        error_count = 0
-        start_time = time.time()
-        server = None
-
-        def yield_message(event, data):
-            sanitized_data = str(data).replace('\n', ' ').replace('\r', '')
-            yield f"event: {event}\ndata: {sanitized_data}\n\n"
+    groups = data.get('groups') or []
+    if not all(k in data for k in ['subject', 'track_id', 'playlists']) or not (data.get('variations') or groups):
+        return jsonify({"error": "Missing required fields in request body"}), 400
 
-        try:
-            yield_message('status', 'Fetching track details...')
-            track = sp.track(selected_track_id, market='US')
-            if not track:
-                raise ValueError(f"Cannot fetch track details for ID: {selected_track_id}")
-            track_name = track.get('name', 'N/A')
-            track_artist_name = track['artists'][0]['name'] if track.get('artists') else "Unknown Artist"
-            yield_message('status', f"Track '{track_name}' details fetched.")
-
-            yield_message('status', f"Connecting to SMTP server {smtp_server_host}:{smtp_port}...")
-            try:
-                if smtp_port == 465:
-                     server = smtplib.SMTP_SSL(smtp_server_host, smtp_port, timeout=30)
-                else:
-                     server = smtplib.SMTP(smtp_server_host, smtp_port, timeout=30)
-                     server.starttls()
-                server.login(current_app.config.get("SMTP_LOGIN_USER") or sender_email, sender_password)
-                yield_message('status', 'SMTP login successful. Starting email batch.')
-            except smtplib.SMTPAuthenticationError as auth_err:
-                raise ConnectionError(f"SMTP Auth Error: {auth_err}. Check credentials.") from auth_err
-            except Exception as conn_err:
-                raise ConnectionError(f"SMTP Connection Error: {conn_err}") from conn_err
-
-            for i, playlist in enumerate(playlists_to_contact):
-                current_status = f"({i+1}/{total_emails_to_send}) Processing '{playlist.get('name', 'N/A')}'"
-                yield_message('status', current_status)
-                curator_email = playlist.get('email')
-                if not curator_email or '@' not in curator_email:
-                    yield_message('status', f"-> Skipping (no valid email).")
-                    continue
-
-                try:
-                    actual_curator_name = playlist.get('owner_name') or "Playlist Curator"
-                    if actual_curator_name.lower() in ['n/a', 'spotify']: actual_curator_name = "Playlist Curator"
-                
-                    # --- CHANGE START: Assemble Plain Text Email with Link ---
-                    
-                    # 1. Choose random variations for each part of the email
-                    greeting = random.choice(email_variations['greetings'])
-                    main_body_variation = random.choice(email_variations['main_body'])
-                    closing = random.choice(email_variations['closings'])
-                    signature_line = random.choice(email_variations['signatures'])
-
-                    # 2. Get the track URL and create a reliable call-to-action
-                    track_url = track.get('external_urls', {}).get('spotify', '#')
-                    call_to_action = f"You can listen to the track here: {track_url}"
-
-                    # 3. Assemble all parts into the final plain-text body
-                    # The link is now reliably inserted between the main body and the closing.
-                    personalized_body = "\n\n".join([
-                        greeting,
-                        main_body_variation,
-                        call_to_action,
-                        closing,
-                        signature_line,
-                        track_artist_name
-                    ])
-
-                    # 4. Personalize the placeholders
-                    personalized_body = personalized_body.replace("{{curator_name}}", actual_curator_name).replace("{{playlist_name}}", playlist.get('name', 'this playlist'))
-
-                    # 5. The HTML part is no longer created or attached
-                    # html_body = create_curator_outreach_html(track, personalized_body)
-                    
-                    # --- CHANGE END ---
-                    
-                    yield_message('status', f"-> Sending email to {curator_email}...")
-                    msg = EmailMessage()
-                    msg['Subject'] = edited_subject
-                    msg['From'] =  f"FuzzTracks <{sender_email}>"
-                    msg['To'] = curator_email
-                    if bcc_email: msg['Bcc'] = bcc_email
-                    
-                    # This sets the plain text content. Since no HTML alternative is added,
-                    # the email will be sent as text/plain.
-                    msg.set_content(personalized_body)
-                    
-                    # This line is intentionally commented out to disable HTML emails.
-                    # msg.add_alternative(html_body, subtype='html')
-
-                    server.send_message(msg)
-                    yield_message('success', f"-> Email sent to {curator_email}.")
-                    sent_count += 1
-
-                    if i < total_emails_to_send - 1:
-                        sleep_duration = random.uniform(25, 60)
-                        yield_message('status', f"-> Waiting {sleep_duration:.1f}s...")
-                        time.sleep(sleep_duration)
-
-                except smtplib.SMTPException as send_err:
-                    error_count += 1
-                    yield_message('error', f"-> SMTP Error for {curator_email}: {send_err}")
-                except Exception as e:
-                    error_count += 1
-                    yield_message('error', f"-> General Error for {curator_email}: {e}")
-
-        except Exception as e:
-            yield_message('error', f"Setup Failed: {e}")
-        finally:
-            if server:
-                server.quit()
-            duration = round(time.time() - start_time)
-            final_message = f"Finished in {duration}s. Sent: {sent_count}, Errors: {error_count}."
-            yield_message('done', final_message)
+    edited_subject = data.get('subject')
+    email_variations = data.get('variations')
+    bcc_email = (data.get('bcc_email') or '').strip()
+    playlists_to_contact = records_from_dicts(data.get('playlists', []))
 
-    return Response(stream_with_context(email_stream()), mimetype='text/event-stream')
+    try:
+        track = sp.track(data.get('track_id'), market='US')
+    except Exception as e:
+        return jsonify({"error": format_error_message(e, "Cannot fetch track details")}), 502
+    if not track:
+        return jsonify({"error": f"Cannot fetch track details for ID: {data.get('track_id')}"}), 404
+    track_artist_name = track['artists'][0]['name'] if track.get('artists') else "Unknown Artist"
+    # The link is inserted reliably between the main body and the closing
+    track_url = track.get('external_urls', {}).get('spotify', '#')
+    # Playlist id -> (template, subject, variant id prefix); None is the shared `variations` template
+    templates = {}
+    try:
+        if email_variations:
+            templates[None] = (OutreachTemplate(email_variations, call_to_action_line(track_url, 'English'), track_artist_name), edited_subject, '')
+        for group in groups:
+            language = group.get('language') or 'English'
+            entry = (
+                OutreachTemplate(group['variations'], call_to_action_line(track_url, language), track_artist_name),
+                group.get('subject') or edited_subject,
+                f"{group['key']}:",
+            )
+            for playlist_id in group.get('playlist_ids') or []:
+                templates[playlist_id] = entry
+    except (KeyError, TypeError, ValueError) as e:
+        return jsonify({"error": format_error_message(e, "Invalid email variations")}), 400
+
+    messages, notes = [], []
+    for playlist in playlists_to_contact:
+        curator_email = playlist.email
+        if not curator_email or '@' not in curator_email:
+            notes.append(f"-> Skipping '{playlist.name or 'N/A'}' (no valid email).")
+            continue
+
+        entry = templates.get(playlist.id) or templates.get(None)
+        if entry is None:
+            notes.append(f"-> Skipping '{playlist.name or 'N/A'}' (no email variations for it).")
+            continue
+        template, subject, variant_prefix = entry
+
+        actual_curator_name = playlist.owner_name or "Playlist Curator"
+        if actual_curator_name.lower() in ['n/a', 'spotify']: actual_curator_name = "Playlist Curator"
+
+        variant = template.choose()
+        personalized_body = template.render(variant, {
+            'curator_name': actual_curator_name, 'playlist_name': playlist.name or 'this playlist',
+        })
+        messages.append({
+            'recipient': curator_email, 'subject': subject, 'body': personalized_body,
+            'bcc': bcc_email, 'variant': variant_prefix + template.variant_id(variant),
+        })
+
+    outbox = get_outbox()
+    campaign_id = outbox.store.create_campaign(edited_subject, messages, notes)
+    outbox.wake()
+    print(f"[Outbox] Queued campaign {campaign_id}: {len(messages)} emails, {len(notes)} skipped.")
+    return jsonify({'status': 'queued', **campaign_urls(campaign_id)}), 202
 
 
 @playlists_bp.route('/filter-playlists-ai', methods=['POST'])
 def filter_playlists_ai():
-    sp = get_spotify_client_credentials_client()
-    if not sp or not current_app.config.get('GEMINI_API_KEY'): return jsonify({"error": "Server is not configured for AI filtering."}), 500
     data = request.get_json()
     if not data: return jsonify({"error": "Missing request data."}), 400
     user_query = data.get('query'); playlists = data.get('playlists', [])
     if not user_query or not playlists: return jsonify({"error": "Missing 'query' or 'playlists' in request."}), 400
+    user_query = ' '.join(str(user_query).split())
+    if len(user_query) > MAX_FILTER_QUERY_LENGTH: return jsonify({"error": f"Query is too long (at most {MAX_FILTER_QUERY_LENGTH} characters)."}), 400
     print(f"[AI Filter V4] Received query: '{user_query}' for {len(playlists)} playlists.")
-    model_name = current_app.config.get("GEMINI_MODEL_NAME", "gemini-1.5-flash"); model = genai.GenerativeModel(model_name)
     try:
         print("[AI Filter V4] Step 1: Expanding query with representative artists...")
-        artist_expansion_prompt = f"""
-        You are a music expert. A user wants to find playlists based on a query.
-        List up to 30 representative and well-known artists for the following query.
-        Focus on artists that would likely be found in playlists matching the user's intent.
-        Return ONLY a JSON object with a key 'artists' which is an array of strings. Do not include any other text.
-        USER QUERY: "{user_query}"
-        EXAMPLE RESPONSE: {{"artists": ["Artist One", "Artist Two", "Artist Three"]}}
-        YOUR JSON RESPONSE:
-        """
-        representative_artists = []
-        try:
-            artist_response = model.generate_content(artist_expansion_prompt)
-            json_str = re.search(r'\{.*\}', artist_response.text, re.DOTALL).group(0)
-            representative_artists = json.loads(json_str).get('artists', [])
-            print(f"[AI Filter V4] AI suggested artists: {representative_artists}")
-        except Exception as e:
-            print(f"[AI Filter V4] Warning: Could not parse representative artists. Using query only. Error: {e}")
+        # The local tag model answers for any query containing a tag or genre it has
+        # seen; Gemini is only asked about queries it knows nothing of
+        expansion = get_tag_model().expand(user_query)
+        representative_artists = expansion.artists
+        related_tags = expansion.related_tags
+        if expansion:
+            print(f"[AI Filter V4] Tag model: {expansion.tags} -> {len(related_tags)} related tags, {len(representative_artists)} artists")
+        else:
+            artist_expansion_prompt = f"""
+            You are a music expert. A user wants to find playlists based on a query.
+            List up to 30 representative and well-known artists for the following query.
+            Focus on artists that would likely be found in playlists matching the user's intent.
+            Return ONLY a JSON object with a key 'artists' which is an array of strings. Do not include any other text.
+            USER QUERY: "{user_query}"
+            EXAMPLE RESPONSE: {{"artists": ["Artist One", "Artist Two", "Artist Three"]}}
+            YOUR JSON RESPONSE:
+            """
+            try:
+                artist_text = get_llm().generate_text('playlist_filter', artist_expansion_prompt)
+                json_str = re.search(r'\{.*\}', artist_text, re.DOTALL).group(0)
+                representative_artists = json.loads(json_str).get('artists', [])
+                print(f"[AI Filter V4] AI suggested artists: {representative_artists}")
+            except Exception as e:
+                print(f"[AI Filter V4] Warning: Could not parse representative artists. Using query only. Error: {e}")
         print("[AI Filter V4] Step 2: Filtering playlists with augmented keywords...")
         query_words = set(re.findall(r'\b\w+\b', user_query.lower()))
-        artist_names_lower = set(artist.lower() for artist in representative_artists)
-        augmented_keywords = query_words.union(artist_names_lower)
-        matching_playlists = []
-        for pl in playlists:
-            searchable_text = ' '.join([pl.get('name', '').lower(), pl.get('description', '').lower(), ' '.join(pl.get('found_by', [])).lower()])
-            if any(keyword in searchable_text for keyword in augmented_keywords): matching_playlists.append(pl)
-        print(f"[AI Filter V4] Found {len(matching_playlists)} potential matches.")
-        sorted_playlists = sorted(matching_playlists, key=lambda p: parse_follower_count(p.get('followers', '0')) or 0, reverse=True)
-        final_playlist_ids = [p['id'] for p in sorted_playlists]
-        print(f"[AI Filter V4] Returning {len(final_playlist_ids)} sorted playlist IDs.")
-        return jsonify({"playlist_ids": final_playlist_ids})
+        # The user's own words count double, and the exact query phrase more than its words apart
+        keyword_weights = {str(artist): 1.0 for artist in representative_artists}
+        keyword_weights.update({tag: similarity for tag, similarity in related_tags})
+        keyword_weights.update(dict.fromkeys(query_words, 2.0))
+        if len(query_words) > 1: keyword_weights[user_query] = 2.0 * len(query_words) + 1
+        matcher = KeywordMatcher(keyword_weights)
+        matches = rank_matches(matcher.match_records(records_from_dicts(playlists)))
+        print(f"[AI Filter V4] Found {len(matches)} matches for {len(matcher.weights)} keywords.")
+        final_playlist_ids = [record.id for record, _, _ in matches]
+        scores = {record.id: score for record, score, _ in matches}
+        print(f"[AI Filter V4] Returning {len(final_playlist_ids)} playlist IDs ranked by relevance.")
+        return jsonify({"playlist_ids": final_playlist_ids, "scores": scores})
     except Exception as e:
         print(f"[AI Filter V4] Error during AI-augmented filtering process: {e}"); traceback.print_exc(); return jsonify({"error": f"An unexpected error occurred during AI analysis: {e}"}), 500
     
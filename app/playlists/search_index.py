@@ -0,0 +1,177 @@
+import os
+import re
+import json
+import math
+import time
+import sqlite3
+import threading
+
+from flask import current_app
+
+from .records import PlaylistRecord
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS playlists (
+    rowid INTEGER PRIMARY KEY,
+    id TEXT NOT NULL UNIQUE,
+    data TEXT NOT NULL,
+    keywords TEXT NOT NULL,
+    followers_count INTEGER,
+    followers_log REAL NOT NULL DEFAULT 0, -- ln(1 + followers), precomputed for ranking
+    source TEXT,
+    first_seen REAL NOT NULL,
+    last_seen REAL NOT NULL
+);
+CREATE VIRTUAL TABLE IF NOT EXISTS playlists_fts USING fts5(
+    name, description, owner_name, keywords,
+    tokenize = 'unicode61 remove_diacritics 2'
+);
+"""
+
+# bm25() column weights: name, description, owner_name, found_by keywords
+_COLUMN_WEIGHTS = (4.0, 1.0, 0.5, 3.0)
+
+_WORD = re.compile(r'\w+')
+
+_MISSING = (None, '', 'N/A', 'unknown', [])
+
+
+def fts_query(keywords):
+    """
+    Turns keywords or phrases ("indie pop", "lofi") into an FTS5 query matching any of
+    them: each phrase as a whole and each of its words. Returns None if nothing is searchable.
+    """
+    if isinstance(keywords, str):
+        keywords = keywords.split(',')
+    terms = []
+    for keyword in keywords:
+        words = _WORD.findall(str(keyword).lower())
+        if len(words) > 1:
+            terms.append('"' + ' '.join(words) + '"')
+        terms.extend(f'"{word}"' for word in words)
+    terms = list(dict.fromkeys(terms))
+    return ' OR '.join(terms) if terms else None
+
+
+class PlaylistIndex:
+    """
+    Local full-text index of every playlist the app has seen, in SQLite FTS5.
+
+    Scrapes, Spotify searches and uploads are added as they come back (upsert merges
+    found_by keywords and keeps the latest metadata), so searches can be answered from
+    disk while a live sweep is still running. Results are ranked by BM25 over name,
+    description, curator and keywords, plus follower_weight * ln(1 + followers), so
+    among similar matches bigger playlists come first.
+    """
+
+    def __init__(self, path, follower_weight=0.15):
+        self.path = path
+        self.follower_weight = follower_weight
+        self._local = threading.local()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._connect() as conn:
+            conn.executescript(_SCHEMA)
+
+    def _connect(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10)
+            conn.row_factory = sqlite3.Row
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+        return conn
+
+    def upsert(self, records, source=None):
+        """Adds or refreshes PlaylistRecords in one transaction. Returns how many were written."""
+        records = [record for record in records if record is not None and record.id]
+        if not records:
+            return 0
+        now = time.time()
+        with self._connect() as conn:
+            existing = {}
+            ids = list(dict.fromkeys(record.id for record in records))
+            for start in range(0, len(ids), 500):
+                chunk = ids[start:start + 500]
+                rows = conn.execute(
+                    f"SELECT rowid, id, data FROM playlists WHERE id IN ({','.join('?' * len(chunk))})", chunk,
+                ).fetchall()
+                existing.update({row['id']: row for row in rows})
+            for record in records:
+                previous = existing.get(record.id)
+                if previous is not None:
+                    # Sources know different things (only scrapes have emails, Spotify
+                    # search results often lack followers): keep what the new one lacks
+                    merged = json.loads(previous['data'])
+                    found_by = merged.get('found_by') or []
+                    merged.update({key: value for key, value in record.to_dict().items() if value not in _MISSING})
+                    record = PlaylistRecord.from_dict(merged, found_by=[*found_by, *record.found_by])
+                data = json.dumps(record.to_dict(), separators=(',', ':'), default=str)
+                keywords = json.dumps(record.found_by)
+                followers_log = math.log1p(max(record.followers_count or 0, 0))
+                if previous is None:
+                    rowid = conn.execute(
+                        'INSERT INTO playlists (id, data, keywords, followers_count, followers_log, source, first_seen, last_seen) '
+                        'VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+                        (record.id, data, keywords, record.followers_count, followers_log, source, now, now),
+                    ).lastrowid
+                else:
+                    rowid = previous['rowid']
+                    conn.execute(
+                        'UPDATE playlists SET data = ?, keywords = ?, followers_count = ?, followers_log = ?, '
+                        'source = COALESCE(?, source), last_seen = ? WHERE rowid = ?',
+                        (data, keywords, record.followers_count, followers_log, source, now, rowid),
+                    )
+                    conn.execute('DELETE FROM playlists_fts WHERE rowid = ?', (rowid,))
+                conn.execute(
+                    'INSERT INTO playlists_fts (rowid, name, description, owner_name, keywords) VALUES (?, ?, ?, ?, ?)',
+                    (rowid, str(record.name or ''), str(record.description or ''), str(record.owner_name or ''),
+                     ' '.join(record.found_by)),
+                )
+                existing[record.id] = {'rowid': rowid, 'data': data}
+        return len(records)
+
+    def search(self, keywords, limit=200):
+        """
+        Playlists matching any of the keywords, best first, as [(PlaylistRecord, score)].
+        `keywords` is a list of keywords/phrases or a comma-separated string.
+        """
+        query = fts_query(keywords)
+        if not query:
+            return []
+        rows = self._connect().execute(
+            'SELECT p.data, -bm25(playlists_fts, ?, ?, ?, ?) + ? * p.followers_log AS score '
+            'FROM playlists_fts JOIN playlists p ON p.rowid = playlists_fts.rowid '
+            'WHERE playlists_fts MATCH ? ORDER BY score DESC LIMIT ?',
+            (*_COLUMN_WEIGHTS, self.follower_weight, query, limit),
+        ).fetchall()
+        return [(PlaylistRecord.from_dict(json.loads(row['data'])), round(row['score'], 3)) for row in rows]
+
+    def count(self):
+        return self._connect().execute('SELECT COUNT(*) FROM playlists').fetchone()[0]
+
+
+def init_playlist_index(app):
+    """Opens this process's handle on the shared playlist index."""
+    app.extensions['playlist_index'] = PlaylistIndex(
+        app.config['PLAYLIST_INDEX_DB'], follower_weight=app.config['PLAYLIST_INDEX_FOLLOWER_WEIGHT'],
+    )
+
+
+def get_playlist_index():
+    return current_app.extensions['playlist_index']
+
+
+def index_playlists(playlists, source):
+    """Best-effort indexing of freshly seen playlists (dicts or records); never breaks the caller."""
+    try:
+        records = [
+            playlist if isinstance(playlist, PlaylistRecord) else PlaylistRecord.from_dict(playlist)
+            for playlist in playlists or []
+        ]
+        return get_playlist_index().upsert(records, source)
+    except Exception as e:
+        print(f"[PlaylistIndex] Could not index {len(playlists or [])} playlists from {source}: {e}")
+        return 0
@@ -0,0 +1,118 @@
+import re
+import random
+
+# The AI-generated variation lists, in the order they appear in an email
+SECTIONS = ('greetings', 'main_body', 'closings', 'signatures')
+SECTION_PREFIXES = ('g', 'b', 'c', 's')
+
+# Matrices with more combinations than this are rendered section by section instead
+MAX_COMPILED_COMBINATIONS = 4096
+
+_PLACEHOLDER = re.compile(r'\{\{(\w+)\}\}')
+
+
+def _parse(text):
+    """Splits text into literal strings and placeholder names, as [(is_slot, value), ...]."""
+    parts, last = [], 0
+    for match in _PLACEHOLDER.finditer(text):
+        if match.start() > last:
+            parts.append((False, text[last:match.start()]))
+        parts.append((True, match.group(1)))
+        last = match.end()
+    if last < len(text):
+        parts.append((False, text[last:]))
+    return parts
+
+
+def _flatten(parts):
+    """
+    Turns parsed parts into (literals, slots): adjacent literal text merged into one
+    string, and each placeholder as a (position, name) whose literal is the raw {{name}}.
+    """
+    literals, slots, after_literal = [], [], False
+    for is_slot, value in parts:
+        if is_slot:
+            slots.append((len(literals), value))
+            literals.append('{{%s}}' % value)
+            after_literal = False
+        elif after_literal:
+            literals[-1] += value
+        else:
+            literals.append(value)
+            after_literal = True
+    return literals, slots
+
+
+def _fill(compiled, fields):
+    literals, slots = compiled
+    if not slots:
+        return ''.join(literals)
+    parts = list(literals)
+    for position, name in slots:
+        value = fields.get(name)
+        if value is not None:
+            parts[position] = value
+    return ''.join(parts)
+
+
+class OutreachTemplate:
+    """
+    Compiled form of an outreach email's variation matrix.
+
+    Every greeting/body/closing/signature variation is parsed for {{placeholders}} once.
+    A combination of one variation per section is flattened into a single list of
+    literal strings with the placeholder positions noted (cached per combination), so
+    rendering an email is filling those positions and one str.join. Matrices larger than
+    MAX_COMPILED_COMBINATIONS skip the cache and join filled sections. Each rendered email
+    is identified by its variant id, e.g. "g2-b0-c3-s1", which is stored with the message
+    so replies can be traced back to the wording that was sent.
+
+    Placeholders without a value are left in the text as written.
+    """
+
+    def __init__(self, variations, call_to_action, signature_name, separator='\n\n'):
+        self._sections = [[_parse(text) for text in variations[section]] for section in SECTIONS]
+        if not all(self._sections):
+            raise ValueError("Every variation section needs at least one entry.")
+        self._blocks = [[_flatten(parts) for parts in options] for options in self._sections]
+        # Fixed lines inserted after the main body and after the signature
+        self._call_to_action = call_to_action
+        self._signature_name = signature_name
+        self._separator = separator
+        self._compiled = {}
+        self._cache_combinations = self.combinations <= MAX_COMPILED_COMBINATIONS
+
+    @property
+    def combinations(self):
+        total = 1
+        for options in self._sections:
+            total *= len(options)
+        return total
+
+    def choose(self, rng=random):
+        """Picks one variation per section uniformly at random. Returns the variant (index tuple)."""
+        return tuple(rng.randrange(len(options)) for options in self._sections)
+
+    @staticmethod
+    def variant_id(variant):
+        return '-'.join(f"{prefix}{index}" for prefix, index in zip(SECTION_PREFIXES, variant))
+
+    def _compile(self, variant):
+        greeting, body, closing, signature = (options[i] for options, i in zip(self._sections, variant))
+        separator = [(False, self._separator)]
+        parts = (greeting + separator + body + separator + [(False, self._call_to_action)] + separator
+                 + closing + separator + signature + separator + [(False, self._signature_name)])
+        compiled = self._compiled[variant] = _flatten(parts)
+        return compiled
+
+    def render(self, variant, fields):
+        """Renders the email body for one variant with the given placeholder values."""
+        compiled = self._compiled.get(variant)
+        if compiled is None and self._cache_combinations:
+            compiled = self._compile(variant)
+        if compiled is not None:
+            return _fill(compiled, fields)
+        greeting, body, closing, signature = (
+            _fill(options[i], fields) for options, i in zip(self._blocks, variant)
+        )
+        return self._separator.join((greeting, body, self._call_to_action, closing, signature, self._signature_name))
@@ -0,0 +1,224 @@
+import os
+import json
+import time
+import hashlib
+import threading
+import functools
+from copy import deepcopy
+
+from flask import current_app, has_app_context
+
+try:
+    import fcntl
+except ImportError: # Not on Windows; calls are then only coalesced within a process
+    fcntl = None
+
+from .cache import get_cache
+from .breaker import CircuitOpen
+from .deadline import DeadlineExceeded, current_deadline
+
+# How often a worker waiting on another worker's identical call checks whether it finished
+_POLL_INTERVAL = 0.05
+
+
+class _Call:
+    __slots__ = ('done', 'result', 'error')
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """
+    Collapses concurrent calls for the same key into one execution within this process.
+
+    The first caller for a key runs the function; callers arriving while it is in flight
+    block until it finishes and receive the same result (or the same exception), passed
+    through `copy` if given, so callers that modify their result don't affect each other.
+    Exceptions of the `unshared` types say more about the first caller than about the
+    call (e.g. its deadline ran out); waiting callers then try again themselves.
+    Nothing is cached once the call completes.
+    """
+
+    def __init__(self, copy=None, unshared=()):
+        self._lock = threading.Lock()
+        self._calls = {}
+        self._copy = copy
+        self._unshared = unshared
+        self.coalesced = 0 # Calls that waited for another caller's result instead of running
+
+    def do(self, key, func, *args, **kwargs):
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            call.done.wait()
+            if isinstance(call.error, self._unshared):
+                return self.do(key, func, *args, **kwargs)
+            if call.error is not None:
+                raise call.error
+            return self._copy(call.result) if self._copy else call.result
+
+        try:
+            call.result = func(*args, **kwargs)
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+
+class WorkerLocks:
+    """
+    Exclusive locks between worker processes, one per key, as POSIX record locks on a
+    single byte of one shared lock file (the byte is chosen by hashing the key). Nothing
+    is created per key, and a lock held by a worker that dies is released by the OS.
+
+    Record locks belong to the process, and closing any descriptor of the file drops all
+    of them, so each process keeps one descriptor open for good. Threads of the same
+    process never exclude each other here; SingleFlight handles them first.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._fd = None
+        self._pid = None
+        self._lock = threading.Lock()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    def _descriptor(self):
+        with self._lock:
+            if self._pid != os.getpid(): # Opened before a fork; the child needs its own
+                self._fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+                self._pid = os.getpid()
+            return self._fd
+
+    @staticmethod
+    def offset(key):
+        return int(hashlib.sha1(key.encode('utf-8')).hexdigest()[:8], 16) & 0x7fffffff
+
+    def try_lock(self, key):
+        try:
+            fcntl.lockf(self._descriptor(), fcntl.LOCK_EX | fcntl.LOCK_NB, 1, self.offset(key))
+            return True
+        except OSError:
+            return False
+
+    def unlock(self, key):
+        fcntl.lockf(self._descriptor(), fcntl.LOCK_UN, 1, self.offset(key))
+
+
+_worker_locks = {}
+_worker_locks_lock = threading.Lock()
+
+
+def _locks_for(path):
+    locks = _worker_locks.get(path)
+    if locks is None:
+        with _worker_locks_lock:
+            locks = _worker_locks.setdefault(path, WorkerLocks(path))
+    return locks
+
+
+_stats_lock = threading.Lock()
+_stats = {'from_other_workers': 0}
+
+
+def _survives_json(value):
+    """True if value comes back from JSON unchanged (no tuples, datetimes, non-string keys...)."""
+    try:
+        return json.loads(json.dumps(value)) == value
+    except (TypeError, ValueError):
+        return False
+
+
+def _across_workers(key, func, args, kwargs):
+    """
+    Runs func unless another worker is already running the identical call, in which case
+    this waits for it (up to SINGLEFLIGHT_WAIT seconds, or the request deadline) and takes
+    the result it left in the shared 'singleflight' cache. Only results that survive a JSON
+    round trip unchanged are handed over; for anything else each worker makes its own call.
+    Runs func directly outside an app context, without fcntl, or with SINGLEFLIGHT_LOCK_FILE unset.
+    """
+    path = current_app.config.get('SINGLEFLIGHT_LOCK_FILE') if has_app_context() else None
+    if not path or fcntl is None:
+        return func(*args, **kwargs)
+    locks = _locks_for(path)
+    wait = current_app.config['SINGLEFLIGHT_WAIT']
+    deadline = current_deadline()
+    if deadline is not None:
+        wait = min(wait, deadline.remaining())
+    give_up_at = time.monotonic() + wait
+    wait_started = time.time()
+    waited = False
+    while not locks.try_lock(key):
+        waited = True
+        if time.monotonic() >= give_up_at:
+            return func(*args, **kwargs)
+        time.sleep(_POLL_INTERVAL)
+
+    results = get_cache('singleflight', default_ttl=current_app.config['SINGLEFLIGHT_RESULT_TTL'])
+    try:
+        if waited:
+            # Only a result written while we were waiting is used. One left by an earlier
+            # call (e.g. when the call we waited for failed) is ignored
+            shared = results.get(key)
+            if shared is not None and shared.get('written_at', 0) >= wait_started:
+                with _stats_lock:
+                    _stats['from_other_workers'] += 1
+                return shared['value']
+        value = func(*args, **kwargs)
+        if _survives_json(value):
+            results.set(key, {'value': value, 'written_at': time.time()})
+        return value
+    finally:
+        locks.unlock(key)
+
+
+# Upstream responses are plain JSON data, and callers are free to modify what they get back.
+# A call that failed because the first caller ran out of time, or was refused by an open
+# breaker, is retried by the callers that waited on it, under their own deadlines.
+_upstream_flight = SingleFlight(copy=deepcopy, unshared=(DeadlineExceeded, CircuitOpen))
+
+
+def coalesce(namespace, key, func, *args, across_workers=True, **kwargs):
+    """
+    Calls func(*args, **kwargs), unless an identical call (same namespace and key, where
+    key is any JSON-serialisable value) is already in flight in this worker or, with
+    `across_workers`, another one; then that call's result is returned instead of making
+    the same upstream request. Handing results between workers costs a lock and a cache
+    write per call, so it is meant for slow upstreams (scrapers), not fast API calls.
+    """
+    key = f"{namespace}:{json.dumps(key, sort_keys=True, default=str)}"
+    if not across_workers:
+        return _upstream_flight.do(key, func, *args, **kwargs)
+    return _upstream_flight.do(key, _across_workers, key, func, args, kwargs)
+
+
+def coalesced(namespace, across_workers=True):
+    """Decorator form of coalesce(), keyed by the call's arguments."""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            return coalesce(namespace, [args, kwargs], func, *args, across_workers=across_workers, **kwargs)
+        return wrapper
+    return decorator
+
+
+def coalesce_stats():
+    """Upstream calls this worker didn't make because an identical one was in flight."""
+    with _stats_lock:
+        from_other_workers = _stats['from_other_workers']
+    return {'within_worker': _upstream_flight.coalesced, 'from_other_workers': from_other_workers}
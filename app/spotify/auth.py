@@ -1,9 +1,15 @@
 # --- START OF FILE app/spotify/auth.py ---
 import os
 import traceback
-from flask import current_app, flash # Keep flash if needed elsewhere, though less common now
+from flask import current_app, flash, has_app_context # Keep flash if needed elsewhere, though less common now
 import spotipy
 from spotipy.oauth2 import SpotifyClientCredentials
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from ..httpclient import POOL_SIZE, DeadlineSession
+from ..singleflight import coalesce
+from .ratelimit import get_spotify_governor
 
 # --- Client Credentials Manager ---
 # Use environment variables directly as configured in Config
@@ -28,6 +34,51 @@ if client_id and client_secret:
 else:
     print("WARNING: SPOTIPY_CLIENT_ID or SPOTIPY_CLIENT_SECRET not found. Spotify API calls will fail.")
 
+class DeadlineSpotify(spotipy.Spotify):
+    """
+    spotipy client whose HTTP session honours the current request deadline (see app/deadline.py)
+    and whose API calls all go through `governor` (app/spotify/ratelimit.py). spotipy's own
+    retries are kept for server errors; 429s are left to the governor. Identical GETs made
+    at the same time in this worker (e.g. the page render and its XHRs all fetching the
+    artist) are coalesced into one call before they reach the governor.
+    """
+
+    def __init__(self, *args, governor=None, **kwargs):
+        kwargs.setdefault('status_forcelist', (500, 502, 503, 504))
+        super().__init__(*args, **kwargs)
+        self.governor = governor
+
+    def _governed_call(self, method, url, payload, params):
+        if self.governor is None:
+            return super()._internal_call(method, url, payload, params)
+        return self.governor.call(super()._internal_call, method, url, payload, params)
+
+    def _internal_call(self, method, url, payload, params):
+        if method != 'GET':
+            return self._governed_call(method, url, payload, params)
+        return coalesce('spotify', [url, params], self._governed_call, method, url, payload, params,
+                        across_workers=False)
+
+    def _build_session(self):
+        # spotipy's retry policy, except that urllib3 must not wait out Retry-After itself:
+        # it would retry 429s (whatever status_forcelist says) while holding a governor slot,
+        # ignoring the request deadline and without pausing the shared bucket
+        retry = Retry(
+            total=self.retries,
+            connect=None,
+            read=False,
+            allowed_methods=frozenset(['GET', 'POST', 'PUT', 'DELETE']),
+            status=self.status_retries,
+            backoff_factor=self.backoff_factor,
+            status_forcelist=[status for status in self.status_forcelist if status != 429],
+            respect_retry_after_header=False,
+        )
+        adapter = HTTPAdapter(max_retries=retry, pool_connections=POOL_SIZE, pool_maxsize=POOL_SIZE)
+        self._session = DeadlineSession(upstream='spotify')
+        self._session.mount('http://', adapter)
+        self._session.mount('https://', adapter)
+
+
 # --- Get Spotify Client (Client Credentials) ---
 def get_spotify_client_credentials_client():
     """
@@ -42,7 +93,10 @@ def get_spotify_client_credentials_client():
     try:
         # Create the Spotipy client using the manager
         # The manager handles token fetching and caching internally (based on Spotipy's implementation)
-        sp = spotipy.Spotify(client_credentials_manager=client_credentials_manager)
+        sp = DeadlineSpotify(
+            client_credentials_manager=client_credentials_manager,
+            governor=get_spotify_governor() if has_app_context() else None,
+        )
         print("Spotify client created using Client Credentials Manager.")
         # Optional validation removed for brevity, manager should handle auth errors
         return sp
@@ -56,7 +56,6 @@ def fetch_similar_artists_by_genre(sp_client, artist_id, artist_name, artist_gen
                     print(f"[Similar By Genre]   Found {count} new unique artists for '{genre}'.")
                 else:
                     print(f"[Similar By Genre]   No results for '{genre}'.")
-                time.sleep(0.15)
             except spotipy.exceptions.SpotifyException as search_err:
                 print(f"[Similar By Genre]   Spotify Error searching '{genre}': {search_err}")
             except Exception as search_ex:
@@ -120,17 +119,16 @@ def fetch_release_details(sp_client, releases_simplified):
         tracks_pager = release_details['tracks']
         if tracks_pager and tracks_pager.get('items'): all_tracks_this_release.extend(tracks_pager['items'])
         current_sp = sp_client # Use initial client for pagination for now
-        page_num = 1; retries = 0; max_retries = 2
-        while tracks_pager and tracks_pager.get('next') and retries <= max_retries:
+        page_num = 1 # Pacing and 429 retries are handled by the Spotify governor
+        while tracks_pager and tracks_pager.get('next'):
             page_num += 1; print(f"    Fetching track page {page_num} for '{release_name}'...")
             try:
-                time.sleep(0.1); tracks_pager = current_sp.next(tracks_pager)
-                if tracks_pager and tracks_pager.get('items'): all_tracks_this_release.extend(tracks_pager['items']); retries = 0
+                tracks_pager = current_sp.next(tracks_pager)
+                if tracks_pager and tracks_pager.get('items'): all_tracks_this_release.extend(tracks_pager['items'])
                 else: tracks_pager = None
             except spotipy.exceptions.SpotifyException as e:
                 print(f"    Spotify API error fetching next track page ({page_num}): {e}")
                 if e.http_status == 401 or e.http_status == 403: print("    --> Auth error. Aborting."); release_details['tracks_error'] = "Auth error"; processed_releases.append(release_details); return processed_releases
-                elif e.http_status == 429: wait_time = int(e.headers.get('Retry-After', 2)) + 1; print(f"    Rate limited. Waiting {wait_time}s..."); time.sleep(wait_time); retries += 1; print(f"    Retrying page {page_num} ({retries}/{max_retries})")
                 else: release_details['tracks_error'] = f"API Error page {page_num}: {e.msg}"; tracks_pager = None; break
             except Exception as e: print(f"    Unexpected error fetching next track page ({page_num}): {e}"); traceback.print_exc(); release_details['tracks_error'] = f"Unexpected error page {page_num}"; tracks_pager = None; break
         release_details['tracks']['items'] = all_tracks_this_release; release_details['tracks'].pop('next', None)
@@ -141,76 +139,117 @@ def fetch_release_details(sp_client, releases_simplified):
     return processed_releases
 
 
-def fetch_spotify_details_for_names(sp_client, artist_names):
+def resolve_spotify_artists_by_name(sp_client, artist_names):
     """
-    Searches Spotify for artists by name and fetches full details for matches.
+    Searches Spotify for each artist name and fetches full details for the top match.
 
     Args:
         sp_client: Authenticated spotipy client instance.
         artist_names (list): A list of artist names (strings).
 
     Returns:
-        list: A list of full Spotify artist objects for found artists. De-duplicated.
+        dict: Name -> full Spotify artist object, or None when the search found no match.
+              Names that could not be looked up (errors, rate limiting) are left out so
+              callers can retry them later.
     """
     if not sp_client:
         print("[Spotify Lookup] Error: Invalid Spotify client.")
-        return []
+        return {}
     if not artist_names:
         print("[Spotify Lookup] No artist names provided.")
-        return []
+        return {}
 
     print(f"[Spotify Lookup] Searching Spotify for {len(artist_names)} names...")
-    found_artists_map = {} # Use map to store by ID for deduplication
+    resolved = {}
+    found_artists_map = {} # Full details by ID, so a repeated match is fetched once
 
-    processed_count = 0
     for name in artist_names:
-        processed_count += 1
         if not name or not isinstance(name, str):
             continue
 
-        # Add slight delay to avoid hitting search rate limits too quickly
-        if processed_count > 1:
-             time.sleep(0.1) # Small delay between searches
-
         try:
-            # print(f"  Searching Spotify for: '{name}' ({processed_count}/{len(artist_names)})")
             # Search for the artist, limit 1 is usually sufficient
             results = sp_client.search(q=name, type='artist', limit=1)
 
-            if results and results['artists']['items']:
-                found_artist_basic = results['artists']['items'][0]
-                artist_id = found_artist_basic.get('id')
-
-                # Check if we already fetched this ID
-                if artist_id and artist_id not in found_artists_map:
-                    # Fetch full details (search results might be incomplete)
-                    # print(f"    Found potential match: {found_artist_basic['name']} ({artist_id}). Fetching full details.")
-                    try:
-                        # Fetching full details ensures we have popularity, followers etc.
-                        full_details = sp_client.artist(artist_id)
-                        if full_details:
-                            found_artists_map[artist_id] = full_details
-                        # else: print(f"    Warning: Could not fetch full details for ID {artist_id}")
-                    except spotipy.exceptions.SpotifyException as detail_err:
-                         print(f"    Spotify Error fetching full details for {artist_id} ('{name}'): {detail_err}")
-                    except Exception as detail_ex:
-                         print(f"    Unexpected Error fetching full details for {artist_id} ('{name}'): {detail_ex}")
-
-            # else: print(f"  No direct match found on Spotify for '{name}'")
+            if not (results and results['artists']['items']):
+                resolved[name] = None
+                continue
+
+            artist_id = results['artists']['items'][0].get('id')
+            if not artist_id:
+                resolved[name] = None
+            elif artist_id in found_artists_map:
+                resolved[name] = found_artists_map[artist_id]
+            else:
+                try:
+                    # Fetching full details ensures we have popularity, followers etc.
+                    full_details = sp_client.artist(artist_id)
+                    if full_details:
+                        found_artists_map[artist_id] = full_details
+                    resolved[name] = full_details or None
+                except spotipy.exceptions.SpotifyException as detail_err:
+                     print(f"    Spotify Error fetching full details for {artist_id} ('{name}'): {detail_err}")
+                except Exception as detail_ex:
+                     print(f"    Unexpected Error fetching full details for {artist_id} ('{name}'): {detail_ex}")
 
         except spotipy.exceptions.SpotifyException as search_err:
-             # Handle specific errors like rate limiting if needed
+             # The governor already waited out and retried 429s; one reaching here means Spotify
+             # asked for a longer pause than this lookup can take, so the rest are left for later
              if search_err.http_status == 429:
                  print(f"  Spotify rate limit hit while searching for '{name}'. Stopping lookup.")
-                 break # Stop if rate limited
+                 break
              else:
                  print(f"  Spotify Error searching for '{name}': {search_err}")
         except Exception as search_ex:
             print(f"  Unexpected Error searching for '{name}': {search_ex}")
             traceback.print_exc()
 
-    final_list = list(found_artists_map.values())
-    print(f"[Spotify Lookup] Found Spotify details for {len(final_list)} unique artists.")
-    return final_list
+    print(f"[Spotify Lookup] Found Spotify details for {len(found_artists_map)} unique artists.")
+    return resolved
+
+
+def fetch_artists_by_id(sp_client, artist_ids, batch_size=50):
+    """
+    Fetches current full artist objects by ID, `batch_size` (Spotify's maximum, 50) per call.
+
+    Returns:
+        dict: ID -> full Spotify artist object, or None for IDs Spotify no longer knows.
+              IDs in a batch that failed (errors, rate limiting) are left out.
+    """
+    artist_ids = list(dict.fromkeys(artist_id for artist_id in artist_ids if artist_id))
+    fetched = {}
+    for start in range(0, len(artist_ids), batch_size):
+        batch = artist_ids[start:start + batch_size]
+        try:
+            artists = (sp_client.artists(batch) or {}).get('artists') or []
+        except spotipy.exceptions.SpotifyException as e:
+            print(f"  Spotify Error fetching {len(batch)} artists by ID: {e}")
+            if e.http_status == 429:
+                break
+            continue
+        except Exception as e:
+            print(f"  Unexpected Error fetching {len(batch)} artists by ID: {e}")
+            continue
+        for artist_id, artist in zip(batch, artists):
+            fetched[artist_id] = artist or None
+    return fetched
+
+
+def fetch_spotify_details_for_names(sp_client, artist_names):
+    """
+    Searches Spotify for artists by name and fetches full details for matches.
+
+    Args:
+        sp_client: Authenticated spotipy client instance.
+        artist_names (list): A list of artist names (strings).
+
+    Returns:
+        list: A list of full Spotify artist objects for found artists. De-duplicated.
+    """
+    found_artists_map = {}
+    for artist in resolve_spotify_artists_by_name(sp_client, artist_names).values():
+        if artist and artist.get('id'):
+            found_artists_map.setdefault(artist['id'], artist)
+    return list(found_artists_map.values())
 
 # --- END OF FILE app/spotify/data.py ---
\ No newline at end of file
@@ -0,0 +1,89 @@
+import io
+import os
+import csv
+import tempfile
+
+from openpyxl import Workbook
+
+# Export column key -> value extractor for a full Spotify artist object.
+SIMILAR_ARTIST_COLUMNS = {
+    'name': lambda a: a.get('name', 'N/A'),
+    'followers': lambda a: (a.get('followers') or {}).get('total'),
+    'popularity': lambda a: a.get('popularity'),
+    'genres': lambda a: ', '.join(a.get('genres') or []),
+    'url': lambda a: (a.get('external_urls') or {}).get('spotify'),
+    'image_url': lambda a: a['images'][0]['url'] if a.get('images') else None,
+}
+
+CSV_MIMETYPE = 'text/csv'
+XLSX_MIMETYPE = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+
+_CSV_FLUSH_BYTES = 16 * 1024
+_FILE_CHUNK_BYTES = 64 * 1024
+
+
+def export_columns(requested):
+    """Keeps only known column keys, in the requested order."""
+    return [col for col in requested if col in SIMILAR_ARTIST_COLUMNS]
+
+
+def _row_values(artist, extractors):
+    return [extractor(artist) for extractor in extractors]
+
+
+def iter_similar_artists_csv(artists, columns):
+    """
+    Yields a CSV export chunk by chunk as rows are produced, so the response can start
+    immediately and memory stays bounded regardless of pool size.
+    """
+    extractors = [SIMILAR_ARTIST_COLUMNS[col] for col in columns]
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    for artist in artists:
+        writer.writerow(_row_values(artist, extractors))
+        if buffer.tell() >= _CSV_FLUSH_BYTES:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+def write_similar_artists_xlsx(artists, columns, sheet_name='Similar Artists'):
+    """
+    Writes an XLSX export with openpyxl's write_only mode straight to a temp file.
+    Returns the file path; the caller streams it (see iter_file_chunks) and removes it.
+    """
+    extractors = [SIMILAR_ARTIST_COLUMNS[col] for col in columns]
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet(sheet_name)
+    sheet.append(columns)
+    for artist in artists:
+        sheet.append(_row_values(artist, extractors))
+
+    handle, path = tempfile.mkstemp(prefix='similar_artists_', suffix='.xlsx')
+    os.close(handle)
+    try:
+        workbook.save(path)
+    except Exception:
+        os.remove(path)
+        raise
+    return path
+
+
+def iter_file_chunks(path, remove=True, chunk_size=_FILE_CHUNK_BYTES):
+    """Yields a file in fixed-size chunks, deleting it afterwards (also on client disconnect)."""
+    try:
+        with open(path, 'rb') as handle:
+            while True:
+                chunk = handle.read(chunk_size)
+                if not chunk:
+                    break
+                yield chunk
+    finally:
+        if remove:
+            try:
+                os.remove(path)
+            except OSError as e:
+                print(f"[Export] Warning: could not remove temp export '{path}': {e}")
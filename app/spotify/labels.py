@@ -0,0 +1,102 @@
+from flask import current_app
+
+from ..cache import get_cache
+from .ratelimit import get_spotify_governor
+
+_ALBUMS_PER_REQUEST = 20 # Spotify's limit for GET /albums
+
+
+def _labels_cache():
+    # A release's label doesn't change, so album -> label is kept for a long time
+    return get_cache('album_labels', default_ttl=current_app.config['ALBUM_LABEL_TTL'])
+
+
+def _releases_cache():
+    return get_cache('artist_releases', default_ttl=current_app.config['ARTIST_RELEASES_TTL'])
+
+
+def album_labels(sp, album_ids):
+    """
+    Returns {album_id: label} for the given album ids. Cached labels are reused; the
+    rest are fetched with sp.albums() in batches of 20, the batches run concurrently
+    under the Spotify governor. Albums that could not be fetched are left out.
+    """
+    cache = _labels_cache()
+    labels = {}
+    missing = []
+    for album_id in dict.fromkeys(album_ids):
+        label = cache.get(album_id)
+        if label is None:
+            missing.append(album_id)
+        else:
+            labels[album_id] = label
+    batches = [missing[i:i + _ALBUMS_PER_REQUEST] for i in range(0, len(missing), _ALBUMS_PER_REQUEST)]
+    for batch, results, error in get_spotify_governor().map(lambda batch: sp.albums(batch), batches):
+        if error is not None:
+            print(f"[Labels] Album batch of {len(batch)} failed: {error}")
+            continue
+        for album in (results or {}).get('albums') or []:
+            if album and album.get('id'):
+                labels[album['id']] = album.get('label') or ''
+                cache.set(album['id'], labels[album['id']])
+    return labels
+
+
+def artist_release_ids(sp, artist_ids, limit=10):
+    """
+    Returns {artist_id: [album ids, newest first]} from artist_albums (albums and singles),
+    cached per artist for ARTIST_RELEASES_TTL and fetched concurrently for cache misses.
+    """
+    cache = _releases_cache()
+    releases = {}
+    missing = []
+    for artist_id in dict.fromkeys(artist_ids):
+        ids = cache.get(f"{artist_id}:{limit}")
+        if ids is None:
+            missing.append(artist_id)
+        else:
+            releases[artist_id] = ids
+    fetch = lambda artist_id: sp.artist_albums(artist_id, album_type='album,single', limit=limit)
+    for artist_id, results, error in get_spotify_governor().map(fetch, missing):
+        if error is not None:
+            print(f"[Labels] Releases for artist {artist_id} failed: {error}")
+            continue
+        releases[artist_id] = [rel['id'] for rel in (results or {}).get('items') or [] if rel and rel.get('id')]
+        cache.set(f"{artist_id}:{limit}", releases[artist_id])
+    return releases
+
+
+def harvest_labels(sp, sources):
+    """
+    Collects the labels behind several artists' recent releases in a few requests.
+
+    `sources` is [(artist_id, artist_name, releases_to_check, artist_albums_limit)].
+    All release lists are gathered first (concurrently), then every release id is
+    resolved through album_labels(). Returns {label: {'artists': [names], 'releases':
+    [album ids]}} in the order labels were first seen, following the order of `sources`.
+    """
+    by_limit = {}
+    for artist_id, _, _, limit in sources:
+        by_limit.setdefault(limit, []).append(artist_id)
+    releases = {}
+    for limit, artist_ids in by_limit.items():
+        for artist_id, ids in artist_release_ids(sp, artist_ids, limit=limit).items():
+            releases[(artist_id, limit)] = ids
+
+    wanted = [
+        (artist_name, album_id)
+        for artist_id, artist_name, count, limit in sources
+        for album_id in releases.get((artist_id, limit), [])[:count]
+    ]
+    labels = album_labels(sp, [album_id for _, album_id in wanted])
+
+    harvested = {}
+    for artist_name, album_id in wanted:
+        label = labels.get(album_id)
+        if not label:
+            continue
+        entry = harvested.setdefault(label, {'artists': [], 'releases': []})
+        if artist_name and artist_name not in entry['artists']:
+            entry['artists'].append(artist_name)
+        entry['releases'].append(album_id)
+    return harvested
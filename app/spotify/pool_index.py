@@ -0,0 +1,92 @@
+import time
+
+import numpy as np
+
+
+class PoolIndex:
+    """
+    Read-only filter/sort index over one stored similar-artist pool.
+
+    Rows are kept in display order (popularity descending, pool order breaking ties), so a
+    popularity range is a contiguous slice found by binary search. Followers are kept as a
+    separately sorted array for range lookups, and genres as an inverted index of row ids.
+    A query with only popularity bounds therefore never touches the full pool, and
+    paging is a slice.
+    """
+
+    def __init__(self, pool):
+        self.source = pool['source']
+        self.artists = pool['artists']
+        self.lastfm = pool.get('lastfm') or {}
+        self.built_at = pool.get('built_at') or time.time()
+        size = len(self.artists)
+
+        popularity = pool['popularity']
+        pop_null = np.fromiter((p is None for p in popularity), dtype=bool, count=size)
+        pop = np.fromiter((p or 0 for p in popularity), dtype=np.int64, count=size)
+        self._order = np.argsort(-pop, kind='stable')
+        # Ascending, so np.searchsorted can be used on the display order directly
+        self._neg_pop = -pop[self._order]
+        self._pop_null = pop_null[self._order]
+        self._has_pop_null = bool(pop_null.any())
+
+        followers = pool['followers']
+        fol_null = np.fromiter((f is None for f in followers), dtype=bool, count=size)
+        fol = np.fromiter((f or 0 for f in followers), dtype=np.int64, count=size)
+        known = np.flatnonzero(~fol_null)
+        self._followers_rows = known[np.argsort(fol[known], kind='stable')]
+        self._followers_sorted = fol[self._followers_rows]
+
+        postings, display_names = {}, {}
+        for row, artist in enumerate(self.artists):
+            for genre in artist.get('genres') or []:
+                key = genre.lower()
+                display_names.setdefault(key, genre)
+                rows = postings.setdefault(key, [])
+                if not rows or rows[-1] != row:
+                    rows.append(row)
+        self._genre_rows = {key: np.array(rows, dtype=np.int64) for key, rows in postings.items()}
+        self.genre_facets = sorted(
+            ({'key': key, 'display_name': display_names[key], 'count': len(rows)} for key, rows in postings.items()),
+            key=lambda facet: facet['count'], reverse=True,
+        )
+
+    def __len__(self):
+        return len(self.artists)
+
+    def _row_mask(self, rows):
+        mask = np.zeros(len(self.artists), dtype=bool)
+        mask[rows] = True
+        return mask
+
+    def query(self, min_followers=None, max_followers=None, min_popularity=None,
+              max_popularity=None, genre=None):
+        """
+        Returns the matching row ids in display order as an int array.
+        Artists with no value for a bounded field are excluded, as before.
+        """
+        start, stop = 0, len(self.artists)
+        if max_popularity is not None:
+            start = int(np.searchsorted(self._neg_pop, -max_popularity, side='left'))
+        if min_popularity is not None:
+            stop = int(np.searchsorted(self._neg_pop, -min_popularity, side='right'))
+        rows = self._order[start:stop]
+        if self._has_pop_null and (min_popularity is not None or max_popularity is not None):
+            rows = rows[~self._pop_null[start:stop]]
+
+        if min_followers is not None or max_followers is not None:
+            lo = 0 if min_followers is None else np.searchsorted(self._followers_sorted, min_followers, side='left')
+            hi = (len(self._followers_sorted) if max_followers is None
+                  else np.searchsorted(self._followers_sorted, max_followers, side='right'))
+            rows = rows[self._row_mask(self._followers_rows[lo:hi])[rows]]
+
+        if genre:
+            genre_rows = self._genre_rows.get(genre.lower())
+            if genre_rows is None:
+                return rows[:0]
+            rows = rows[self._row_mask(genre_rows)[rows]]
+        return rows
+
+    def rows_to_artists(self, rows):
+        artists = self.artists
+        return [artists[row] for row in rows.tolist()]
@@ -0,0 +1,105 @@
+import time
+import threading
+from collections import OrderedDict
+
+from flask import current_app
+
+from ..cache import get_cache
+from .pool_index import PoolIndex
+
+# Built indexes are kept per process so paging and refiltering skip the store entirely
+_MAX_INDEXES = 32
+_indexes = OrderedDict()
+_indexes_lock = threading.Lock()
+
+
+def _slim_artist(artist):
+    """Keeps only the fields the similar-artists page and exports use."""
+    images = artist.get('images') or []
+    return {
+        'id': artist.get('id'),
+        'name': artist.get('name', 'N/A'),
+        'popularity': artist.get('popularity'),
+        'followers': {'total': (artist.get('followers') or {}).get('total')},
+        'genres': artist.get('genres') or [],
+        'external_urls': {'spotify': (artist.get('external_urls') or {}).get('spotify')},
+        'images': images[:1],
+    }
+
+
+def _pool_cache():
+    # Pools are retained well past their freshness TTL so a refresh can be incremental
+    return get_cache('similar_pools', default_ttl=current_app.config['SIMILAR_POOL_MAX_AGE'])
+
+
+def pool_handle(artist_id):
+    """The store key for an artist's pool; this small string is all the session keeps."""
+    return f"pool:{artist_id}"
+
+
+def save_pool(artist_id, source_artist, artists, lastfm=None):
+    """
+    Stores a combined similar-artist pool under pool_handle(artist_id) and returns its PoolIndex.
+
+    The pool is laid out column-wise (followers, popularity) next to slimmed artist rows,
+    which is what PoolIndex is built from. `lastfm` maps each Last.fm similar-artist name
+    to the Spotify artist id it resolved to (None for no match).
+    """
+    rows = [_slim_artist(a) for a in artists]
+    pool = {
+        'source': {
+            'id': artist_id,
+            'name': source_artist.get('name', 'Selected Artist'),
+            'genres': source_artist.get('genres', []),
+        },
+        'followers': [row['followers']['total'] for row in rows],
+        'popularity': [row['popularity'] for row in rows],
+        'artists': rows,
+        'lastfm': lastfm or {},
+        'built_at': time.time(),
+    }
+    handle = pool_handle(artist_id)
+    _pool_cache().set(handle, pool)
+    index = PoolIndex(pool)
+    _remember_index(handle, index)
+    return index
+
+
+def load_pool(handle):
+    """Returns the stored pool for a handle, or None if it is missing or past SIMILAR_POOL_MAX_AGE."""
+    return _pool_cache().get(handle)
+
+
+def _remember_index(handle, index):
+    with _indexes_lock:
+        _indexes[handle] = index
+        _indexes.move_to_end(handle)
+        while len(_indexes) > _MAX_INDEXES:
+            _indexes.popitem(last=False)
+
+
+def is_stale(index):
+    """True once a pool is older than SIMILAR_POOL_TTL and should be refreshed."""
+    return index.built_at + current_app.config['SIMILAR_POOL_TTL'] <= time.time()
+
+
+def get_pool_index(handle):
+    """
+    Returns a PoolIndex for a stored pool, or None if it is missing.
+    Indexes are built once per process and reused while fresh; a stale one is reloaded
+    from the store in case another worker refreshed it, and may itself be stale.
+    """
+    with _indexes_lock:
+        index = _indexes.get(handle)
+        if index is not None:
+            if not is_stale(index):
+                _indexes.move_to_end(handle)
+                return index
+            del _indexes[handle]
+
+    pool = load_pool(handle)
+    if pool is None:
+        return None
+    index = PoolIndex(pool)
+    _remember_index(handle, index)
+    return index
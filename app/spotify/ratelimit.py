@@ -0,0 +1,261 @@
+import os
+import time
+import random
+import sqlite3
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from flask import current_app
+from spotipy.exceptions import SpotifyException
+
+from ..deadline import MIN_TIMEOUT, DeadlineExceeded, bind_context, current_deadline, deadline_scope, mark_incomplete
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS bucket (
+    id INTEGER PRIMARY KEY CHECK (id = 1),
+    tokens REAL NOT NULL,
+    updated REAL NOT NULL,
+    paused_until REAL NOT NULL DEFAULT 0
+);
+"""
+
+# Extra wait after a Retry-After pause, so waiting callers don't all retry in the same instant
+_RETRY_JITTER = 0.25
+
+
+class SharedTokenBucket:
+    """
+    Token bucket in SQLite, so every worker process on the host draws from the same
+    budget: calls start at no more than `rate` per second on average, in bursts of up
+    to `burst`. Taking a token is a single conditional UPDATE, which SQLite runs
+    atomically across processes. pause() stops everyone until a point in time (a
+    Retry-After from Spotify), after which the bucket refills from empty.
+    """
+
+    def __init__(self, path, rate=10.0, burst=10):
+        self.path = path
+        self.rate = rate
+        self.burst = burst
+        self._local = threading.local()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._connect() as conn:
+            conn.executescript(_SCHEMA)
+            conn.execute('INSERT OR IGNORE INTO bucket (id, tokens, updated) VALUES (1, ?, ?)', (burst, time.time()))
+
+    def _connect(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+        return conn
+
+    def take(self):
+        """
+        Takes a token if one is available. Otherwise returns (seconds until one may be,
+        whether the bucket is paused); (0.0, False) means the token was taken.
+        """
+        now = time.time()
+        params = {'now': now, 'rate': self.rate, 'burst': self.burst}
+        with self._connect() as conn:
+            taken = conn.execute(
+                'UPDATE bucket SET tokens = MIN(:burst, tokens + (:now - updated) * :rate) - 1, updated = :now '
+                'WHERE id = 1 AND paused_until <= :now AND MIN(:burst, tokens + (:now - updated) * :rate) >= 1',
+                params,
+            ).rowcount
+        if taken:
+            return 0.0, False
+        tokens, updated, paused_until = self._connect().execute(
+            'SELECT tokens, updated, paused_until FROM bucket WHERE id = 1'
+        ).fetchone()
+        if paused_until > now:
+            return paused_until - now, True
+        tokens = min(self.burst, tokens + (now - updated) * self.rate)
+        return max(0.001, (1 - tokens) / self.rate), False
+
+    def pause(self, seconds):
+        """No calls start for `seconds`, in any worker; afterwards the bucket refills from empty."""
+        until = time.time() + seconds
+        with self._connect() as conn:
+            conn.execute(
+                'UPDATE bucket SET paused_until = MAX(paused_until, :until), tokens = 0, '
+                'updated = MAX(updated, :until) WHERE id = 1',
+                {'until': until},
+            )
+
+    def paused_for(self):
+        paused_until = self._connect().execute('SELECT paused_until FROM bucket WHERE id = 1').fetchone()[0]
+        return max(0.0, paused_until - time.time())
+
+
+class AdaptiveConcurrency:
+    """
+    Calls in flight in this process, with an AIMD limit: each successful call raises the
+    limit by 1/limit (about +1 per round of calls), each 429 halves it, between 1 and
+    `max_limit`.
+    """
+
+    def __init__(self, max_limit):
+        self.max_limit = max_limit
+        self.limit = float(max_limit)
+        self.in_flight = 0
+        self._cond = threading.Condition()
+
+    def acquire(self, timeout=None):
+        with self._cond:
+            if not self._cond.wait_for(lambda: self.in_flight < int(self.limit), timeout=timeout):
+                return False
+            self.in_flight += 1
+            return True
+
+    def release(self, throttled=False, adjust=True):
+        """Frees the slot; `adjust` is False when no call was made with it."""
+        with self._cond:
+            self.in_flight -= 1
+            if adjust and throttled:
+                self.limit = max(1.0, self.limit / 2)
+            elif adjust:
+                self.limit = min(float(self.max_limit), self.limit + 1 / self.limit)
+            self._cond.notify_all()
+
+
+def _retry_after(error):
+    try:
+        return max(0.0, float((error.headers or {}).get('Retry-After')))
+    except (TypeError, ValueError):
+        return 1.0
+
+
+class SpotifyGovernor:
+    """
+    Every Spotify Web API call in the process goes through here (see DeadlineSpotify).
+
+    A call waits for a slot under the adaptive concurrency limit and for a token from the
+    bucket shared by all workers. On a 429 the whole host pauses for Retry-After, the
+    concurrency limit is halved, and the call is retried after the pause (plus jitter) up
+    to `max_retries` times, as long as the pause is no longer than `max_retry_after` and
+    fits in the current request deadline. Otherwise the 429 is raised to the caller.
+    """
+
+    def __init__(self, bucket, max_concurrency=8, max_retries=3, max_retry_after=30):
+        self.bucket = bucket
+        self.concurrency = AdaptiveConcurrency(max_concurrency)
+        self.max_concurrency = max_concurrency
+        self.max_retries = max_retries
+        self.max_retry_after = max_retry_after
+        self._lock = threading.Lock()
+        self._metrics = {'calls': 0, 'throttled': 0, 'retries': 0, 'wait_seconds': 0.0}
+
+    def _count(self, **increments):
+        with self._lock:
+            for name, value in increments.items():
+                self._metrics[name] += value
+
+    def _give_up(self, reason):
+        mark_incomplete('spotify')
+        raise DeadlineExceeded(reason)
+
+    def _acquire(self):
+        """Waits for a concurrency slot and a token; raises DeadlineExceeded if that would outlast the request."""
+        deadline = current_deadline()
+        started = time.monotonic()
+        timeout = max(0.0, deadline.remaining() - MIN_TIMEOUT) if deadline is not None else None
+        if not self.concurrency.acquire(timeout):
+            self._give_up('No Spotify call slot freed up before the request deadline')
+        try:
+            while True:
+                delay, paused = self.bucket.take()
+                if not delay:
+                    break
+                if paused:
+                    if delay > self.max_retry_after:
+                        raise SpotifyException(429, -1, f"Spotify rate limit: calls paused for another {delay:.0f}s",
+                                               headers={'Retry-After': str(int(delay) + 1)})
+                    delay += random.uniform(0, _RETRY_JITTER)
+                if deadline is not None and delay > deadline.remaining() - MIN_TIMEOUT:
+                    self._give_up('Spotify rate limit would outlast the request deadline')
+                time.sleep(delay)
+        except BaseException:
+            self.concurrency.release(adjust=False)
+            raise
+        self._count(wait_seconds=time.monotonic() - started)
+
+    def call(self, func, *args, **kwargs):
+        """Runs one Spotify call (typically spotipy's _internal_call) under the governor."""
+        for attempt in range(self.max_retries + 1):
+            self._acquire()
+            throttled = False
+            try:
+                self._count(calls=1)
+                return func(*args, **kwargs)
+            except SpotifyException as e:
+                if e.http_status != 429:
+                    raise
+                throttled = True
+                retry_after = _retry_after(e)
+                self.bucket.pause(retry_after)
+                self._count(throttled=1)
+                deadline = current_deadline()
+                if (attempt == self.max_retries or retry_after > self.max_retry_after
+                        or (deadline is not None and retry_after + MIN_TIMEOUT > deadline.remaining())):
+                    print(f"[Spotify] Rate limited (Retry-After {retry_after:.0f}s); giving up after {attempt + 1} attempt(s).")
+                    mark_incomplete('spotify')
+                    raise
+                print(f"[Spotify] Rate limited; retrying after {retry_after:.0f}s ({attempt + 1}/{self.max_retries}).")
+                self._count(retries=1)
+            finally:
+                self.concurrency.release(throttled)
+
+    def map(self, func, items, deadline=None):
+        """
+        Runs func(item) for each item concurrently. Returns a list of (item, result, error)
+        in input order. The Spotify calls func makes are paced by the governor; those that
+        could not start before `deadline` (a time.monotonic() value) or the request
+        deadline fail with DeadlineExceeded. The calls run in the caller's context.
+        """
+        items = list(items)
+        if not items:
+            return []
+
+        @bind_context
+        def run(item):
+            try:
+                if deadline is None:
+                    return item, func(item), None
+                with deadline_scope(deadline - time.monotonic()):
+                    return item, func(item), None
+            except Exception as e:
+                return item, None, e
+
+        with ThreadPoolExecutor(max_workers=min(self.max_concurrency, len(items)), thread_name_prefix='spotify') as pool:
+            return list(pool.map(run, items))
+
+    def metrics(self):
+        with self._lock:
+            snapshot = dict(self._metrics)
+        snapshot['wait_seconds'] = round(snapshot['wait_seconds'], 3)
+        snapshot['concurrency_limit'] = round(self.concurrency.limit, 2)
+        snapshot['in_flight'] = self.concurrency.in_flight
+        snapshot['paused_for_seconds'] = round(self.bucket.paused_for(), 1)
+        return snapshot
+
+
+def init_spotify_governor(app):
+    """Creates this process's Spotify governor, drawing on the token bucket shared by every worker."""
+    app.extensions['spotify_governor'] = SpotifyGovernor(
+        SharedTokenBucket(
+            app.config['SPOTIFY_GOVERNOR_DB'],
+            rate=app.config['SPOTIFY_RATE_LIMIT'],
+            burst=app.config['SPOTIFY_RATE_BURST'],
+        ),
+        max_concurrency=app.config['SPOTIFY_MAX_CONCURRENCY'],
+        max_retries=app.config['SPOTIFY_MAX_RETRIES'],
+        max_retry_after=app.config['SPOTIFY_MAX_RETRY_AFTER'],
+    )
+
+
+def get_spotify_governor():
+    return current_app.extensions['spotify_governor']
@@ -5,8 +5,11 @@ import time
 import traceback
 import urllib.parse
 
+from ..breaker import get_breaker
+from ..httpclient import make_session
+
 # Use a persistent session for requests
-SESSION = requests.Session()
+SESSION = make_session(upstream='spotify_web')
 SESSION.headers.update({
     'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/110.0.0.0 Safari/537.36', # Example UA
     'Accept-Language': 'en-US,en;q=0.9',
@@ -14,6 +17,11 @@ SESSION.headers.update({
     'App-Platform': 'WebPlayer', # Mimic web player
 })
 
+# The anonymous token endpoint refuses us (4xx) nearly always, so it gets its own breaker that
+# opens after a single failure and backs off to an hour, instead of a 10 s call every time
+get_breaker('spotify_web_token', min_calls=1, max_open_seconds=3600)
+TOKEN_SESSION = make_session(upstream='spotify_web_token', failure_statuses=range(400, 600))
+
 ANONYMOUS_TOKEN_CACHE = {
     'accessToken': None,
     'clientToken': None,
@@ -30,12 +38,14 @@ def _get_anonymous_spotify_token():
         print("[Token Fetcher] Using cached anonymous token.")
         return ANONYMOUS_TOKEN_CACHE['accessToken'], ANONYMOUS_TOKEN_CACHE['clientToken']
 
+    if not TOKEN_SESSION.available():
+        return None, None # Failed recently; the breaker says when to try again
     print("[Token Fetcher] Attempting to fetch new anonymous token (EXPECTED TO FAIL)...")
     # This URL is likely blocked or changed
     token_url = "https://open.spotify.com/get_access_token?reason=transport&productType=web-player"
     try:
         headers = SESSION.headers.copy(); headers.update({'Accept': 'application/json'})
-        response = SESSION.get(token_url, headers=headers, timeout=10)
+        response = TOKEN_SESSION.get(token_url, headers=headers, timeout=10)
         response.raise_for_status() # This will likely raise the 400 error
         data = response.json()
         access_token = data.get('accessToken'); client_token = data.get('clientId'); expires_ms = data.get('accessTokenExpirationTimestampMs')
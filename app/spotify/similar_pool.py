@@ -0,0 +1,86 @@
+from ..singleflight import SingleFlight
+from ..lastfm.scraper import scrape_all_lastfm_similar_artists_names
+from .data import fetch_similar_artists_by_genre, resolve_spotify_artists_by_name, fetch_artists_by_id
+from .pool_store import pool_handle, save_pool, get_pool_index, is_stale
+from ..lastfm.tag_model import observe_artists
+
+
+class SimilarArtistPool:
+    """
+    Builds the combined similar-artist pool (Spotify genre search + Last.fm similar
+    artists resolved on Spotify) once per artist and serves it from the pool store.
+
+    Concurrent requests for the same artist in this process wait on a single build.
+    A stale pool is refreshed incrementally: genre search and the Last.fm scrape run
+    again, but only Last.fm names that were not seen before are resolved on Spotify.
+    Artists kept from the previous pool are re-fetched by ID in batches, so their
+    followers and popularity stay current.
+    """
+
+    def __init__(self, lastfm_pages=5):
+        self.lastfm_pages = lastfm_pages
+        self._flight = SingleFlight()
+
+    def get(self, sp, artist_id):
+        """Returns the PoolIndex for an artist's similar-artist pool, building it if needed."""
+        handle = pool_handle(artist_id)
+        index = get_pool_index(handle)
+        if index is not None and not is_stale(index):
+            return index
+        return self._flight.do(handle, self._build, sp, artist_id, handle)
+
+    def _build(self, sp, artist_id, handle):
+        # Another worker may have rebuilt it while this request was waiting
+        previous = get_pool_index(handle)
+        if previous is not None and not is_stale(previous):
+            return previous
+
+        source_artist = sp.artist(artist_id)
+        source_name = source_artist.get('name', 'Selected Artist')
+        print(f"[Similar Pool] {'Refreshing' if previous else 'Building'} pool for '{source_name}'...")
+
+        spotify_genre_artists = fetch_similar_artists_by_genre(
+            sp, artist_id, source_name, source_artist.get('genres', [])
+        )
+        lastfm_names = scrape_all_lastfm_similar_artists_names(source_name, max_pages=self.lastfm_pages)
+        known_names = previous.lastfm if previous else {}
+        if lastfm_names is None:
+            # Scrape failed outright; keep what the previous pool knew rather than dropping it
+            lastfm_names = list(known_names)
+
+        new_names = [name for name in lastfm_names if name not in known_names]
+        resolved = resolve_spotify_artists_by_name(sp, new_names)
+        print(f"[Similar Pool]  -> {len(lastfm_names)} Last.fm names, {len(new_names)} new to resolve.")
+
+        previous_rows = {row['id']: row for row in previous.artists} if previous else {}
+        # Reused rows are as old as the pool they came from; genre search already returned fresh ones
+        fresh_rows = {a['id']: a for a in spotify_genre_artists if a and a.get('id')}
+        reused_ids = [known_names[name] for name in lastfm_names if name not in resolved
+                      and known_names.get(name) in previous_rows and known_names[name] not in fresh_rows]
+        previous_rows.update(fresh_rows)
+        refreshed = fetch_artists_by_id(sp, reused_ids)
+        previous_rows.update(refreshed)
+        print(f"[Similar Pool]  -> Re-fetched {len(refreshed)} of {len(reused_ids)} reused artists.")
+        lastfm_ids = {}
+        lastfm_artists = []
+        for name in lastfm_names:
+            if name in resolved:
+                artist = resolved[name]
+            elif name in known_names:
+                artist = previous_rows.get(known_names[name]) if known_names[name] else None
+            else:
+                continue # Lookup failed this time; try again on the next refresh
+            lastfm_ids[name] = artist['id'] if artist else None
+            if artist:
+                lastfm_artists.append(artist)
+
+        combined_artists_map = {a['id']: a for a in spotify_genre_artists if a and a.get('id') != artist_id}
+        for a in lastfm_artists:
+            if a.get('id') != artist_id:
+                combined_artists_map[a['id']] = a
+        print(f"[Similar Pool]  -> Pool of {len(combined_artists_map)} unique similar artists.")
+        observe_artists([source_artist, *combined_artists_map.values()])
+        return save_pool(artist_id, source_artist, combined_artists_map.values(), lastfm=lastfm_ids)
+
+
+similar_artist_pool = SimilarArtistPool()
@@ -1,42 +1,80 @@
+import re
 import statistics
 import traceback
 
+import numpy as np
+import pandas as pd
+
+# A follower value is a number optionally followed by a single k/m suffix, e.g. '1600', '5.2k', '3 M'.
+# Commas and surrounding whitespace are stripped beforehand. Anything else ('N/A', 'mom',
+# '12k fans') is not a count.
+_FOLLOWER_NUMBER = r'-?\d*\.?\d+'
+_FOLLOWER_PATTERN = _FOLLOWER_NUMBER + r'\s*[km]?'
+_FOLLOWER_RE = re.compile(_FOLLOWER_PATTERN)
+# The same pattern for whole columns, capturing number and suffix with stripping and lowercasing
+# folded in, so each value is matched once
+_FOLLOWER_COLUMN_RE = re.compile(rf'\A\s*({_FOLLOWER_NUMBER})\s*([km]?)\s*\Z', re.IGNORECASE)
+_FOLLOWER_SUFFIXES = {'k': 1_000.0, 'm': 1_000_000.0}
+
+
+def parse_follower_counts(values):
+    """
+    Vectorized follower parsing for a whole column.
+
+    Args:
+        values: A pandas Series or any sequence of mixed follower values
+                ('1,600', '5.2k', '3M', 'N/A', ints, floats, None).
+
+    Returns:
+        tuple: (counts, null_mask) where counts is an int64 NumPy array (0 where unparseable)
+               and null_mask is a boolean array marking values that could not be parsed.
+    """
+    series = values if isinstance(values, pd.Series) else pd.Series(list(values), dtype=object)
+
+    if pd.api.types.is_numeric_dtype(series) and not pd.api.types.is_bool_dtype(series):
+        null_mask = series.isna().to_numpy(dtype=bool)
+        counts = series.fillna(0).to_numpy(dtype=np.float64).astype(np.int64)
+        return counts, null_mask
+
+    # Object columns hold Python strings, which pandas' .str methods also visit one at a time
+    # (one full pass per method), so a single match per value is the cheapest
+    numbers = np.full(len(series), np.nan)
+    multipliers = np.ones(len(series))
+    match = _FOLLOWER_COLUMN_RE.match
+    for position, value in enumerate(series.tolist()):
+        found = match(str(value).replace(',', ''))
+        if found:
+            numbers[position] = float(found[1])
+            if found[2]:
+                multipliers[position] = _FOLLOWER_SUFFIXES[found[2].lower()]
+    # Suffixed values like '0.29k' should land on 290, not 289.99999 truncated to 289
+    scaled = np.where(multipliers != 1.0, np.round(numbers * multipliers), numbers)
+
+    null_mask = np.isnan(scaled)
+    counts = np.where(null_mask, 0, scaled).astype(np.int64)
+    return counts, null_mask
+
+
 def parse_follower_count(follower_str):
     """
     Attempts to convert follower strings (e.g., '1,600', '5.2k', 'N/A') to integers.
     Returns None if conversion fails or input is invalid.
+    Scalar counterpart of parse_follower_counts; both share the same pattern and suffixes.
     """
-    if not follower_str or not isinstance(follower_str, (str, int, float)):
-        return None # Return None for invalid input types or empty strings
-
-    if isinstance(follower_str, int):
-        return follower_str # Already an integer
-    if isinstance(follower_str, float):
-        return int(follower_str) # Convert float to int
-
-    # Process string input
-    try:
-        # Remove commas and whitespace, convert to lowercase
-        cleaned_str = str(follower_str).replace(',', '').strip().lower()
-
-        if not cleaned_str or cleaned_str == 'n/a':
-            return None # Handle empty or "N/A" strings
-
-        # Handle 'k' suffix for thousands
-        if 'k' in cleaned_str:
-            # Remove 'k' and convert to float first for cases like '5.2k'
-            num_part = cleaned_str.replace('k', '')
-            return int(float(num_part) * 1000)
-        # Handle 'm' suffix for millions
-        elif 'm' in cleaned_str:
-            num_part = cleaned_str.replace('m', '')
-            return int(float(num_part) * 1000000)
-        # Try direct integer conversion for plain numbers
-        return int(cleaned_str)
-    except (ValueError, TypeError) as e:
-        # Log the error and the problematic string
-        # print(f"[Follower Parse] Warning: Could not parse '{follower_str}' into integer. Error: {e}")
-        return None # Return None on any conversion error
+    if isinstance(follower_str, bool) or not isinstance(follower_str, (str, int, float, np.number)):
+        return None # Return None for invalid input types
+    if isinstance(follower_str, (int, np.integer)):
+        return int(follower_str) # Already an integer
+    if isinstance(follower_str, (float, np.floating)):
+        return None if np.isnan(follower_str) else int(follower_str)
+
+    cleaned = follower_str.replace(',', '').strip().lower()
+    if not _FOLLOWER_RE.fullmatch(cleaned):
+        return None # Empty, "N/A" or otherwise unparseable strings
+    multiplier = _FOLLOWER_SUFFIXES.get(cleaned[-1])
+    if multiplier is None:
+        return int(float(cleaned))
+    return int(round(float(cleaned.rstrip('km')) * multiplier))
 
 
 def calculate_release_stats(releases):
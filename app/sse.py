@@ -0,0 +1,47 @@
+import json
+import time
+
+from flask import Response
+
+_POLL_INTERVAL = 0.5
+_KEEPALIVE_EVERY = 10
+
+
+def sse_event(event, data, event_id=None):
+    """Formats one server-sent event with a JSON payload."""
+    id_line = f"id: {event_id}\n" if event_id is not None else ''
+    return f"{id_line}event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+def event_log_response(events_after, is_finished, after_seq, window):
+    """
+    Streams an append-only event log as server-sent events.
+
+    `events_after(seq)` returns (seq, event, data) tuples newer than seq and
+    `is_finished()` says whether more events can still arrive. Each response streams
+    for at most `window` seconds so a worker is never held for long; EventSource
+    reconnects on its own and resumes from Last-Event-ID. The stream stops after an
+    'end' event.
+    """
+    def event_stream():
+        last_seq = after_seq
+        deadline = time.time() + window
+        last_sent = time.time()
+        yield 'retry: 1000\n\n'
+        while time.time() < deadline:
+            events = events_after(last_seq)
+            for seq, event, data in events:
+                last_seq = seq
+                yield sse_event(event, data, seq)
+                if event == 'end':
+                    return
+            if events:
+                last_sent = time.time()
+            elif is_finished():
+                return # Finished and everything (including 'end') was already delivered
+            elif time.time() - last_sent >= _KEEPALIVE_EVERY:
+                yield ': keepalive\n\n'
+                last_sent = time.time()
+            time.sleep(_POLL_INTERVAL)
+
+    return Response(event_stream(), mimetype='text/event-stream', headers={'Cache-Control': 'no-cache'})
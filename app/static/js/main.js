@@ -13,3 +13,56 @@ document.addEventListener('DOMContentLoaded', () => {
         }, 5000);
     }
 });
+
+// --- Background Jobs ---
+// Long-running work is submitted to /api/jobs/<kind> (or a route that returns the same
+// job URLs) and followed over server-sent events until it ends.
+
+function followJob(job, handlers = {}) {
+    return new Promise((resolve, reject) => {
+        const source = new EventSource(job.events_url);
+
+        Object.entries(handlers).forEach(([name, handler]) => {
+            source.addEventListener(name, e => {
+                // 'error' is also fired for connection problems; those carry no data
+                if (e.data !== undefined) handler(JSON.parse(e.data));
+            });
+        });
+
+        source.addEventListener('end', e => {
+            source.close();
+            const end = JSON.parse(e.data);
+            if (end.status !== 'done') {
+                reject(new Error(end.error || 'The job failed.'));
+                return;
+            }
+            fetch(job.result_url)
+                .then(r => r.json().then(data => {
+                    if (!r.ok) throw new Error(data.error || `Server error: ${r.status}`);
+                    resolve(data);
+                }))
+                .catch(reject);
+        });
+
+        // The server ends each stream after a short window and EventSource reconnects
+        // on its own; only give up once the browser has stopped retrying.
+        source.onerror = () => {
+            if (source.readyState === EventSource.CLOSED) reject(new Error('Lost connection to the job.'));
+        };
+    });
+}
+
+function submitJob(url, params) {
+    return fetch(url, {
+        method: 'POST',
+        headers: { 'Content-Type': 'application/json' },
+        body: JSON.stringify(params || {}),
+    }).then(r => r.json().then(data => {
+        if (!r.ok) throw new Error(data.error || `Server error: ${r.status}`);
+        return data;
+    }));
+}
+
+function runJob(kind, params, handlers) {
+    return submitJob(`/api/jobs/${kind}`, params).then(job => followJob(job, handlers));
+}
@@ -65,6 +65,10 @@ document.addEventListener('DOMContentLoaded', () => {
 
     // Initialize Upload Feature
     setupUploadFeature();
+
+    // Follow a search submitted by the page load
+    const searchJob = document.getElementById('playlist-search-job');
+    if (searchJob) followPlaylistSearch(searchJob);
 });
 
 // --- Helper Functions ---
@@ -138,6 +142,40 @@ function updateKeywordsDisplay(keywords) {
     }
 }
 
+// --- Playlist Search Job ---
+
+function followPlaylistSearch(jobElement) {
+    updateProgress(5, 'Queued...');
+    let searchFinished = false;
+    if (jobElement.dataset.localUrl) showLocalResults(jobElement.dataset.localUrl, () => searchFinished);
+    followJob({ events_url: jobElement.dataset.eventsUrl, result_url: jobElement.dataset.resultUrl }, {
+        progress: data => updateProgress(data.percent, data.message),
+        keywords: keywords => updateKeywordsDisplay(keywords),
+        track: track => { document.title = `Searching playlists for ${track.name}...`; },
+    })
+        .then(result => {
+            searchFinished = true;
+            injectResultsAndData(result.results_html, result.playlists);
+            document.title = `Playlist Results for ${result.selected_track_name}`;
+            hideProgress();
+        })
+        .catch(error => {
+            searchFinished = true;
+            showSearchError(`Playlist Search Error: ${error.message}`);
+        });
+}
+
+// Instant results from the local playlist index, shown until the live search finishes
+function showLocalResults(localUrl, isFinished) {
+    fetch(localUrl)
+        .then(response => response.ok ? response.json() : null)
+        .then(data => {
+            if (!data || !data.count || isFinished()) return;
+            injectResultsAndData(data.results_html, data.playlists);
+        })
+        .catch(error => console.warn('Local playlist search failed:', error));
+}
+
 // --- Data Injection ---
 
 function injectResultsAndData(resultsHtml, playlistData) {
@@ -207,6 +245,13 @@ function setupAiSmartSearch() {
             const matchingIds = new Set(result.playlist_ids || []);
             let visibleCount = 0;
 
+            // Matches come back most relevant first; move them into that order
+            const cardsById = new Map(Array.from(document.querySelectorAll('.playlist-card'), card => [card.dataset.playlistId, card]));
+            (result.playlist_ids || []).forEach(id => {
+                const card = cardsById.get(id);
+                if (card) card.parentNode.appendChild(card);
+            });
+
             document.querySelectorAll('.playlist-card').forEach(card => {
                 if (matchingIds.has(card.dataset.playlistId)) {
                     card.style.display = 'flex';
@@ -408,46 +453,26 @@ function confirmAndSendEmails() {
     emailLog.textContent = `Initializing email process for ${playlistsToContact.length} playlists...\n`;
     document.getElementById('email-status-container').style.display = 'block';
 
-    fetch("/playlists/send_emails", {
-        method: 'POST',
-        headers: { 'Content-Type': 'application/json', 'Accept': 'text/event-stream' },
-        body: JSON.stringify({
-            track_id: trackId,
-            playlists: playlistsToContact,
-            subject: editedSubject,
-            variations: emailContentVariations,
-            template_body: editedTemplateBody,
-            bcc_email: bccEmail
-        })
-    })
-        .then(response => {
-            if (!response.ok) throw new Error(`Server error: ${response.status}`);
-            const reader = response.body.getReader();
-            const decoder = new TextDecoder();
-
-            function processStream({ done, value }) {
-                if (done) {
-                    contactButton.disabled = false;
-                    contactButton.innerHTML = 'Contact Curators...';
-                    return;
-                }
-                const chunk = decoder.decode(value, { stream: true });
-
-                const lines = chunk.split('\n\n');
-                lines.forEach(line => {
-                    if (line.startsWith('data: ')) {
-                        emailLog.textContent += line.substring(6).trim() + '\n';
-                    }
-                });
+    const appendLog = message => {
+        emailLog.textContent += message + '\n';
+        emailLog.scrollTop = emailLog.scrollHeight;
+    };
 
-                emailLog.scrollTop = emailLog.scrollHeight;
-                reader.read().then(processStream);
-            }
-            reader.read().then(processStream);
-        })
+    // Emails are queued in the server outbox, so closing the page does not stop the batch
+    submitJob("/send-emails", {
+        track_id: trackId,
+        playlists: playlistsToContact,
+        subject: editedSubject,
+        variations: emailContentVariations,
+        template_body: editedTemplateBody,
+        bcc_email: bccEmail
+    })
+        .then(job => followJob(job, { status: appendLog, success: appendLog, error: appendLog, done: appendLog }))
         .catch(error => {
-            console.error("Error during email sending stream:", error);
-            emailLog.textContent += `\n❌ Network or processing error: ${error.message}\n`;
+            console.error("Error during email sending job:", error);
+            appendLog(`\n❌ Network or processing error: ${error.message}`);
+        })
+        .finally(() => {
             contactButton.disabled = false;
             contactButton.innerHTML = 'Contact Curators...';
         });
@@ -552,8 +577,8 @@ function setupUploadFeature() {
         const file = event.target.files[0];
         if (!file) return;
 
-        if (!file.name.match(/\.(xlsx|xls)$/i)) {
-            uploadStatus.textContent = "Error: Please select an Excel file.";
+        if (!file.name.match(/\.(xlsx|xls|csv)$/i)) {
+            uploadStatus.textContent = "Error: Please select an Excel or CSV file.";
             uploadStatus.style.color = 'var(--error)';
             fileInput.value = '';
             return;
@@ -1,10 +1,13 @@
-import requests
 import traceback
 import urllib.parse
 
+from ..cache import known_missing, remember_missing
+from ..httpclient import make_session
+from ..singleflight import coalesced
+
 WP_REST_BASE = "https://en.wikipedia.org/api/rest_v1"
 
-SESSION = requests.Session()
+SESSION = make_session(upstream='wikipedia')
 SESSION.headers.update({
     'User-Agent': 'FuzzTracks/1.0 (contact@fuzztracks.com)',
     'Accept': 'application/json',
@@ -15,9 +18,12 @@ def _get_summary_by_title(title):
     """Fetch Wikipedia page summary by title slug."""
     encoded = urllib.parse.quote(title, safe='')
     url = f"{WP_REST_BASE}/page/summary/{encoded}"
+    if known_missing('wikipedia', f"title:{title}"):
+        return None
     try:
         resp = SESSION.get(url, timeout=10)
         if resp.status_code == 404:
+            remember_missing('wikipedia', f"title:{title}")
             return None
         resp.raise_for_status()
         return resp.json()
@@ -36,12 +42,15 @@ def _get_summary_by_search(artist_name):
         'srlimit': 3,
         'format': 'json',
     }
+    if known_missing('wikipedia', f"search:{artist_name.lower()}"):
+        return None
     try:
         resp = SESSION.get(search_url, params=params, timeout=10)
         resp.raise_for_status()
         data = resp.json()
         results = data.get('query', {}).get('search', [])
         if not results:
+            remember_missing('wikipedia', f"search:{artist_name.lower()}")
             return None
         # Take first result
         title = results[0]['title']
@@ -51,6 +60,7 @@ def _get_summary_by_search(artist_name):
         return None
 
 
+@coalesced('wikipedia')
 def get_artist_summary(artist_name, wikipedia_url=None):
     """
     Fetch a Wikipedia summary for an artist.
@@ -0,0 +1,30 @@
+# Gunicorn settings, read with `gunicorn -c gunicorn.conf.py run:app`.
+#
+# Nearly every route spends its time waiting on Spotify, Last.fm, MusicBrainz, Wikipedia,
+# ReccoBeats, Gemini or SMTP, and job progress streams stay open for up to
+# JOB_STREAM_WINDOW seconds, so workers serve many requests at once instead of one:
+#
+#   gthread (default)  WEB_CONCURRENCY processes x GUNICORN_THREADS threads each.
+#   gevent             WEB_CONCURRENCY processes x GUNICORN_WORKER_CONNECTIONS greenlets
+#                      each. Needs `pip install gevent`; gunicorn monkey-patches the worker
+#                      before the app is imported, so the module-level requests sessions,
+#                      time.sleep and the job threads all become cooperative.
+#   sync               One request per process, as before.
+import os
+
+bind = f"0.0.0.0:{os.environ.get('PORT') or 8000}"
+workers = int(os.environ.get('WEB_CONCURRENCY') or 2)
+worker_class = os.environ.get('GUNICORN_WORKER_CLASS') or 'gthread'
+worker_connections = int(os.environ.get('GUNICORN_WORKER_CONNECTIONS') or 200)
+timeout = int(os.environ.get('GUNICORN_TIMEOUT') or 120)
+keepalive = 5
+
+if worker_class == 'gevent':
+    try:
+        import gevent  # noqa: F401
+    except ImportError:
+        print("[Gunicorn] gevent is not installed; falling back to gthread workers.")
+        worker_class = 'gthread'
+
+# Gunicorn turns sync workers into gthread ones whenever threads > 1
+threads = int(os.environ.get('GUNICORN_THREADS') or 16) if worker_class == 'gthread' else 1
@@ -0,0 +1,75 @@
+"""
+Benchmark for rendering outreach emails.
+
+Renders N personalised emails from a synthetic variation matrix with the previous
+per-recipient random.choice + join + str.replace, and with a compiled OutreachTemplate,
+checking both produce the same text for the same variation choices.
+
+Usage (from the repo root):
+    python scripts/bench_email_render.py [--messages 10000] [--variations 4]
+"""
+import os
+import sys
+import time
+import random
+import argparse
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.playlists.templating import OutreachTemplate, SECTIONS  # noqa: E402
+
+CALL_TO_ACTION = "You can listen to the track here: https://open.spotify.com/track/bench"
+ARTIST = "Bench Artist"
+
+
+def build_variations(per_section, seed=3):
+    rng = random.Random(seed)
+    filler = "lorem ipsum dolor sit amet consectetur adipiscing elit sed do eiusmod tempor".split()
+    return {
+        'greetings': [f"Hi {{{{curator_name}}}}, {' '.join(rng.sample(filler, 3))}" for _ in range(per_section)],
+        'main_body': [f"I came across {{{{playlist_name}}}} and {' '.join(rng.choices(filler, k=60))}. "
+                      f"It would fit {{{{playlist_name}}}} well." for _ in range(per_section)],
+        'closings': [f"Thanks, {' '.join(rng.sample(filler, 4))}" for _ in range(per_section)],
+        'signatures': [f"Best, {rng.choice(filler)}" for _ in range(per_section)],
+    }
+
+
+def legacy_render(variations, variant, curator, playlist):
+    """The previous send_emails_route body assembly."""
+    greeting, body, closing, signature = (variations[s][i] for s, i in zip(SECTIONS, variant))
+    text = "\n\n".join([greeting, body, CALL_TO_ACTION, closing, signature, ARTIST])
+    return text.replace("{{curator_name}}", curator).replace("{{playlist_name}}", playlist)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--messages', type=int, default=10000)
+    parser.add_argument('--variations', type=int, default=4, help='Variations per section.')
+    args = parser.parse_args()
+
+    variations = build_variations(args.variations)
+    recipients = [(f"Curator {i}", f"Playlist {i}") for i in range(args.messages)]
+
+    start = time.perf_counter()
+    template = OutreachTemplate(variations, CALL_TO_ACTION, ARTIST)
+    rng = random.Random(1)
+    variants = [template.choose(rng) for _ in recipients]
+    choose_ms = (time.perf_counter() - start) * 1000
+
+    start = time.perf_counter()
+    legacy = [legacy_render(variations, v, c, p) for v, (c, p) in zip(variants, recipients)]
+    legacy_ms = (time.perf_counter() - start) * 1000
+
+    start = time.perf_counter()
+    compiled = [template.render(v, {'curator_name': c, 'playlist_name': p}) for v, (c, p) in zip(variants, recipients)]
+    compiled_ms = (time.perf_counter() - start) * 1000
+
+    print(f"[Bench Email] {args.messages:,} emails, {template.combinations} variation combinations")
+    print(f"  {'variant choice':<24} {choose_ms:8.1f} ms")
+    print(f"  {'legacy join+replace':<24} {legacy_ms:8.1f} ms")
+    print(f"  {'OutreachTemplate':<24} {compiled_ms:8.1f} ms")
+    print(f"[Bench Email] Same output: {legacy == compiled}")
+
+
+if __name__ == '__main__':
+    main()
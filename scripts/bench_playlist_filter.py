@@ -0,0 +1,86 @@
+"""
+Benchmark for the AI playlist filter's keyword matching.
+
+Matches N synthetic playlists against K keywords (query words plus suggested artist
+names) with the previous per-playlist `any(keyword in text)` substring loop, and with
+a compiled KeywordMatcher that also scores and ranks the matches. Match counts differ
+slightly because the matcher only accepts whole words.
+
+The playlists start out as the dicts the frontend posts, and the route's full path is
+timed: records_from_dicts (which parses the follower and track columns), then matching
+and ranking.
+
+Usage (from the repo root):
+    python scripts/bench_playlist_filter.py [--playlists 50000] [--keywords 33 300]
+"""
+import os
+import sys
+import time
+import random
+import argparse
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.playlists.records import PlaylistRecord, records_from_dicts  # noqa: E402
+from app.playlists.matching import KeywordMatcher, rank_matches  # noqa: E402
+
+VOCAB = ("chill lofi beats study indie pop rock summer vibes night drive jazz soul house deep techno "
+         "hip hop rap acoustic morning coffee workout gym dance party sad love songs best new music "
+         "fresh finds weekly mix tracks rocket popular").split()
+
+
+def build_playlists(count, artists, seed=1):
+    rng = random.Random(seed)
+    playlists = []
+    for i in range(count):
+        description = ' '.join(rng.choices(VOCAB, k=12))
+        if rng.random() < 0.2:
+            description += f" feat. {rng.choice(artists)}"
+        followers = rng.randint(0, 100000)
+        playlists.append(PlaylistRecord(
+            f"pl{i}", name=' '.join(rng.choices(VOCAB, k=3)), description=description,
+            followers=f"{followers:,}" if followers < 10000 else f"{followers / 1000:.1f}k",
+            tracks_total=str(rng.randint(1, 500)), found_by=[rng.choice(VOCAB)],
+        ).to_dict())
+    return playlists
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--playlists', type=int, default=50000)
+    parser.add_argument('--keywords', type=int, nargs='+', default=[33, 300])
+    args = parser.parse_args()
+
+    artists = [f"artist {i} band" for i in range(max(args.keywords))]
+    playlists = build_playlists(args.playlists, artists)
+    query_words = ['chill', 'indie', 'vibes']
+    print(f"[Bench Filter] {args.playlists:,} playlists")
+
+    start = time.perf_counter()
+    records = records_from_dicts(playlists)
+    convert_ms = (time.perf_counter() - start) * 1000
+    print(f"  records_from_dicts {convert_ms:8.1f} ms (per request, before matching)")
+
+    for count in args.keywords:
+        keywords = set(query_words) | set(artists[:count - len(query_words)])
+
+        start = time.perf_counter()
+        legacy = [r for r in records if any(keyword in r.searchable_text() for keyword in keywords)]
+        legacy_ms = (time.perf_counter() - start) * 1000
+
+        start = time.perf_counter()
+        matcher = KeywordMatcher({**dict.fromkeys(artists[:count - len(query_words)], 1.0),
+                                  **dict.fromkeys(query_words, 2.0)})
+        compile_ms = (time.perf_counter() - start) * 1000
+        start = time.perf_counter()
+        ranked = rank_matches(matcher.match_records(records))
+        matcher_ms = (time.perf_counter() - start) * 1000
+
+        print(f"  {len(keywords):>4} keywords")
+        print(f"    {'substring any()':<22} {legacy_ms:8.1f} ms   {len(legacy):6d} matches")
+        print(f"    {'KeywordMatcher':<22} {matcher_ms:8.1f} ms   {len(ranked):6d} matches (ranked; compile {compile_ms:.1f} ms)")
+        print(f"    {'route: dicts -> ranked':<22} {convert_ms + compile_ms + matcher_ms:8.1f} ms")
+
+
+if __name__ == '__main__':
+    main()
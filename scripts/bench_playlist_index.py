@@ -0,0 +1,67 @@
+"""
+Benchmark for the local playlist index (SQLite FTS5, BM25 + follower ranking).
+
+Indexes N synthetic playlists into a throwaway database in batches, the way scrape
+results arrive, then times keyword searches against it.
+
+Usage (from the repo root):
+    python scripts/bench_playlist_index.py [--playlists 50000] [--queries 200]
+"""
+import os
+import sys
+import time
+import random
+import argparse
+import tempfile
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.playlists.records import PlaylistRecord  # noqa: E402
+from app.playlists.search_index import PlaylistIndex  # noqa: E402
+
+VOCAB = ("chill lofi beats study indie pop rock summer vibes night drive jazz soul house deep techno "
+         "hip hop rap acoustic morning coffee workout gym dance party sad love songs best new music "
+         "fresh finds weekly mix tracks rocket popular").split()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--playlists', type=int, default=50000)
+    parser.add_argument('--queries', type=int, default=200)
+    parser.add_argument('--batch', type=int, default=50, help='Playlists per upsert (one scrape page)')
+    args = parser.parse_args()
+    rng = random.Random(1)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        index = PlaylistIndex(os.path.join(tmp, 'index.sqlite3'))
+        start = time.perf_counter()
+        for first in range(0, args.playlists, args.batch):
+            keyword = rng.choice(VOCAB)
+            index.upsert([
+                PlaylistRecord(
+                    f"pl{i}", name=' '.join(rng.choices(VOCAB, k=3)), description=' '.join(rng.choices(VOCAB, k=12)),
+                    followers=str(rng.randint(0, 100000)), owner_name=f"curator {i % 997}", found_by=[keyword],
+                )
+                for i in range(first, min(first + args.batch, args.playlists))
+            ], 'bench')
+        index_s = time.perf_counter() - start
+        print(f"[Bench Index] {index.count():,} playlists indexed in {index_s:.1f} s "
+              f"({args.playlists / index_s:,.0f}/s, batches of {args.batch})")
+
+        timings = []
+        for _ in range(args.queries):
+            keywords = rng.sample(VOCAB, 3) + [' '.join(rng.sample(VOCAB, 2))]
+            start = time.perf_counter()
+            index.search(keywords, limit=200)
+            timings.append((time.perf_counter() - start) * 1000)
+        timings.sort()
+        print(f"  search (4 keywords, top 200): p50 {timings[len(timings) // 2]:.1f} ms, "
+              f"p95 {timings[int(len(timings) * 0.95)]:.1f} ms, max {timings[-1]:.1f} ms")
+
+        start = time.perf_counter()
+        narrow = index.search(['lofi beats'], limit=200)
+        print(f"  search ('lofi beats'):         {(time.perf_counter() - start) * 1000:.1f} ms, {len(narrow)} results")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,133 @@
+"""
+Benchmark for the /playlist-finder/upload ingestion path.
+
+Builds a 50k-row curator export fixture (.xlsx and .csv) in a temp directory and
+compares the previous pd.read_excel + iterrows implementation with the streaming
+load_uploaded_playlists path.
+
+Usage (from the repo root):
+    python scripts/bench_playlist_upload.py [--rows 50000] [--memory]
+"""
+import os
+import re
+import sys
+import csv
+import time
+import random
+import argparse
+import tempfile
+import tracemalloc
+
+import pandas as pd
+from openpyxl import Workbook
+from werkzeug.datastructures import FileStorage
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.playlists.ingest import load_uploaded_playlists, UPLOAD_COLUMN_MAP  # noqa: E402
+from app.spotify.utils import parse_follower_count  # noqa: E402
+
+HEADERS = list(UPLOAD_COLUMN_MAP.keys()) + ['Notes']
+KEYWORDS = ['indie pop', 'lofi', 'chill', 'bedroom pop', 'shoegaze', 'dream pop', 'synthwave', 'house']
+
+
+def _fixture_rows(row_count, seed=7):
+    rng = random.Random(seed)
+    for i in range(row_count):
+        followers = rng.choice([
+            f"{rng.randint(0, 250000):,}", f"{rng.uniform(1, 99):.1f}k", 'N/A', rng.randint(0, 250000),
+        ])
+        url = (f"https://open.spotify.com/playlist/{i:022d}" if rng.random() > 0.02
+               else 'https://example.com/not-a-playlist')
+        yield [
+            f"Playlist {i}", url, f"Curator {i % 977}", f"curator{i}@example.com", followers,
+            rng.randint(5, 500), f"Description for playlist {i} with some text",
+            ', '.join(rng.sample(KEYWORDS, 2)), 1 if rng.random() < 0.1 else 0, 'extra column',
+        ]
+
+
+def build_fixtures(directory, row_count):
+    xlsx_path = os.path.join(directory, 'playlists.xlsx')
+    csv_path = os.path.join(directory, 'playlists.csv')
+
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet('Playlists')
+    sheet.append(HEADERS)
+    for row in _fixture_rows(row_count):
+        sheet.append(row)
+    workbook.save(xlsx_path)
+
+    with open(csv_path, 'w', newline='', encoding='utf-8') as handle:
+        writer = csv.writer(handle)
+        writer.writerow(HEADERS)
+        writer.writerows(_fixture_rows(row_count))
+    return xlsx_path, csv_path
+
+
+def legacy_ingest(path):
+    """The previous upload_playlists body, kept here for comparison."""
+    df = pd.read_excel(path)
+    df['Contacted'] = pd.to_numeric(df['Contacted'], errors='coerce').fillna(0)
+    df = df[df['Contacted'] != 1]
+    processed = []
+    for _, row in df.iterrows():
+        playlist = {}
+        for excel_col, key in UPLOAD_COLUMN_MAP.items():
+            if excel_col in row:
+                value = row[excel_col]
+                playlist[key] = None if pd.isna(value) else value
+        url = playlist.get('url')
+        if url and isinstance(url, str) and 'open.spotify.com/playlist/' in url:
+            match = re.search(r'playlist/([a-zA-Z0-9]+)', url)
+            if match:
+                playlist['id'] = match.group(1)
+                if isinstance(playlist.get('found_by'), str):
+                    playlist['found_by'] = [kw.strip() for kw in playlist['found_by'].split(',')]
+                processed.append(playlist)
+    return sorted(processed, key=lambda p: parse_follower_count(p.get('followers')) or 0, reverse=True)
+
+
+def streaming_ingest(path):
+    with open(path, 'rb') as handle:
+        return load_uploaded_playlists(FileStorage(stream=handle, filename=os.path.basename(path)))
+
+
+def measure(label, func, path, trace_memory=False):
+    start = time.perf_counter()
+    result = func(path)
+    elapsed = time.perf_counter() - start
+    line = f"  {label:<28} {elapsed:8.2f}s   {len(result):,} playlists"
+    if trace_memory:
+        # Separate pass: tracemalloc slows allocation-heavy parsing down by several times
+        tracemalloc.start()
+        func(path)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        line += f"   peak {peak / 1_048_576:.1f} MiB"
+    print(line)
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=50000)
+    parser.add_argument('--memory', action='store_true', help='Also report peak traced memory (slow).')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        print(f"[Bench Upload] Building {args.rows:,}-row fixtures...")
+        xlsx_path, csv_path = build_fixtures(directory, args.rows)
+        print(f"[Bench Upload] xlsx {os.path.getsize(xlsx_path) / 1_048_576:.1f} MiB, "
+              f"csv {os.path.getsize(csv_path) / 1_048_576:.1f} MiB")
+
+        legacy = measure('legacy read_excel+iterrows', legacy_ingest, xlsx_path, args.memory)
+        streamed = measure('streaming xlsx', streaming_ingest, xlsx_path, args.memory)
+        measure('streaming csv', streaming_ingest, csv_path, args.memory)
+
+        legacy_ids = [p['id'] for p in legacy]
+        streamed_ids = [r.id for r in streamed]
+        print(f"[Bench Upload] Same playlists in same order: {legacy_ids == streamed_ids}")
+
+
+if __name__ == '__main__':
+    main()
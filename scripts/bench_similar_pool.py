@@ -0,0 +1,103 @@
+"""
+Benchmark for similar-artist pool filtering and paging.
+
+Builds a synthetic pool and compares the previous per-request linear filter + full
+sort with PoolIndex queries, checking both return the same artists in the same order.
+
+Usage (from the repo root):
+    python scripts/bench_similar_pool.py [--artists 2000] [--queries 2000]
+"""
+import os
+import sys
+import time
+import random
+import argparse
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.spotify.pool_index import PoolIndex  # noqa: E402
+
+GENRES = ['indie pop', 'bedroom pop', 'shoegaze', 'dream pop', 'lo-fi', 'synthwave', 'house', 'art pop']
+PER_PAGE = 24
+
+
+def build_pool(artist_count, seed=11):
+    rng = random.Random(seed)
+    artists = []
+    for i in range(artist_count):
+        artists.append({
+            'id': f"artist{i}",
+            'name': f"Artist {i}",
+            'popularity': None if rng.random() < 0.01 else rng.randint(0, 100),
+            'followers': {'total': None if rng.random() < 0.01 else int(rng.paretovariate(1.2) * 1000)},
+            'genres': rng.sample(GENRES, rng.randint(0, 3)),
+        })
+    return {
+        'source': {'id': 'source', 'name': 'Source', 'genres': []},
+        'followers': [a['followers']['total'] for a in artists],
+        'popularity': [a['popularity'] for a in artists],
+        'artists': artists,
+    }
+
+
+def legacy_page(artists, min_f, max_f, min_p, max_p, page):
+    """The previous similar_artists filter, sort and slice."""
+    filtered = []
+    for a in artists:
+        followers = a.get('followers', {}).get('total')
+        popularity = a.get('popularity')
+        if min_f is not None and (followers is None or followers < min_f): continue
+        if max_f is not None and (followers is None or followers > max_f): continue
+        if min_p is not None and (popularity is None or popularity < min_p): continue
+        if max_p is not None and (popularity is None or popularity > max_p): continue
+        filtered.append(a)
+    filtered.sort(key=lambda a: a.get('popularity') or 0, reverse=True)
+    offset = (page - 1) * PER_PAGE
+    return len(filtered), filtered[offset: offset + PER_PAGE]
+
+
+def indexed_page(index, min_f, max_f, min_p, max_p, page):
+    rows = index.query(min_f, max_f, min_p, max_p)
+    offset = (page - 1) * PER_PAGE
+    return len(rows), index.rows_to_artists(rows[offset: offset + PER_PAGE])
+
+
+def random_queries(query_count, seed=5):
+    rng = random.Random(seed)
+    for _ in range(query_count):
+        min_p = rng.choice([None, rng.randint(0, 60)])
+        max_p = rng.choice([None, rng.randint(40, 100)])
+        min_f = rng.choice([None, rng.randint(0, 5000)])
+        max_f = rng.choice([None, rng.randint(5000, 500000)])
+        yield min_f, max_f, min_p, max_p, rng.randint(1, 5)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--artists', type=int, default=2000)
+    parser.add_argument('--queries', type=int, default=2000)
+    args = parser.parse_args()
+
+    pool = build_pool(args.artists)
+    queries = list(random_queries(args.queries))
+
+    start = time.perf_counter()
+    index = PoolIndex(pool)
+    build_ms = (time.perf_counter() - start) * 1000
+    print(f"[Bench Pool] Index build for {args.artists:,} artists: {build_ms:.2f} ms")
+
+    start = time.perf_counter()
+    legacy = [legacy_page(pool['artists'], *query) for query in queries]
+    legacy_ms = (time.perf_counter() - start) * 1000 / len(queries)
+
+    start = time.perf_counter()
+    indexed = [indexed_page(index, *query) for query in queries]
+    indexed_ms = (time.perf_counter() - start) * 1000 / len(queries)
+
+    print(f"  {'legacy filter+sort':<24} {legacy_ms:8.3f} ms/query")
+    print(f"  {'PoolIndex':<24} {indexed_ms:8.3f} ms/query")
+    print(f"[Bench Pool] Same results: {legacy == indexed}")
+
+
+if __name__ == '__main__':
+    main()
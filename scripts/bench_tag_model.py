@@ -0,0 +1,65 @@
+"""
+Benchmark for the tag co-occurrence model that expands AI filter queries.
+
+Records synthetic artists with Last.fm-style tag lists and Spotify genres into a
+throwaway store, builds the model, and times expand() for typical queries.
+
+Usage (from the repo root):
+    python scripts/bench_tag_model.py [--artists 20000] [--tags 800]
+"""
+import os
+import sys
+import time
+import random
+import argparse
+import tempfile
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.lastfm.tag_model import TagModelStore, _lastfm_weight  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--artists', type=int, default=20000)
+    parser.add_argument('--tags', type=int, default=800)
+    parser.add_argument('--queries', type=int, default=2000)
+    args = parser.parse_args()
+    rng = random.Random(1)
+    vocabulary = [f"style{i}" for i in range(args.tags)] + ['indie pop', 'lofi', 'hip hop', 'dream pop']
+    # Tags come in loose scenes so co-occurrence has structure, like real tag data
+    scenes = [rng.sample(vocabulary, 12) for _ in range(args.tags // 4)]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        store = TagModelStore(os.path.join(tmp, 'tags.sqlite3'))
+        start = time.perf_counter()
+        observations = []
+        for i in range(args.artists):
+            scene = rng.choice(scenes)
+            tags = rng.sample(scene, 8) + rng.sample(vocabulary, 2)
+            popularity = rng.randint(0, 100)
+            observations.append((f"artist {i}", 'lastfm', [(t, _lastfm_weight(r)) for r, t in enumerate(tags)], popularity))
+            observations.append((f"artist {i}", 'spotify', [(t, 1.0) for t in scene[:3]], popularity))
+        store.record(observations)
+        print(f"[Bench TagModel] Recorded {args.artists:,} artists in {time.perf_counter() - start:.1f} s")
+
+        start = time.perf_counter()
+        model = store.build()
+        print(f"  build: {(time.perf_counter() - start) * 1000:.0f} ms ({model.tag_count} tags)")
+
+        queries = ['chill indie pop with female vocals', 'lofi beats to study to', 'dark hip hop',
+                   'style12 and style40 vibes', 'something completely unknown']
+        timings = []
+        for n in range(args.queries):
+            query = queries[n % len(queries)]
+            start = time.perf_counter()
+            model.expand(query)
+            timings.append((time.perf_counter() - start) * 1000)
+        timings.sort()
+        print(f"  expand: p50 {timings[len(timings) // 2]:.3f} ms, p99 {timings[int(len(timings) * 0.99)]:.3f} ms")
+        example = model.expand(queries[0])
+        print(f"  '{queries[0]}' -> tags {example.tags}, related {example.related_tags[:3]}, artists {example.artists[:3]}")
+
+
+if __name__ == '__main__':
+    main()
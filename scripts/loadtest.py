@@ -0,0 +1,193 @@
+"""
+Concurrent-user load test against stubbed upstreams.
+
+Starts the app under gunicorn (using gunicorn.conf.py) once per worker class, with every
+outbound HTTP call answered locally after a fixed delay instead of hitting Spotify and
+friends, then runs N simulated users against I/O-bound routes and reports throughput and
+latency. Comparing `sync` with `gthread`/`gevent` shows what the worker mode buys when
+routes are waiting on upstreams.
+
+Usage (from the repo root):
+    python scripts/loadtest.py [--worker-classes sync gthread gevent] [--users 50]
+                               [--duration 15] [--latency 0.2] [--workers 2]
+"""
+import os
+import re
+import sys
+import json
+import time
+import socket
+import argparse
+import tempfile
+import threading
+import subprocess
+from urllib.request import urlopen
+from urllib.error import HTTPError
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, ROOT)
+
+ROUTES = [
+    '/search?query=loadtest',
+    '/artist/{artist_id}',
+]
+
+
+# --- Stubbed app (imported by the gunicorn workers) ---
+
+def _stub_payload(method, url):
+    """Canned upstream JSON for the URLs the load-tested routes call."""
+    if 'accounts.spotify.com' in url:
+        return {'access_token': 'stub', 'token_type': 'Bearer', 'expires_in': 3600}
+    if '/v1/search' in url:
+        return {'artists': {'items': [], 'total': 0, 'limit': 1, 'offset': 0}}
+    match = re.search(r'/v1/artists/(\w+)(/\w[\w-]*)?', url)
+    if match and match.group(2) == '/top-tracks':
+        return {'tracks': []}
+    if match and match.group(2) == '/albums':
+        return {'items': [], 'next': None, 'total': 0}
+    if match:
+        return {
+            'id': match.group(1), 'name': 'Stub Artist', 'popularity': 42, 'genres': ['indie pop'],
+            'followers': {'total': 12345}, 'images': [], 'external_urls': {'spotify': ''},
+            'uri': f"spotify:artist:{match.group(1)}", 'type': 'artist',
+        }
+    return {}
+
+
+def create_stubbed_app():
+    """App factory for gunicorn: the real app, with requests' transport replaced by stubs."""
+    import requests
+    from requests.adapters import HTTPAdapter
+
+    latency = float(os.environ.get('LOADTEST_UPSTREAM_LATENCY') or 0.2)
+
+    def stub_send(adapter, request, **kwargs):
+        time.sleep(latency) # Cooperative under gevent, like a real socket wait
+        response = requests.Response()
+        response.status_code = 200
+        response.headers['Content-Type'] = 'application/json'
+        response._content = json.dumps(_stub_payload(request.method, request.url)).encode()
+        response.url = request.url
+        response.request = request
+        response.encoding = 'utf-8'
+        return response
+
+    HTTPAdapter.send = stub_send
+    from app import create_app
+    return create_app()
+
+
+# --- Load generator ---
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def _wait_ready(base_url, timeout=30):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            urlopen(base_url + '/', timeout=2).read()
+            return True
+        except Exception:
+            time.sleep(0.3)
+    return False
+
+
+def _user(base_url, stop_at, latencies, errors, lock):
+    i = 0
+    while time.time() < stop_at:
+        path = ROUTES[i % len(ROUTES)].format(artist_id=f"stub{i % 97}")
+        i += 1
+        start = time.perf_counter()
+        try:
+            urlopen(base_url + path, timeout=60).read()
+            ok = True
+        except HTTPError as e:
+            ok = e.code < 500
+        except Exception:
+            ok = False
+        elapsed = time.perf_counter() - start
+        with lock:
+            if ok:
+                latencies.append(elapsed)
+            else:
+                errors.append(elapsed)
+
+
+def run(worker_class, args, workdir):
+    port = _free_port()
+    env = dict(
+        os.environ,
+        PORT=str(port),
+        GUNICORN_WORKER_CLASS=worker_class,
+        WEB_CONCURRENCY=str(args.workers),
+        LOADTEST_UPSTREAM_LATENCY=str(args.latency),
+        SPOTIPY_CLIENT_ID='stub', SPOTIPY_CLIENT_SECRET='stub',
+        CACHE_DIR=os.path.join(workdir, 'cache'),
+        JOBS_DB=os.path.join(workdir, 'jobs.sqlite3'),
+        SESSION_FILE_DIR=os.path.join(workdir, 'sessions'),
+        OUTBOX_SENDER_ENABLED='0',
+    )
+    server = subprocess.Popen(
+        [sys.executable, '-m', 'gunicorn', '-c', os.path.join(ROOT, 'gunicorn.conf.py'),
+         '--pythonpath', os.path.join(ROOT, 'scripts'), '--chdir', workdir,
+         '--log-level', 'warning', 'loadtest:create_stubbed_app()'],
+        env=env, stdout=subprocess.DEVNULL, stderr=None if args.verbose else subprocess.DEVNULL,
+    )
+    base_url = f"http://127.0.0.1:{port}"
+    try:
+        if not _wait_ready(base_url):
+            print(f"  {worker_class:<8} server did not start")
+            return
+        latencies, errors, lock = [], [], threading.Lock()
+        stop_at = time.time() + args.duration
+        users = [threading.Thread(target=_user, args=(base_url, stop_at, latencies, errors, lock), daemon=True)
+                 for _ in range(args.users)]
+        start = time.time()
+        for user in users:
+            user.start()
+        for user in users:
+            user.join()
+        wall = time.time() - start
+        latencies.sort()
+        if not latencies:
+            print(f"  {worker_class:<8} no successful requests ({len(errors)} errors)")
+            return
+        p50 = latencies[len(latencies) // 2] * 1000
+        p95 = latencies[int(len(latencies) * 0.95)] * 1000
+        print(f"  {worker_class:<8} {len(latencies) / wall:8.1f} req/s   p50 {p50:7.0f} ms   "
+              f"p95 {p95:7.0f} ms   {len(latencies):6d} ok   {len(errors):4d} errors")
+    finally:
+        server.terminate()
+        server.wait(timeout=30)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--worker-classes', nargs='+', default=['sync', 'gthread', 'gevent'])
+    parser.add_argument('--users', type=int, default=50, help='Concurrent simulated users.')
+    parser.add_argument('--duration', type=float, default=15, help='Seconds per worker class.')
+    parser.add_argument('--latency', type=float, default=0.2, help='Seconds per stubbed upstream call.')
+    parser.add_argument('--workers', type=int, default=2, help='Gunicorn worker processes.')
+    parser.add_argument('--verbose', action='store_true', help='Show server logs.')
+    args = parser.parse_args()
+
+    print(f"[Load Test] {args.users} users, {args.duration:g}s per run, "
+          f"{args.latency * 1000:.0f} ms stubbed upstream latency, {args.workers} workers")
+    with tempfile.TemporaryDirectory() as workdir:
+        for worker_class in args.worker_classes:
+            if worker_class == 'gevent':
+                try:
+                    import gevent  # noqa: F401
+                except ImportError:
+                    print(f"  {worker_class:<8} skipped (gevent is not installed)")
+                    continue
+            run(worker_class, args, workdir)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,61 @@
+"""
+Check that the AI playlist filter's KeywordMatcher handles very long keywords.
+
+The whole user query becomes one keyword of the matcher, next to its words. This
+builds matchers the way the filter route does, for queries of increasing length, and
+fails if compiling or matching raises (as RecursionError did for queries of roughly
+1000 characters when the trie pattern was built recursively).
+
+Usage (from the repo root):
+    python scripts/long_query_check.py [--lengths 100 1000 5000 20000]
+"""
+import os
+import re
+import sys
+import time
+import argparse
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.playlists.matching import KeywordMatcher  # noqa: E402
+
+WORDS = "chill lofi beats study indie pop rock summer vibes night drive jazz soul house".split()
+
+
+def make_query(length):
+    words = []
+    while len(' '.join(words)) < length:
+        words.append(WORDS[len(words) % len(WORDS)])
+    return ' '.join(words)[:length].strip()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--lengths', type=int, nargs='+', default=[100, 1000, 5000, 20000])
+    args = parser.parse_args()
+
+    failed = False
+    for length in args.lengths:
+        query = make_query(length)
+        query_words = set(re.findall(r'\b\w+\b', query.lower()))
+        weights = dict.fromkeys(query_words, 2.0)
+        weights[query] = 2.0 * len(query_words) + 1
+        text = f"playlist for {query} and more"
+        start = time.perf_counter()
+        try:
+            found = KeywordMatcher(weights).find(text)
+        except Exception as e:
+            failed = True
+            print(f"[Long Query Check] {len(query)} chars: {type(e).__name__}: {e}")
+            continue
+        elapsed = (time.perf_counter() - start) * 1000
+        print(f"[Long Query Check] {len(query)} chars: {len(found)} keywords found in {elapsed:.1f}ms, "
+              f"whole query matched: {query in found}")
+        failed = failed or query not in found
+    if failed:
+        sys.exit("FAIL: long queries are not matched")
+    print("OK: long queries compile and match")
+
+
+if __name__ == '__main__':
+    main()
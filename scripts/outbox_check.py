@@ -0,0 +1,85 @@
+"""
+End-to-end check of the email outbox against a local aiosmtpd stand-in.
+
+Starts an in-process aiosmtpd server, queues a campaign in a temporary outbox, runs
+the real OutboxSender against it (no pacing) and reports delivery state, throughput and
+how many SMTP connections were opened. With --drop-every N the server hangs up after
+every N messages, to exercise reconnecting. Needs `pip install aiosmtpd`.
+
+Usage (from the repo root):
+    python scripts/outbox_check.py [--messages 200] [--drop-every 0]
+"""
+import os
+import sys
+import time
+import argparse
+import tempfile
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.outbox.store import OutboxStore  # noqa: E402
+from app.outbox.sender import OutboxSender  # noqa: E402
+
+
+class CountingHandler:
+    def __init__(self, drop_every):
+        self.drop_every = drop_every
+        self.received = []
+        self.connections = 0
+
+    async def handle_EHLO(self, server, session, envelope, hostname, responses):
+        self.connections += 1
+        session.delivered = 0
+        return responses
+
+    async def handle_DATA(self, server, session, envelope):
+        self.received.append((envelope.rcpt_tos, envelope.content))
+        session.delivered += 1
+        if self.drop_every and session.delivered % self.drop_every == 0:
+            server.transport.close() # Simulate the server dropping an idle/long-lived connection
+        return '250 Message accepted for delivery'
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--messages', type=int, default=200)
+    parser.add_argument('--drop-every', type=int, default=0, help='Hang up after every N messages.')
+    parser.add_argument('--port', type=int, default=8025)
+    args = parser.parse_args()
+
+    try:
+        from aiosmtpd.controller import Controller
+    except ImportError:
+        sys.exit("aiosmtpd is not installed: pip install aiosmtpd")
+
+    handler = CountingHandler(args.drop_every)
+    controller = Controller(handler, hostname='127.0.0.1', port=args.port)
+    controller.start()
+    config = {
+        'SMTP_SERVER': '127.0.0.1', 'SMTP_PORT': args.port, 'SMTP_USE_TLS': False,
+        'SENDER_EMAIL': 'outbox-check@example.com', 'SENDER_PASSWORD': None,
+        'OUTBOX_MIN_INTERVAL': 0, 'OUTBOX_MAX_INTERVAL': 0, 'OUTBOX_MAX_ATTEMPTS': 5,
+        'OUTBOX_RETRY_DELAY': 0.1, 'OUTBOX_IDLE_TIMEOUT': 60,
+    }
+    with tempfile.TemporaryDirectory() as workdir:
+        store = OutboxStore(os.path.join(workdir, 'outbox.sqlite3'))
+        messages = [{'recipient': f"curator{i}@example.com", 'subject': 'Outbox check', 'body': f"Message {i}"}
+                    for i in range(args.messages)]
+        campaign_id = store.create_campaign('Outbox check', messages)
+        sender = OutboxSender(store, config)
+        start = time.perf_counter()
+        sender.start()
+        while store.get_campaign(campaign_id)['finished_at'] is None:
+            time.sleep(0.05)
+        elapsed = time.perf_counter() - start
+        sender.stop()
+        controller.stop()
+
+        campaign = store.get_campaign(campaign_id)
+        print(f"[Outbox Check] {campaign['sent']} sent, {campaign['failed']} failed of {campaign['total']} "
+              f"in {elapsed:.2f}s ({campaign['total'] / elapsed:.0f} msg/s)")
+        print(f"  SMTP connections opened: {handler.connections}, messages received: {len(handler.received)}")
+
+
+if __name__ == '__main__':
+    main()
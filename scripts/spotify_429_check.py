@@ -0,0 +1,80 @@
+"""
+Check that Spotify 429s are handled by the governor alone.
+
+Starts a local HTTP server that answers every request with 429 and a Retry-After,
+points a DeadlineSpotify client with a SpotifyGovernor at it and makes one call.
+Each governor attempt must reach the server exactly once: if the HTTP layer (urllib3's
+Retry) also waited out Retry-After, the server would see more requests than attempts.
+
+Usage (from the repo root):
+    python scripts/spotify_429_check.py [--retries 2] [--retry-after 1]
+"""
+import os
+import sys
+import time
+import argparse
+import tempfile
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from spotipy.exceptions import SpotifyException  # noqa: E402
+
+from app.spotify.auth import DeadlineSpotify  # noqa: E402
+from app.spotify.ratelimit import SharedTokenBucket, SpotifyGovernor  # noqa: E402
+
+
+def make_handler(retry_after, hits):
+    class TooManyRequests(BaseHTTPRequestHandler):
+        def do_GET(self):
+            hits.append(time.monotonic())
+            body = b'{"error": {"status": 429, "message": "API rate limit exceeded"}}'
+            self.send_response(429)
+            self.send_header('Retry-After', str(retry_after))
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+    return TooManyRequests
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--retries', type=int, default=2, help='Governor retries after a 429.')
+    parser.add_argument('--retry-after', type=int, default=1)
+    args = parser.parse_args()
+
+    hits = []
+    server = ThreadingHTTPServer(('127.0.0.1', 0), make_handler(args.retry_after, hits))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    with tempfile.TemporaryDirectory() as workdir:
+        governor = SpotifyGovernor(
+            SharedTokenBucket(os.path.join(workdir, 'bucket.sqlite3')),
+            max_retries=args.retries, max_retry_after=args.retry_after + 1,
+        )
+        sp = DeadlineSpotify(auth='stub', governor=governor)
+        sp.prefix = f"http://127.0.0.1:{server.server_address[1]}/v1/"
+        start = time.perf_counter()
+        try:
+            sp.artist('0OdUWJ0sBjDrqHygGUXeCF')
+            outcome = 'unexpected success'
+        except SpotifyException as e:
+            outcome = f"SpotifyException {e.http_status}"
+        elapsed = time.perf_counter() - start
+    server.shutdown()
+
+    attempts = args.retries + 1
+    metrics = governor.metrics()
+    print(f"[429 Check] {outcome} after {elapsed:.2f}s: {len(hits)} upstream request(s) for {attempts} governor attempt(s), "
+          f"throttled {metrics['throttled']}, concurrency limit now {metrics['concurrency_limit']}")
+    if len(hits) != attempts or metrics['throttled'] != attempts:
+        sys.exit("FAIL: 429s were retried below the governor")
+    print("OK: one upstream request per governor attempt")
+
+
+if __name__ == '__main__':
+    main()